@@ -0,0 +1,4 @@
+ALTER TABLE condition_alerts
+    ADD COLUMN IF NOT EXISTS gridpoint TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_condition_alerts_gridpoint ON condition_alerts(gridpoint);
@@ -0,0 +1,7 @@
+ALTER TABLE condition_alerts
+    ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+    ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS idx_condition_alerts_due_lease
+    ON condition_alerts(next_evaluation_at, id)
+    WHERE is_active;
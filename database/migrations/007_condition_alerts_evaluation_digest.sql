@@ -0,0 +1,2 @@
+ALTER TABLE condition_alerts
+    ADD COLUMN IF NOT EXISTS evaluation_digest TEXT;
@@ -0,0 +1,12 @@
+ALTER TABLE condition_alerts
+    ADD COLUMN IF NOT EXISTS tenant_id TEXT NOT NULL DEFAULT 'default',
+    ADD COLUMN IF NOT EXISTS priority SMALLINT NOT NULL DEFAULT 0;
+
+UPDATE condition_alerts
+SET tenant_id = metadata->>'tenant_id'
+WHERE metadata->>'tenant_id' IS NOT NULL
+  AND metadata->>'tenant_id' <> '';
+
+CREATE INDEX IF NOT EXISTS idx_condition_alerts_tenant_due
+    ON condition_alerts(tenant_id, priority DESC, next_evaluation_at, id)
+    WHERE is_active;
@@ -0,0 +1,18 @@
+CREATE TABLE IF NOT EXISTS dispatch_outbox (
+    id SERIAL PRIMARY KEY,
+    message_key TEXT NOT NULL UNIQUE,
+    topic TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    sent_at TIMESTAMPTZ,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_dispatch_outbox_unsent
+    ON dispatch_outbox (id)
+    WHERE sent_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_dispatch_outbox_sent_at
+    ON dispatch_outbox (sent_at)
+    WHERE sent_at IS NOT NULL;
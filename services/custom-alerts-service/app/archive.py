@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from .config import settings
+from .forecast import ForecastSeries
+from .metrics import forecast_archive_snapshots_total
+
+_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_COLUMNS = ("temperature_f", "precip_probability", "wind_mph", "humidity")
+
+
+@dataclass(frozen=True)
+class ArchivedWindows:
+    """Archived forecast snapshots for one gridpoint, one row per fetch.
+
+    Metric columns are ``(snapshots, hours)`` arrays whose hour axis starts at each
+    snapshot's ``start_times`` entry, so a rule can be matched against every
+    snapshot at once. Hours beyond what NOAA returned are NaN (``False`` for rain).
+    """
+
+    fetched_at: np.ndarray
+    start_times: np.ndarray
+    temperature_f: np.ndarray
+    precip_probability: np.ndarray
+    wind_mph: np.ndarray
+    humidity: np.ndarray
+    rain: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.fetched_at.shape[0])
+
+    def window(self, hours: int) -> "ArchivedWindows":
+        return ArchivedWindows(
+            fetched_at=self.fetched_at,
+            start_times=self.start_times,
+            temperature_f=self.temperature_f[:, :hours],
+            precip_probability=self.precip_probability[:, :hours],
+            wind_mph=self.wind_mph[:, :hours],
+            humidity=self.humidity[:, :hours],
+            rain=self.rain[:, :hours],
+        )
+
+    @classmethod
+    def empty(cls, hours: int) -> "ArchivedWindows":
+        return cls._from_arrays(_empty_arrays(hours))
+
+    @classmethod
+    def _from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "ArchivedWindows":
+        return cls(**{field: arrays[field] for field in cls.__dataclass_fields__})
+
+
+class ForecastArchive:
+    """Day-partitioned store of the forecast windows evaluation saw for each gridpoint.
+
+    Each fresh hourly forecast is appended as one row of fixed width
+    (``forecast_archive_hours``) to ``<directory>/<YYYY-MM-DD>/<gridpoint>.npz``;
+    a fetch identical to the previous row of the day is skipped. Partitions older
+    than ``forecast_archive_days`` are deleted when a new day starts. Disabled
+    when no directory is configured.
+
+    Methods block on disk I/O; async callers run them in a worker thread.
+    """
+
+    def __init__(self, directory: Optional[str], *, hours: Optional[int] = None) -> None:
+        self._directory = Path(directory) if directory else None
+        self._hours = hours or settings.forecast_archive_hours
+        self._lock = threading.Lock()
+        if self._directory is not None:
+            self._directory.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self._directory is not None
+
+    @property
+    def hours(self) -> int:
+        return self._hours
+
+    def record(self, key: str, series: ForecastSeries, fetched_at: datetime) -> bool:
+        """Append ``series`` as a snapshot of ``key``; returns False when skipped."""
+        if self._directory is None or not len(series):
+            return False
+        fetched_at = fetched_at.astimezone(timezone.utc)
+        row = _snapshot_row(series, fetched_at, self._hours)
+        day_dir = self._directory / fetched_at.date().isoformat()
+        path = day_dir / f"{_safe_key(key)}.npz"
+        with self._lock:
+            if not day_dir.exists():
+                day_dir.mkdir(parents=True, exist_ok=True)
+                self._prune(fetched_at.date())
+            existing = _read(path)
+            if existing is not None and _same_snapshot(existing, row):
+                forecast_archive_snapshots_total.labels(result="unchanged").inc()
+                return False
+            arrays = row if existing is None else _concatenate([existing, row], self._hours)
+            tmp_path = path.with_suffix(".tmp")
+            try:
+                with tmp_path.open("wb") as handle:
+                    np.savez(handle, **arrays)
+                os.replace(tmp_path, path)
+            except OSError as exc:  # pragma: no cover - archiving is best effort
+                forecast_archive_snapshots_total.labels(result="failed").inc()
+                logger.warning("Unable to archive forecast snapshot", gridpoint=key, error=str(exc))
+                return False
+        forecast_archive_snapshots_total.labels(result="written").inc()
+        return True
+
+    def load(self, key: str, since: datetime, until: datetime) -> ArchivedWindows:
+        """Snapshots of ``key`` fetched in ``[since, until)``, oldest first."""
+        if self._directory is None:
+            return ArchivedWindows.empty(self._hours)
+        since, until = since.astimezone(timezone.utc), until.astimezone(timezone.utc)
+        parts: List[Dict[str, np.ndarray]] = []
+        day = since.date()
+        while day <= until.date():
+            arrays = _read(self._directory / day.isoformat() / f"{_safe_key(key)}.npz")
+            if arrays is not None:
+                parts.append(arrays)
+            day += timedelta(days=1)
+        if not parts:
+            return ArchivedWindows.empty(self._hours)
+        arrays = _concatenate(parts, self._hours)
+        fetched = arrays["fetched_at"]
+        keep = (fetched >= _as_datetime64(since)) & (fetched < _as_datetime64(until))
+        return ArchivedWindows._from_arrays({name: values[keep] for name, values in arrays.items()})
+
+    def _prune(self, today: date) -> None:
+        assert self._directory is not None
+        cutoff = (today - timedelta(days=settings.forecast_archive_days)).isoformat()
+        for path in self._directory.iterdir():
+            # ISO dates sort lexically, so partitions can be compared by name.
+            if path.is_dir() and _DAY_RE.match(path.name) and path.name < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def _snapshot_row(series: ForecastSeries, fetched_at: datetime, hours: int) -> Dict[str, np.ndarray]:
+    window = series.window(hours)
+    size = len(window)
+    arrays = _empty_arrays(hours, rows=1)
+    arrays["fetched_at"][0] = _as_datetime64(fetched_at)
+    arrays["start_times"][0] = window.start_times[0]
+    for column in _COLUMNS:
+        arrays[column][0, :size] = getattr(window, column)
+    arrays["rain"][0, :size] = window.rain
+    return arrays
+
+
+def _empty_arrays(hours: int, rows: int = 0) -> Dict[str, np.ndarray]:
+    arrays: Dict[str, np.ndarray] = {
+        "fetched_at": np.zeros(rows, dtype="datetime64[s]"),
+        "start_times": np.zeros(rows, dtype="datetime64[s]"),
+        "rain": np.zeros((rows, hours), dtype=bool),
+    }
+    for column in _COLUMNS:
+        arrays[column] = np.full((rows, hours), np.nan, dtype=np.float32)
+    return arrays
+
+
+def _concatenate(parts: List[Dict[str, np.ndarray]], hours: int) -> Dict[str, np.ndarray]:
+    # Partitions written under a different ``forecast_archive_hours`` are cut or padded to fit.
+    arrays = {}
+    for name in parts[0]:
+        values = []
+        for part in parts:
+            column = part[name]
+            if column.ndim == 2 and column.shape[1] != hours:
+                padded = _empty_arrays(hours, rows=column.shape[0])[name]
+                width = min(hours, column.shape[1])
+                padded[:, :width] = column[:, :width]
+                column = padded
+            values.append(column)
+        arrays[name] = np.concatenate(values)
+    return arrays
+
+
+def _same_snapshot(existing: Dict[str, np.ndarray], row: Dict[str, np.ndarray]) -> bool:
+    if not len(existing["fetched_at"]) or existing["start_times"][-1] != row["start_times"][0]:
+        return False
+    return all(
+        np.array_equal(existing[name][-1], row[name][0], equal_nan=name != "rain")
+        for name in (*_COLUMNS, "rain")
+    )
+
+
+def _read(path: Path) -> Optional[Dict[str, np.ndarray]]:
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as archive:
+            return {name: archive[name] for name in archive.files}
+    except (OSError, ValueError) as exc:
+        logger.warning("Skipping unreadable forecast archive partition", path=str(path), error=str(exc))
+        return None
+
+
+def _safe_key(key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]", "_", key)
+
+
+def _as_datetime64(value: datetime) -> np.datetime64:
+    return np.datetime64(value.astimezone(timezone.utc).replace(tzinfo=None), "s")
+
+
+forecast_archive = ForecastArchive(settings.forecast_archive_dir)
@@ -1,13 +1,57 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from .config import settings
+from .metrics import db_pool_connections_in_use, db_pool_saturation
 
 Base = declarative_base()
 
 engine = create_engine(settings.database_uri, future=True, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
 
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_uri(uri: str) -> str:
+    """Map a sync database URI onto its async driver (asyncpg / aiosqlite)."""
+    scheme, separator, rest = uri.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+def instrument_pool(target: Engine, name: str) -> None:
+    """Publish connection pool usage for ``target`` on every checkout and checkin."""
+    pool = target.pool
+    if not hasattr(pool, "checkedout"):
+        return
+    capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+
+    def _observe(in_use: int) -> None:
+        db_pool_connections_in_use.labels(engine=name).set(in_use)
+        db_pool_saturation.labels(engine=name).set(in_use / capacity if capacity else 0.0)
+
+    # ``checkin`` fires before the pool takes the connection back, hence the ``- 1``.
+    event.listen(target, "checkout", lambda *_: _observe(pool.checkedout()))
+    event.listen(target, "checkin", lambda *_: _observe(max(0, pool.checkedout() - 1)))
+
+
+async_engine = create_async_engine(
+    settings.async_database_uri or async_database_uri(settings.database_uri),
+    pool_pre_ping=True,
+    pool_size=settings.database_pool_size,
+    max_overflow=settings.database_max_overflow,
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_pool(engine, "sync")
+instrument_pool(async_engine.sync_engine, "async")
+
 
 def get_session():
     db = SessionLocal()
@@ -15,3 +59,8 @@ def get_session():
         yield db
     finally:
         db.close()
+
+
+async def get_async_session():
+    async with AsyncSessionLocal() as session:
+        yield session
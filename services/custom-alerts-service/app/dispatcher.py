@@ -1,15 +1,36 @@
 from __future__ import annotations
 
+import asyncio
 import json
-from typing import Any, Dict, Optional
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
 
 from aiokafka import AIOKafkaProducer
+from aiokafka.errors import KafkaError
+from loguru import logger
 
 from .config import settings
+from .metrics import dispatch_latency_seconds
+from .spool import DispatchSpool
+
+
+@dataclass
+class DispatchFailure:
+    payload: Dict[str, Any]
+    error: Exception
 
 
 class KafkaDispatcher:
-    def __init__(self, *, loop=None, topic: Optional[str] = None) -> None:
+    """Publishes dispatch requests to Kafka.
+
+    With a ``spool``, payloads the broker cannot take are appended to it instead of
+    failing, and so is everything sent while older payloads are still spooled, so
+    delivery order is kept. A background task drains the spool once the broker is
+    reachable again. ``start`` then succeeds even when Kafka is down.
+    """
+
+    def __init__(self, *, loop=None, topic: Optional[str] = None, spool: Optional[DispatchSpool] = None) -> None:
         self._topic = topic or settings.dispatch_topic
         self._producer = AIOKafkaProducer(
             loop=loop,
@@ -18,14 +39,171 @@ class KafkaDispatcher:
             key_serializer=lambda value: value.encode("utf-8"),
             enable_idempotence=True,
             linger_ms=20,
+            compression_type=settings.dispatch_compression_type,
         )
+        self._spool = spool
+        self._connected = False
+        self._drain_task: Optional[asyncio.Task] = None
+        self._drain_wakeup = asyncio.Event()
+        self._stopping = False
 
     async def start(self) -> None:
-        await self._producer.start()
+        if self._spool is None:
+            await self._producer.start()
+            self._connected = True
+            return
+        try:
+            await self._producer.start()
+            self._connected = True
+        except KafkaError as exc:
+            logger.warning("Kafka unavailable; spooling dispatches to disk", error=str(exc))
+        self._stopping = False
+        self._drain_task = asyncio.create_task(self._drain())
+        self._drain_task.add_done_callback(self._drain_finished)
 
     async def stop(self) -> None:
+        if self._drain_task is not None:
+            self._stopping = True
+            self._drain_wakeup.set()
+            await self._drain_task
+            self._drain_task = None
         await self._producer.stop()
+        self._connected = False
+        if self._spool is not None:
+            self._spool.close()
 
     async def send(self, payload: Dict[str, Any]) -> None:
-        key = payload.get("match", {}).get("user_id", "")
-        await self._producer.send_and_wait(self._topic, value=payload, key=key)
+        if self._spooling():
+            await self._spool_payloads([payload])
+            return
+        started = time.perf_counter()
+        try:
+            await self._producer.send_and_wait(
+                self._topic, value=payload, key=_message_key(payload), headers=_message_headers(payload)
+            )
+        except KafkaError:
+            if self._spool is None:
+                raise
+            await self._spool_payloads([payload])
+            return
+        dispatch_latency_seconds.observe(time.perf_counter() - started)
+
+    async def send_batch(self, payloads: Sequence[Dict[str, Any]]) -> List[DispatchFailure]:
+        """Enqueue many dispatches and await their acks with a bounded in-flight window.
+
+        Messages are handed to the producer without waiting for each ack, so they share
+        linger/batching on the broker connection. Failures are returned, not raised, so
+        the caller can retry just those messages. With a spool, failed messages are
+        spooled and nothing is reported as failed.
+        """
+        if self._spooling():
+            await self._spool_payloads(payloads)
+            return []
+        failures = await self._publish(payloads)
+        if failures and self._spool is not None:
+            await self._spool_payloads([failure.payload for failure in failures])
+            return []
+        return failures
+
+    async def _publish(self, payloads: Sequence[Dict[str, Any]]) -> List[DispatchFailure]:
+        failures: List[DispatchFailure] = []
+        window = max(1, settings.dispatch_max_in_flight)
+        for offset in range(0, len(payloads), window):
+            pending: List[tuple[Dict[str, Any], asyncio.Future]] = []
+            for payload in payloads[offset : offset + window]:
+                started = time.perf_counter()
+                try:
+                    future = await self._producer.send(
+                        self._topic, value=payload, key=_message_key(payload), headers=_message_headers(payload)
+                    )
+                except KafkaError as exc:
+                    failures.append(DispatchFailure(payload=payload, error=exc))
+                    continue
+                future.add_done_callback(_observe_ack(started))
+                pending.append((payload, future))
+            results = await asyncio.gather(*(future for _, future in pending), return_exceptions=True)
+            for (payload, _), result in zip(pending, results):
+                if isinstance(result, Exception):
+                    failures.append(DispatchFailure(payload=payload, error=result))
+        return failures
+
+    def _spooling(self) -> bool:
+        return self._spool is not None and (not self._connected or self._spool.depth > 0)
+
+    async def _spool_payloads(self, payloads: Sequence[Dict[str, Any]]) -> None:
+        assert self._spool is not None
+        await asyncio.to_thread(self._spool.append, list(payloads))
+        self._drain_wakeup.set()
+
+    async def _drain(self) -> None:
+        """Deliver spooled payloads in order until stopped, backing off after any error."""
+        assert self._spool is not None
+        while not self._stopping:
+            try:
+                await self._drain_step(self._spool)
+            except Exception as exc:
+                # An unreadable segment or a disk error must not end the task: sends would
+                # keep spooling behind it forever.
+                logger.exception("Dispatch spool drain failed; retrying", depth=self._spool.depth, error=str(exc))
+                await self._wait(settings.dispatch_spool_retry_seconds)
+
+    async def _drain_step(self, spool: DispatchSpool) -> None:
+        """Deliver one batch, committing the spool cursor after its acked prefix."""
+        spool.publish_metrics()
+        if not self._connected:
+            try:
+                await self._producer.start()
+                self._connected = True
+                logger.info("Kafka reachable again; draining dispatch spool", depth=spool.depth)
+            except KafkaError:
+                await self._wait(settings.dispatch_spool_retry_seconds)
+                return
+        batch = await asyncio.to_thread(spool.peek, max(1, settings.dispatch_max_in_flight))
+        if not batch.payloads:
+            await self._wait(settings.dispatch_spool_retry_seconds)
+            return
+        failures = await self._publish(batch.payloads)
+        failed = {id(failure.payload) for failure in failures}
+        delivered = next(
+            (index for index, payload in enumerate(batch.payloads) if id(payload) in failed),
+            len(batch.payloads),
+        )
+        if delivered:
+            await asyncio.to_thread(spool.commit, batch.ends[delivered - 1], delivered)
+        if failures:
+            # Anything after the first failure is re-sent next time (at-least-once).
+            logger.warning("Dispatch spool drain stalled", depth=spool.depth, error=str(failures[0].error))
+            await self._wait(settings.dispatch_spool_retry_seconds)
+
+    def _drain_finished(self, task: asyncio.Task) -> None:
+        if task.cancelled():
+            logger.warning("Dispatch spool drain task was cancelled")
+        elif task.exception() is not None:
+            logger.opt(exception=task.exception()).error("Dispatch spool drain task died")
+        elif not self._stopping:
+            logger.error("Dispatch spool drain task exited while the dispatcher is running")
+
+    async def _wait(self, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(self._drain_wakeup.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._drain_wakeup.clear()
+
+
+def _observe_ack(started: float):
+    def _callback(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            dispatch_latency_seconds.observe(time.perf_counter() - started)
+
+    return _callback
+
+
+def _message_key(payload: Dict[str, Any]) -> str:
+    return payload.get("match", {}).get("user_id", "")
+
+
+def _message_headers(payload: Dict[str, Any]) -> List[tuple[str, bytes]]:
+    # Stable per match, so consumers can drop re-sends from the spool or the outbox relay.
+    message_id = payload.get("match", {}).get("alert_id")
+    return [("message-id", str(message_id).encode("utf-8"))] if message_id else []
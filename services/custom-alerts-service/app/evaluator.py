@@ -1,278 +1,552 @@
 from __future__ import annotations
 
 import asyncio
-import re
-from dataclasses import dataclass
+import hashlib
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from loguru import logger
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .config import settings
-from .metrics import alert_evaluations_total, alert_matches_total
-from .models import AlertDeliveryHistory, ConditionAlert, UserPreference
-from .weather import NoaaWeatherClient
+from .forecast import ForecastSeries
+from .leasing import claim_due_alerts, due_backlog, tenant_backlog, worker_identity
+from .metrics import (
+    alert_evaluations_skipped_total,
+    alert_evaluations_total,
+    alert_matches_total,
+    due_backlog_alerts,
+    evaluation_cycle_seconds,
+    evaluation_dedup_ratio,
+    evaluation_phase_seconds,
+    evaluation_units_total,
+    oldest_overdue_seconds,
+    tenant_oldest_overdue_seconds,
+)
+from .models import AlertDeliveryHistory, ConditionAlert, DispatchOutbox, UserPreference
+from .outbox import outbox_row
+from .fairness import FairShare
+from .grid import GridTile, TileKey, area_summary, tiles_for
+from .prefetch import prefetch_tracker
+from .scheduling import HorizonProfile, first_crossing_hour, predictive_deferral, slotted_next_evaluation
+from .rules import compile_rule
+from .threshold_index import ThresholdIndex, WindowSummary
+from .units import (
+    COMPOUND,
+    DispatchRequest,
+    EvaluationUnit,
+    UnitKey,
+    build_dispatch,
+    build_units,
+    cooldown_minutes_for,
+    tenant_for,
+    to_utc,
+    unit_key,
+)
+from .weather import Gridpoint, NoaaWeatherClient
+
+PRIORITY_NORMAL = 0
+PRIORITY_IMMINENT = 1
+
+# (gridpoint, window hours, radius km): one set of forecast values that units are matched against.
+View = Tuple[str, int, float]
 
 
 @dataclass
-class DispatchRequest:
-    match: Dict[str, Any]
-    user_preferences: Dict[str, Any]
-
-    def asdict(self) -> Dict[str, Any]:
-        return {"match": self.match, "user_preferences": self.user_preferences}
+class EvaluationStats:
+    due: int = 0
+    triggered: int = 0
+    skipped: int = 0
+    deferred: int = 0
+    units: int = 0
+    deduplicated: int = 0
+    gridpoints_fetched: int = 0
+    tiles_fetched: int = 0
+    chunks: int = 0
+    budget_exhausted: bool = False
+    phase_seconds: Dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Accumulate wall time spent in ``name`` across chunks."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phase_seconds[name] = self.phase_seconds.get(name, 0.0) + time.perf_counter() - started
 
 
 async def evaluate_conditions(
-    session: Session,
+    session: AsyncSession,
     dispatcher,
     *,
     now: Optional[datetime] = None,
     weather_client: Optional[NoaaWeatherClient] = None,
-) -> None:
+    worker_id: Optional[str] = None,
+    stats: Optional[EvaluationStats] = None,
+    fair_share: Optional[FairShare] = None,
+    use_outbox: Optional[bool] = None,
+) -> EvaluationStats:
+    """Stream due alerts through evaluation one leased chunk at a time.
+
+    Chunks are paged by ``(next_evaluation_at, id)`` and each is evaluated and
+    committed on its own, so memory stays flat and a failure only loses the chunk
+    in flight. The cycle stops early once ``evaluation_cycle_budget_seconds`` is
+    spent; the remaining due alerts are picked up next cycle, oldest first.
+    Passing ``stats`` lets a caller watch progress while the cycle runs.
+
+    Each chunk is split across tenants by weighted deficit round robin
+    (``fair_share``; reuse one instance to carry deficits across cycles), and within
+    a tenant alerts are claimed by priority, then oldest ``next_evaluation_at``.
+    Work left over when the budget runs out is picked up next cycle in that order.
+
+    With ``use_outbox`` (default ``dispatch_outbox_enabled``) matches are not sent
+    here: they are written to ``dispatch_outbox`` in the same transaction as their
+    history and alert state, and the outbox relay publishes them.
+    """
     now = now or datetime.now(timezone.utc)
+    stats = stats if stats is not None else EvaluationStats()
     close_client = False
     if weather_client is None:
         weather_client = NoaaWeatherClient()
         close_client = True
 
     due_time = _store_timestamp(now)
-
-    alerts: List[ConditionAlert] = (
-        session.query(ConditionAlert)
-        .filter(
-            ConditionAlert.is_active.is_(True),
-            ConditionAlert.next_evaluation_at <= due_time,
-        )
-        .all()
-    )
-
-    if not alerts:
+    worker_id = worker_id or worker_identity()
+    chunk_size = max(1, settings.evaluation_chunk_size)
+    budget = settings.evaluation_cycle_budget_seconds
+    deadline = time.monotonic() + budget if budget > 0 else None
+    semaphore = asyncio.Semaphore(max(1, settings.forecast_concurrency))
+    fair_share = fair_share if fair_share is not None else FairShare()
+    use_outbox = settings.dispatch_outbox_enabled if use_outbox is None else use_outbox
+    cycle_started = time.perf_counter()
+
+    try:
+        due_count, oldest_due = await due_backlog(session, due_time)
+        due_backlog_alerts.set(due_count)
+        oldest_overdue_seconds.set(max(0.0, (due_time - oldest_due).total_seconds()) if oldest_due else 0.0)
+        with stats.phase("claim"):
+            tenant_counts = await tenant_backlog(session, due_time)
+        _publish_tenant_lag(tenant_counts, due_time)
+        # Counted once per cycle and drawn down as chunks are claimed, not re-counted per chunk.
+        pending = {tenant: count for tenant, (count, _) in tenant_counts.items()}
+        while True:
+            with stats.phase("claim"):
+                quotas = fair_share.allocate(pending, chunk_size)
+                if not quotas:
+                    break
+                alerts = await claim_due_alerts(
+                    session,
+                    worker_id=worker_id,
+                    due_time=due_time,
+                    limit=chunk_size,
+                    quotas=quotas,
+                )
+            if not alerts:
+                break
+            for alert in alerts:
+                tenant = tenant_for(alert)
+                pending[tenant] = max(0, pending.get(tenant, 0) - 1)
+            stats.chunks += 1
+            stats.due += len(alerts)
+            await _evaluate_chunk(session, dispatcher, alerts, now, weather_client, semaphore, stats, use_outbox)
+            if len(alerts) < chunk_size:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                stats.budget_exhausted = True
+                logger.warning(
+                    "Evaluation cycle budget exhausted; remaining due alerts carry over",
+                    evaluated=stats.due,
+                    budget_seconds=budget,
+                )
+                break
+    finally:
         if close_client:
             await weather_client.aclose()
-        return
+    evaluation_cycle_seconds.observe(time.perf_counter() - cycle_started)
+    for phase, seconds in stats.phase_seconds.items():
+        evaluation_phase_seconds.labels(phase=phase).observe(seconds)
+    if stats.units:
+        evaluation_dedup_ratio.set((stats.units + stats.deduplicated) / stats.units)
+    return stats
 
-    semaphore = asyncio.Semaphore(max(1, settings.forecast_concurrency))
-    key_to_alerts: dict[Tuple[int, int], List[ConditionAlert]] = {}
+
+async def _evaluate_chunk(
+    session: AsyncSession,
+    dispatcher,
+    alerts: List[ConditionAlert],
+    now: datetime,
+    weather_client: NoaaWeatherClient,
+    semaphore: asyncio.Semaphore,
+    stats: EvaluationStats,
+    use_outbox: bool = False,
+) -> None:
+    """Evaluate one leased chunk, dispatch its matches and commit the results.
+
+    Alerts stating the same rule on the same gridpoint share one evaluation unit that
+    is matched once and fanned out. Alerts whose window digest and rule match the
+    digest stored at their last non-triggering evaluation are skipped; only their
+    schedule moves.
+    """
+    with stats.phase("resolve"):
+        gridpoints = await _resolve_gridpoints(alerts, weather_client, semaphore)
+
+    key_to_alerts: dict[str, List[ConditionAlert]] = {}
     for alert in alerts:
-        key = _forecast_cache_key(alert.latitude, alert.longitude)
-        key_to_alerts.setdefault(key, []).append(alert)
+        key = gridpoints.get(alert.id)
+        if key:
+            key_to_alerts.setdefault(key, []).append(alert)
 
-    forecast_cache: dict[Tuple[int, int], Optional[List[Dict[str, Any]]]] = {}
+    forecasts: dict[str, Optional[ForecastSeries]] = {}
 
-    async def _fetch_for_key(key: Tuple[int, int], sample: ConditionAlert) -> None:
+    async def _fetch_for_key(key: str, sample: ConditionAlert) -> None:
+        prefetch_tracker.used(key)
         try:
             async with semaphore:
-                periods = await weather_client.fetch_hourly_forecast(sample.latitude, sample.longitude)
-            forecast_cache[key] = periods
+                forecasts[key] = await weather_client.fetch_gridpoint_forecast(Gridpoint.parse(key))
         except Exception as exc:  # pragma: no cover - logged for observability
-            forecast_cache[key] = None
+            forecasts[key] = None
             logger.exception(
                 "Failed to fetch forecast",
                 alert_id=sample.id,
                 user_id=sample.user_id,
+                gridpoint=key,
                 error=str(exc),
             )
 
-    for key, grouped in key_to_alerts.items():
-        sample = grouped[0]
-        await _fetch_for_key(key, sample)
+    tiles: Dict[TileKey, Optional[GridTile]] = {}
 
-    base_next_eval = _store_timestamp(now + timedelta(seconds=settings.scheduler_interval_seconds))
+    async def _fetch_tile(tile_key: TileKey) -> None:
+        try:
+            # Cells take the slots one by one; holding one for the whole tile would not bound them.
+            tiles[tile_key] = await weather_client.fetch_grid_tile(tile_key, now=now, semaphore=semaphore)
+        except Exception as exc:  # pragma: no cover - logged for observability
+            tiles[tile_key] = None
+            logger.warning("Failed to fetch grid tile; using point forecasts", tile=tile_key, error=str(exc))
+
+    gridded = settings.gridded_evaluation_enabled
+    tile_keys = _tiles_needed(alerts, gridpoints) if gridded else set()
+    with stats.phase("fetch"):
+        await asyncio.gather(
+            *(_fetch_for_key(key, grouped[0]) for key, grouped in key_to_alerts.items()),
+            *(_fetch_tile(tile_key) for tile_key in tile_keys),
+        )
+    stats.gridpoints_fetched += sum(1 for series in forecasts.values() if series is not None)
+    stats.tiles_fetched += sum(1 for tile in tiles.values() if tile is not None)
 
+    evaluated_at = _store_timestamp(now)
+    updated_at = datetime.utcnow()
+    state_updates: Dict[int, Dict[str, Any]] = {}
     for alert in alerts:
-        key = _forecast_cache_key(alert.latitude, alert.longitude)
-        periods = forecast_cache.get(key)
-        alert.next_evaluation_at = base_next_eval
-        tenant = _tenant_from_alert(alert)
-        alert_evaluations_total.labels(tenant=tenant).inc()
-        try:
-            if periods is None:
-                alert.apply_update_timestamp()
-                session.add(alert)
-                continue
-            if not _condition_met(alert, periods):
-                alert.apply_update_timestamp()
-                session.add(alert)
+        alert_evaluations_total.labels(tenant=tenant_for(alert)).inc()
+        state_updates[alert.id] = {
+            "id": alert.id,
+            "gridpoint": gridpoints.get(alert.id),
+            "next_evaluation_at": slotted_next_evaluation(
+                alert.id, evaluated_at, settings.scheduler_interval_seconds
+            ),
+            "last_triggered_at": alert.last_triggered_at,
+            "evaluation_digest": alert.evaluation_digest,
+            "updated_at": updated_at,
+            "priority": alert.priority or PRIORITY_NORMAL,
+            "claimed_by": None,
+            "lease_until": None,
+        }
+
+    units = build_units(alerts, gridpoints, gridded=gridded)
+    stats.units += len(units)
+    stats.deduplicated += sum(len(unit.alerts) for unit in units) - len(units)
+    evaluation_units_total.inc(len(units))
+
+    with stats.phase("match"):
+        triggered = _match_units(units, forecasts, state_updates, evaluated_at, stats, tiles)
+
+    with stats.phase("dispatch"):
+        preferences = await _load_user_preferences_bulk(session, {alert.user_id for alert in triggered})
+        dispatches = {alert.id: build_dispatch(alert, now, preferences.get(alert.user_id)) for alert in triggered}
+        if use_outbox:
+            failed_ids: set[int] = set()
+        else:
+            failed_ids = await _send_dispatches(dispatcher, list(dispatches.values()))
+    history_rows: Dict[int, Dict[str, Any]] = {}
+    outbox_rows: Dict[int, Dict[str, Any]] = {}
+    for alert in triggered:
+        if alert.id in failed_ids:
+            continue
+        dispatch = dispatches[alert.id]
+        history_rows[alert.id] = _history_row(alert, dispatch, now)
+        if use_outbox:
+            outbox_rows[alert.id] = outbox_row(dispatch.asdict(), to_utc(now))
+        state = state_updates[alert.id]
+        state["last_triggered_at"] = _store_timestamp(now)
+        cooldown_eval = _store_timestamp(now + timedelta(minutes=cooldown_minutes_for(alert)))
+        if cooldown_eval > state["next_evaluation_at"]:
+            state["next_evaluation_at"] = cooldown_eval
+        stats.triggered += 1
+        alert_matches_total.labels(tenant=tenant_for(alert)).inc()
+        logger.info(
+            "Custom condition triggered",
+            alert_id=alert.id,
+            user_id=alert.user_id,
+            condition=alert.condition_type,
+        )
+
+    with stats.phase("write"):
+        await _write_results(session, state_updates, history_rows, outbox_rows)
+
+
+def _match_units(
+    units: List[EvaluationUnit],
+    forecasts: Dict[str, Optional[ForecastSeries]],
+    state_updates: Dict[int, Dict[str, Any]],
+    evaluated_at: datetime,
+    stats: EvaluationStats,
+    tiles: Optional[Dict[TileKey, Optional[GridTile]]] = None,
+) -> List[ConditionAlert]:
+    """Return the triggered alerts, recording digests and deferrals in ``state_updates``.
+
+    Units with a radius are matched on the extremes over every grid cell in it when
+    all covering tiles were fetched, and on the point forecast otherwise.
+    """
+    # Stale fallbacks can start hours back; only the hours still ahead are matched.
+    forecasts = {
+        gridpoint: series.window(len(series), now=evaluated_at) if series is not None else None
+        for gridpoint, series in forecasts.items()
+    }
+    window_digests: Dict[View, str] = {}
+    area_summaries: Dict[View, WindowSummary] = {}
+    changed_units: Dict[View, List[EvaluationUnit]] = {}
+    for unit in units:
+        series = forecasts.get(unit.key.gridpoint)
+        if series is None:
+            continue
+        view = (unit.key.gridpoint, unit.key.window_hours, unit.key.radius_km)
+        if view not in window_digests:
+            window_digests[view] = _view_digest(view, series, tiles or {}, area_summaries)
+        digest = _evaluation_digest(unit.key, window_digests[view])
+        changed: List[ConditionAlert] = []
+        for alert in unit.alerts:
+            if alert.evaluation_digest == digest:
+                stats.skipped += 1
+                alert_evaluations_skipped_total.labels(tenant=tenant_for(alert)).inc()
                 continue
-            dispatch = _build_dispatch(session, alert, now)
-            await dispatcher.send(dispatch.asdict())
-            _record_history(session, alert, dispatch, now)
-            alert.last_triggered_at = _store_timestamp(now)
-            cooldown_minutes = _cooldown_minutes(alert)
-            cooldown_eval = _store_timestamp(now + timedelta(minutes=cooldown_minutes))
-            if cooldown_eval > alert.next_evaluation_at:
-                alert.next_evaluation_at = cooldown_eval
-            alert.apply_update_timestamp()
-            session.add(alert)
-            alert_matches_total.labels(tenant=tenant).inc()
-            logger.info(
-                "Custom condition triggered",
+            state_updates[alert.id]["evaluation_digest"] = digest
+            changed.append(alert)
+        if changed:
+            changed_units.setdefault(view, []).append(EvaluationUnit(key=unit.key, alerts=changed))
+
+    # Each unit is matched once through its representative and fanned out to its subscribers.
+    triggered: List[ConditionAlert] = []
+    for view, view_units in changed_units.items():
+        gridpoint, window_hours, _ = view
+        series = forecasts[gridpoint]
+        threshold_units = []
+        for unit in view_units:
+            if unit.key.condition_type != COMPOUND:
+                threshold_units.append(unit)
+            elif compile_rule(unit.representative.rule or "").matches(series, window_hours):
+                triggered.extend(unit.alerts)
+        if not threshold_units:
+            continue
+        summary = area_summaries.get(view) or WindowSummary.from_series(series, window_hours)
+        by_representative = {unit.representative.id: unit for unit in threshold_units}
+        index = ThresholdIndex(unit.representative for unit in threshold_units)
+        for representative in index.triggered(summary):
+            triggered.extend(by_representative[representative.id].alerts)
+
+    triggered_ids = {alert.id for alert in triggered}
+    for alert in triggered:
+        # A match must be re-checked once its cooldown ends even if the forecast is unchanged.
+        state_updates[alert.id]["evaluation_digest"] = None
+        state_updates[alert.id]["priority"] = PRIORITY_IMMINENT
+
+    profiles: Dict[Tuple[str, int], HorizonProfile] = {}
+    for unit in units:
+        series = forecasts.get(unit.key.gridpoint)
+        pending = [alert for alert in unit.alerts if alert.id not in triggered_ids]
+        if series is None or not pending:
+            continue
+        view = (unit.key.gridpoint, unit.key.window_hours)
+        if view not in profiles:
+            profiles[view] = HorizonProfile(series, unit.key.window_hours)
+        # Alerts forecast to cross soon are claimed ahead of the rest when a cycle overruns.
+        crossing = first_crossing_hour(unit.representative, profiles[view])
+        imminent = crossing is not None and crossing < settings.scheduler_imminent_hours
+        for alert in pending:
+            state_updates[alert.id]["priority"] = PRIORITY_IMMINENT if imminent else PRIORITY_NORMAL
+        # Deferral extrapolates the point forecast, which says nothing about the rest of a radius.
+        if settings.predictive_scheduling_enabled and not unit.key.radius_km:
+            deferral = predictive_deferral(unit.representative, profiles[view])
+            for alert in pending:
+                state_updates[alert.id]["next_evaluation_at"] = slotted_next_evaluation(
+                    alert.id, evaluated_at, deferral.seconds
+                )
+                if deferral.seconds > settings.scheduler_interval_seconds:
+                    stats.deferred += 1
+
+    return triggered
+
+
+async def _resolve_gridpoints(
+    alerts: List[ConditionAlert],
+    weather_client: NoaaWeatherClient,
+    semaphore: asyncio.Semaphore,
+) -> Dict[int, str]:
+    """Map alert ids to gridpoint keys, resolving alerts that have not been resolved yet."""
+    resolved = {alert.id: alert.gridpoint for alert in alerts if alert.gridpoint}
+
+    async def _resolve(alert: ConditionAlert) -> None:
+        try:
+            async with semaphore:
+                gridpoint = await weather_client.resolve_gridpoint(alert.latitude, alert.longitude)
+        except Exception as exc:  # pragma: no cover - logged for observability
+            logger.exception(
+                "Failed to resolve gridpoint",
                 alert_id=alert.id,
                 user_id=alert.user_id,
-                condition=alert.condition_type,
+                error=str(exc),
             )
+            return
+        resolved[alert.id] = gridpoint.key
+
+    await asyncio.gather(*(_resolve(alert) for alert in alerts if not alert.gridpoint))
+    return resolved
+
+
+async def _send_dispatches(dispatcher, dispatches: List[DispatchRequest]) -> set[int]:
+    """Send dispatches, returning the subscription ids whose delivery failed.
+
+    Dispatchers exposing ``send_batch`` get the whole batch at once; others (dry-run
+    and test doubles) are sent one message at a time.
+    """
+    payloads = [dispatch.asdict() for dispatch in dispatches]
+    failed: set[int] = set()
+    send_batch = getattr(dispatcher, "send_batch", None)
+    if send_batch is not None:
+        for failure in await send_batch(payloads):
+            failed.add(failure.payload["match"]["subscription_id"])
+            logger.warning(
+                "Failed to dispatch condition alert; will retry next cycle",
+                alert_id=failure.payload["match"]["subscription_id"],
+                error=str(failure.error),
+            )
+        return failed
+    for payload in payloads:
+        try:
+            await dispatcher.send(payload)
         except Exception as exc:  # pragma: no cover - logged for observability
-            logger.exception("Failed to evaluate condition", alert_id=alert.id, error=str(exc))
-
-    session.commit()
-
-    if close_client:
-        await weather_client.aclose()
+            failed.add(payload["match"]["subscription_id"])
+            logger.exception(
+                "Failed to dispatch condition alert; will retry next cycle",
+                alert_id=payload["match"]["subscription_id"],
+                error=str(exc),
+            )
+    return failed
 
 
-def _to_utc(dt: datetime) -> datetime:
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt.astimezone(timezone.utc)
+def _tiles_needed(alerts: Iterable[ConditionAlert], gridpoints: Dict[int, str]) -> set[TileKey]:
+    needed: set[TileKey] = set()
+    for alert in alerts:
+        gridpoint = gridpoints.get(alert.id)
+        key = unit_key(alert, gridpoint, gridded=True) if gridpoint else None
+        if key is None or not key.radius_km:
+            continue
+        point = Gridpoint.parse(gridpoint)
+        needed.update(tiles_for(point.office, point.grid_x, point.grid_y, key.radius_km))
+    return needed
+
+
+def _view_digest(
+    view: View,
+    series: ForecastSeries,
+    tiles: Dict[TileKey, Optional[GridTile]],
+    area_summaries: Dict[View, WindowSummary],
+) -> str:
+    gridpoint, window_hours, radius_km = view
+    if radius_km:
+        point = Gridpoint.parse(gridpoint)
+        rain = bool(series.window(window_hours).rain.any())
+        summary = area_summary(tiles, point.office, point.grid_x, point.grid_y, radius_km, window_hours, rain)
+        if summary is not None:
+            # Threshold rules only depend on the area extremes, so those are the digest.
+            area_summaries[view] = summary
+            return hashlib.blake2b(repr(summary).encode("utf-8"), digest_size=16).hexdigest()
+    return series.window_digest(window_hours)
+
+
+def _evaluation_digest(key: UnitKey, window_digest: str) -> str:
+    definition = f"{key.condition_type}|{key.comparison}|{key.threshold!r}|{key.window_hours}"
+    if key.radius_km:
+        definition += f"|{key.radius_km!r}"
+    return hashlib.blake2b(f"{window_digest}|{definition}".encode("utf-8"), digest_size=16).hexdigest()
 
 
 def _store_timestamp(dt: datetime) -> datetime:
-    return _to_utc(dt).replace(tzinfo=None)
-
-
-def _cooldown_minutes(alert: ConditionAlert) -> int:
-    metadata = alert.metadata_json or {}
-    value = metadata.get("cooldown_minutes")
-    if isinstance(value, (int, float)) and value >= 0:
-        return int(value)
-    return settings.cooldown_minutes_default
-
-
-def _condition_met(alert: ConditionAlert, periods: Iterable[Dict[str, Any]]) -> bool:
-    window = settings.evaluation_window_hours
-    sliced = list(periods)[:window]
-    comparison = (alert.comparison or "above").lower()
-    threshold = alert.threshold_value or 0.0
-
-    if alert.condition_type == "temperature_hot" or alert.condition_type == "temperature_cold":
-        for period in sliced:
-            temp = period.get("temperature")
-            if temp is None:
-                continue
-            unit = str(period.get("temperatureUnit", "F")).upper()
-            temp_f = float(temp)
-            if unit.startswith("C"):
-                temp_f = (temp_f * 9 / 5) + 32
-            if alert.condition_type == "temperature_hot":
-                if temp_f >= threshold:
-                    return True
-            else:
-                if temp_f <= threshold:
-                    return True
-        return False
-
-    if alert.condition_type == "precipitation":
-        for period in sliced:
-            probability = _extract_precip_probability(period)
-            forecast_text = str(period.get("shortForecast", "")).lower()
-            if probability is not None and probability >= threshold:
-                return True
-            if "rain" in forecast_text or "showers" in forecast_text:
-                return True
-        return False
-
-    if alert.condition_type == "wind":
-        for period in sliced:
-            speed = _parse_wind_speed(period.get("windSpeed"))
-            if speed is None:
-                continue
-            if comparison == "above" and speed >= threshold:
-                return True
-            if comparison == "below" and speed <= threshold:
-                return True
-        return False
-
-    return False
-
-
-def _extract_precip_probability(period: Dict[str, Any]) -> Optional[float]:
-    probability = period.get("probabilityOfPrecipitation")
-    if isinstance(probability, dict):
-        value = probability.get("value")
-        if isinstance(value, (int, float)):
-            return float(value)
-    if isinstance(probability, (int, float)):
-        return float(probability)
-    return None
-
-
-def _parse_wind_speed(value: Any) -> Optional[float]:
-    if not value:
-        return None
-    if isinstance(value, (int, float)):
-        return float(value)
-    matches = re.findall(r"\d+(?:\.\d+)?", str(value))
-    if not matches:
-        return None
-    numbers = [float(m) for m in matches]
-    return max(numbers) if numbers else None
-
-
-def _build_dispatch(session: Session, alert: ConditionAlert, now: datetime) -> DispatchRequest:
-    preferences = _load_user_preferences(session, alert.user_id)
-    channels = preferences.get("channels", {}).copy()
-    overrides = alert.channel_overrides or {}
-    channels.update(overrides)
-    if not channels:
-        channels = {"push": True}
-
-    user_preferences = {
-        "channels": channels,
-        "quiet_hours": preferences.get("quiet_hours"),
-        "severity_filter": preferences.get("severity_filter"),
-    }
-
-    current = _to_utc(now)
-    match_payload = {
-        "alert_id": f"condition-{alert.id}-{int(current.timestamp())}",
-        "user_id": alert.user_id,
-        "event": alert.label,
-        "severity": "info",
-        "sent": current.isoformat(),
-        "subscription_id": alert.id,
-        "match_score": 1.0,
-        "condition_type": alert.condition_type,
-        "latitude": alert.latitude,
-        "longitude": alert.longitude,
-        "radius_km": alert.radius_km,
-    }
-
-    return DispatchRequest(match=match_payload, user_preferences=user_preferences)
-
-
-def _load_user_preferences(session: Session, user_id: str) -> Dict[str, Any]:
-    stmt = select(UserPreference).where(UserPreference.user_id == user_id)
-    pref = session.execute(stmt).scalar_one_or_none()
-    if pref is None:
-        return {"channels": {"push": True}}
+    return to_utc(dt).replace(tzinfo=None)
+
+
+async def _load_user_preferences_bulk(session: AsyncSession, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch preferences for many users with one ``IN`` query per chunk."""
+    ids = sorted(user_ids)
+    preferences: Dict[str, Dict[str, Any]] = {}
+    chunk_size = max(1, settings.evaluation_write_chunk_size)
+    for offset in range(0, len(ids), chunk_size):
+        stmt = select(UserPreference).where(UserPreference.user_id.in_(ids[offset : offset + chunk_size]))
+        for pref in (await session.execute(stmt)).scalars():
+            preferences[pref.user_id] = {
+                "channels": pref.channels or {},
+                "quiet_hours": getattr(pref, "quiet_hours", None),
+                "severity_filter": getattr(pref, "severity_filter", None),
+            }
+    return preferences
+
+
+def _history_row(alert: ConditionAlert, dispatch: DispatchRequest, now: datetime) -> Dict[str, Any]:
+    match_payload = dispatch.match.copy()
+    channels = _normalize_channels(dispatch.user_preferences.get("channels", {}))
+    summary = AlertDeliveryHistory.build_summary(match_payload)
     return {
-        "channels": pref.channels or {},
-        "quiet_hours": getattr(pref, "quiet_hours", None),
-        "severity_filter": getattr(pref, "severity_filter", None),
+        "user_id": alert.user_id,
+        "source": "custom",
+        "source_id": str(match_payload.get("alert_id") or alert.id),
+        "title": match_payload.get("event") or alert.label,
+        "summary": summary or alert.label,
+        "severity": (match_payload.get("severity") or "info").lower(),
+        "channels": channels,
+        "triggered_at": to_utc(now),
+        "payload": match_payload,
     }
 
 
-def _record_history(session: Session, alert: ConditionAlert, dispatch: DispatchRequest, now: datetime) -> None:
-    match_payload = dispatch.match.copy()
-    channels = _normalize_channels(dispatch.user_preferences.get("channels", {}))
-    triggered_at = _to_utc(now)
-    summary = AlertDeliveryHistory.build_summary(match_payload)
-    title = match_payload.get("event") or alert.label
-    history = AlertDeliveryHistory(
-        user_id=alert.user_id,
-        source="custom",
-        source_id=str(match_payload.get("alert_id") or alert.id),
-        title=title,
-        summary=summary or alert.label,
-        severity=(match_payload.get("severity") or "info").lower(),
-        channels=channels,
-        triggered_at=triggered_at,
-        payload=match_payload,
-    )
-    session.add(history)
+async def _write_results(
+    session: AsyncSession,
+    state_updates: Dict[int, Dict[str, Any]],
+    history_rows: Dict[int, Dict[str, Any]],
+    outbox_rows: Optional[Dict[int, Dict[str, Any]]] = None,
+) -> None:
+    """Persist alert state and history with bulk statements, committing in bounded chunks.
+
+    Rows are keyed by alert id and chunked by alert, so an alert's state, history
+    and outbox row always land in the same commit; a crash between commits never
+    leaves history without the ``last_triggered_at`` that goes with it.
+    """
+    outbox_rows = outbox_rows or {}
+    alert_ids = list(state_updates)
+    chunk_size = max(1, settings.evaluation_write_chunk_size)
+    for offset in range(0, len(alert_ids), chunk_size):
+        ids = alert_ids[offset : offset + chunk_size]
+        history = [history_rows[alert_id] for alert_id in ids if alert_id in history_rows]
+        outbox = [outbox_rows[alert_id] for alert_id in ids if alert_id in outbox_rows]
+        await session.execute(update(ConditionAlert), [state_updates[alert_id] for alert_id in ids])
+        if history:
+            await session.execute(insert(AlertDeliveryHistory), history)
+        if outbox:
+            await session.execute(insert(DispatchOutbox), outbox)
+        await session.commit()
 
 
 def _normalize_channels(channels: Dict[str, Any]) -> Dict[str, bool]:
@@ -284,19 +558,8 @@ def _normalize_channels(channels: Dict[str, Any]) -> Dict[str, bool]:
     return sanitized
 
 
-def _tenant_from_alert(alert: ConditionAlert) -> str:
-    metadata = alert.metadata_json or {}
-    tenant = metadata.get("tenant_id")
-    if isinstance(tenant, str) and tenant:
-        return tenant
-    return "default"
-
+def _publish_tenant_lag(backlog: Dict[str, Tuple[int, datetime]], due_time: datetime) -> None:
+    tenant_oldest_overdue_seconds.clear()
+    for tenant, (_, oldest) in backlog.items():
+        tenant_oldest_overdue_seconds.labels(tenant=tenant).set(max(0.0, (due_time - oldest).total_seconds()))
 
-def _forecast_cache_key(latitude: float, longitude: float) -> Tuple[int, int]:
-    precision = settings.forecast_cache_precision
-    if precision <= 0:
-        return (int(round(latitude * 10000)), int(round(longitude * 10000)))
-    scale = 1.0 / precision
-    lat_key = int(round(latitude * scale))
-    lon_key = int(round(longitude * scale))
-    return (lat_key, lon_key)
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from typing import Dict, Mapping, Optional
+
+from .config import settings
+
+DEFAULT_TENANT = "default"
+
+
+class FairShare:
+    """Deficit round robin over tenants, weighted by ``tenant_weights``.
+
+    Each chunk's capacity is split between tenants with due work in proportion to
+    their weight; a tenant with less work than its share hands the rest to the
+    others. Fractional shares accumulate as deficit, so small tenants still get
+    their turn when chunks are smaller than the number of tenants. Deficits are
+    kept across chunks and, when the instance is reused, across cycles.
+    """
+
+    def __init__(self, weights: Optional[Mapping[str, float]] = None) -> None:
+        self._weights = dict(weights if weights is not None else settings.tenant_weights)
+        self._deficit: Dict[str, float] = {}
+
+    def weight(self, tenant: str) -> float:
+        return max(0.0, float(self._weights.get(tenant, 1.0)))
+
+    def allocate(self, backlog: Mapping[str, int], capacity: int) -> Dict[str, int]:
+        """Return how many due alerts to claim from each tenant in the next chunk."""
+        pending = {tenant: count for tenant, count in backlog.items() if count > 0 and self.weight(tenant) > 0}
+        for tenant in list(self._deficit):
+            if tenant not in pending:
+                # As in DRR, an idle queue does not bank credit.
+                del self._deficit[tenant]
+        quotas: Dict[str, int] = {}
+        remaining = capacity
+        while remaining > 0 and pending:
+            total_weight = sum(self.weight(tenant) for tenant in pending)
+            round_capacity = remaining
+            for tenant in sorted(pending):
+                deficit = self._deficit.get(tenant, 0.0) + round_capacity * self.weight(tenant) / total_weight
+                take = min(int(deficit), pending[tenant], remaining)
+                if take:
+                    quotas[tenant] = quotas.get(tenant, 0) + take
+                    pending[tenant] -= take
+                    remaining -= take
+                    deficit -= take
+                self._deficit[tenant] = deficit
+                if pending[tenant] == 0:
+                    del pending[tenant]
+                    self._deficit.pop(tenant, None)
+        return quotas
@@ -0,0 +1,292 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+
+_KMH_TO_MPH = 0.621371
+_MS_TO_MPH = 2.236936
+_MAX_GRID_HOURS = 240
+_DURATION_RE = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?)?$")
+
+# ForecastSeries column -> NOAA gridpoint raw data layer.
+_GRID_LAYERS = {
+    "temperature_f": "temperature",
+    "precip_probability": "probabilityOfPrecipitation",
+    "wind_mph": "windSpeed",
+    "humidity": "relativeHumidity",
+}
+
+
+@dataclass(frozen=True)
+class ForecastSeries:
+    """Hourly forecast for one gridpoint, stored column-wise and indexed by hour.
+
+    Built once per fetch from NOAA's period dicts so evaluation never has to
+    re-parse units, probabilities or wind speed strings. Missing values are NaN.
+    """
+
+    start_times: np.ndarray
+    short_forecasts: Tuple[str, ...]
+    temperature_f: np.ndarray
+    precip_probability: np.ndarray
+    wind_mph: np.ndarray
+    rain: np.ndarray
+    humidity: np.ndarray
+
+    @classmethod
+    def from_periods(cls, periods: Iterable[Mapping[str, Any]]) -> "ForecastSeries":
+        items = list(periods)
+        size = len(items)
+        start_times = np.zeros(size, dtype="datetime64[s]")
+        temperature = np.full(size, np.nan, dtype=np.float32)
+        precip = np.full(size, np.nan, dtype=np.float32)
+        wind = np.full(size, np.nan, dtype=np.float32)
+        humidity = np.full(size, np.nan, dtype=np.float32)
+        rain = np.zeros(size, dtype=bool)
+        short_forecasts = []
+        for index, period in enumerate(items):
+            start_times[index] = _parse_start_time(period.get("startTime"))
+            temp_f = _temperature_f(period)
+            if temp_f is not None:
+                temperature[index] = temp_f
+            probability = _extract_precip_probability(period)
+            if probability is not None:
+                precip[index] = probability
+            speed = _parse_wind_speed(period.get("windSpeed"))
+            if speed is not None:
+                wind[index] = speed
+            relative_humidity = _quantity_value(period.get("relativeHumidity"))
+            if relative_humidity is not None:
+                humidity[index] = relative_humidity
+            text = str(period.get("shortForecast") or "")
+            lowered = text.lower()
+            rain[index] = "rain" in lowered or "showers" in lowered
+            short_forecasts.append(sys.intern(text))
+        return cls(
+            start_times=start_times,
+            short_forecasts=tuple(short_forecasts),
+            temperature_f=temperature,
+            precip_probability=precip,
+            wind_mph=wind,
+            rain=rain,
+            humidity=humidity,
+        )
+
+    @classmethod
+    def from_grid_layers(cls, properties: Mapping[str, Any]) -> "ForecastSeries":
+        """Expand NOAA gridpoint raw data layers onto an hourly axis.
+
+        Raw layers list values with ISO 8601 ``validTime`` intervals
+        (``2024-04-01T12:00:00+00:00/PT3H``); each value is repeated over the hours
+        it covers. Raw data carries no forecast text, so ``rain`` is always False.
+        """
+        layers = {
+            column: _layer_intervals(properties.get(layer))
+            for column, layer in _GRID_LAYERS.items()
+        }
+        starts = [start for intervals in layers.values() for start, _, _ in intervals]
+        if not starts:
+            return cls.from_periods([])
+        origin = min(starts)
+        end = max(start + hours for intervals in layers.values() for start, hours, _ in intervals)
+        size = min(_MAX_GRID_HOURS, end - origin)
+        columns = {column: np.full(size, np.nan, dtype=np.float32) for column in _GRID_LAYERS}
+        for column, intervals in layers.items():
+            for start, hours, value in intervals:
+                offset = start - origin
+                if offset < size:
+                    columns[column][offset : offset + hours] = value
+        start_times = (np.datetime64(origin, "h") + np.arange(size)).astype("datetime64[s]")
+        return cls(
+            start_times=start_times,
+            short_forecasts=("",) * size,
+            temperature_f=columns["temperature_f"],
+            precip_probability=columns["precip_probability"],
+            wind_mph=columns["wind_mph"],
+            rain=np.zeros(size, dtype=bool),
+            humidity=columns["humidity"],
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: Mapping[str, np.ndarray]) -> "ForecastSeries":
+        size = len(arrays["temperature_f"])
+        # Archives written before humidity was tracked have no column for it.
+        humidity = arrays["humidity"] if "humidity" in arrays else np.full(size, np.nan, dtype=np.float32)
+        return cls(
+            start_times=np.asarray(arrays["start_times"], dtype="datetime64[s]"),
+            short_forecasts=tuple(sys.intern(str(text)) for text in arrays["short_forecasts"]),
+            temperature_f=np.asarray(arrays["temperature_f"], dtype=np.float32),
+            precip_probability=np.asarray(arrays["precip_probability"], dtype=np.float32),
+            wind_mph=np.asarray(arrays["wind_mph"], dtype=np.float32),
+            rain=np.asarray(arrays["rain"], dtype=bool),
+            humidity=np.asarray(humidity, dtype=np.float32),
+        )
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "start_times": self.start_times,
+            "short_forecasts": np.array(self.short_forecasts, dtype=str),
+            "temperature_f": self.temperature_f,
+            "precip_probability": self.precip_probability,
+            "wind_mph": self.wind_mph,
+            "rain": self.rain,
+            "humidity": self.humidity,
+        }
+
+    def __len__(self) -> int:
+        return int(self.temperature_f.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.start_times, *self._metric_arrays())
+        return sum(array.nbytes for array in arrays) + 8 * len(self.short_forecasts)
+
+    def window(self, hours: int, now: Optional[datetime] = None) -> "ForecastSeries":
+        """Return a view over the first ``hours`` hours without copying the arrays.
+
+        With ``now``, hours that have already ended are dropped first, so a stale
+        cached forecast is windowed from the current hour rather than its first one.
+        """
+        start = self._first_upcoming(now) if now is not None else 0
+        stop = start + hours
+        return ForecastSeries(
+            start_times=self.start_times[start:stop],
+            short_forecasts=self.short_forecasts[start:stop],
+            temperature_f=self.temperature_f[start:stop],
+            precip_probability=self.precip_probability[start:stop],
+            wind_mph=self.wind_mph[start:stop],
+            rain=self.rain[start:stop],
+            humidity=self.humidity[start:stop],
+        )
+
+    def _first_upcoming(self, now: datetime) -> int:
+        if now.tzinfo is not None:
+            now = now.astimezone(timezone.utc).replace(tzinfo=None)
+        # Periods are chronological; NaT start times compare False and are kept.
+        ended = self.start_times + np.timedelta64(1, "h") <= np.datetime64(now, "s")
+        return int(ended.size if ended.all() else np.argmin(ended))
+
+    def window_digest(self, hours: int) -> str:
+        """Stable digest of the metric values in the first ``hours`` hours."""
+        window = self.window(hours)
+        digest = hashlib.blake2b(digest_size=16)
+        for array in window._metric_arrays():
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def _metric_arrays(self) -> Tuple[np.ndarray, ...]:
+        return (self.temperature_f, self.precip_probability, self.wind_mph, self.rain, self.humidity)
+
+    def preview(self, periods: int) -> list[Dict[str, Any]]:
+        summary = []
+        for index in range(min(periods, len(self))):
+            temperature = self.temperature_f[index]
+            summary.append({
+                "start_time": _format_start_time(self.start_times[index]),
+                "short_forecast": self.short_forecasts[index] or None,
+                "temperature": None if np.isnan(temperature) else round(float(temperature), 1),
+                "temperature_unit": None if np.isnan(temperature) else "F",
+            })
+        return summary
+
+
+def _parse_start_time(value: Any) -> np.datetime64:
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return np.datetime64("NaT")
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return np.datetime64(parsed, "s")
+    return np.datetime64("NaT")
+
+
+def _format_start_time(value: np.datetime64) -> Optional[str]:
+    if np.isnat(value):
+        return None
+    return f"{np.datetime_as_string(value, unit='s')}+00:00"
+
+
+def _temperature_f(period: Mapping[str, Any]) -> Optional[float]:
+    temp = period.get("temperature")
+    if temp is None:
+        return None
+    unit = str(period.get("temperatureUnit", "F")).upper()
+    temp_f = float(temp)
+    if unit.startswith("C"):
+        temp_f = (temp_f * 9 / 5) + 32
+    return temp_f
+
+
+def _extract_precip_probability(period: Mapping[str, Any]) -> Optional[float]:
+    return _quantity_value(period.get("probabilityOfPrecipitation"))
+
+
+def _quantity_value(quantity: Any) -> Optional[float]:
+    """Read a NOAA quantity (``{"unitCode": ..., "value": ...}``) or a bare number."""
+    if isinstance(quantity, dict):
+        value = quantity.get("value")
+        if isinstance(value, (int, float)):
+            return float(value)
+    if isinstance(quantity, (int, float)):
+        return float(quantity)
+    return None
+
+
+def _parse_wind_speed(value: Any) -> Optional[float]:
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    matches = re.findall(r"\d+(?:\.\d+)?", str(value))
+    if not matches:
+        return None
+    speed = max(float(m) for m in matches)
+    if "km" in str(value).lower():
+        speed *= _KMH_TO_MPH
+    return speed
+
+
+def _layer_intervals(layer: Any) -> list[Tuple[int, int, float]]:
+    """Return ``(start hour since epoch, hours, value)`` for each value of a raw layer."""
+    if not isinstance(layer, Mapping):
+        return []
+    uom = str(layer.get("uom") or "")
+    intervals = []
+    for item in layer.get("values") or []:
+        value = item.get("value") if isinstance(item, Mapping) else None
+        if not isinstance(value, (int, float)):
+            continue
+        start_text, _, duration = str(item.get("validTime") or "").partition("/")
+        start = _parse_start_time(start_text)
+        hours = _duration_hours(duration)
+        if np.isnat(start) or hours is None:
+            continue
+        hour = int(start.astype("datetime64[h]").astype(np.int64))
+        intervals.append((hour, hours, _convert_grid_value(float(value), uom)))
+    return intervals
+
+
+def _duration_hours(duration: str) -> Optional[int]:
+    match = _DURATION_RE.match(duration)
+    if match is None or not any(match.groups()):
+        return None
+    days, hours, minutes = (int(group or 0) for group in match.groups())
+    return max(1, days * 24 + hours + (1 if minutes else 0))
+
+
+def _convert_grid_value(value: float, uom: str) -> float:
+    if uom.endswith("degC"):
+        return value * 9 / 5 + 32
+    if uom.endswith("km_h-1"):
+        return value * _KMH_TO_MPH
+    if uom.endswith("m_s-1"):
+        return value * _MS_TO_MPH
+    return value
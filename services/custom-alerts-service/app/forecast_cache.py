@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+import numpy as np
+from loguru import logger
+
+from .config import settings
+from .forecast import ForecastSeries
+from .metrics import forecast_cache_bytes, forecast_cache_hit_ratio, forecast_cache_requests_total
+
+_MAX_AGE_RE = re.compile(r"(?:^|,)\s*(?:s-maxage|max-age)\s*=\s*(\d+)", re.IGNORECASE)
+
+
+@dataclass
+class CachedForecast:
+    series: ForecastSeries
+    expires_at: datetime
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    size_bytes: int = 0
+
+    def is_fresh(self, now: datetime) -> bool:
+        return now < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def expiry_from_headers(headers: Mapping[str, str], now: datetime) -> datetime:
+    """Derive an absolute expiry from ``Cache-Control`` (preferred) or ``Expires``."""
+    cache_control = headers.get("cache-control", "")
+    lowered = cache_control.lower()
+    if "no-store" in lowered or "no-cache" in lowered:
+        return now
+    match = _MAX_AGE_RE.search(cache_control)
+    if match:
+        return now + timedelta(seconds=int(match.group(1)))
+    expires = headers.get("expires")
+    if expires:
+        try:
+            parsed = parsedate_to_datetime(expires)
+        except (TypeError, ValueError):
+            parsed = None
+        if parsed is not None:
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return parsed
+    return now + timedelta(seconds=settings.forecast_cache_default_ttl_seconds)
+
+
+class ForecastCache:
+    """Process-wide LRU cache of hourly forecasts keyed by NOAA gridpoint.
+
+    Entries are bounded by an approximate byte budget and can optionally be
+    mirrored to a local directory so a restarted process can revalidate instead
+    of downloading every forecast again. The ``a``-prefixed methods do that disk
+    I/O in a worker thread and are the ones to use from the event loop.
+    """
+
+    def __init__(self, *, max_bytes: Optional[int] = None, directory: Optional[str] = None) -> None:
+        self._max_bytes = max_bytes if max_bytes is not None else settings.forecast_cache_max_bytes
+        self._directory = Path(directory) if directory else None
+        self._entries: "OrderedDict[str, CachedForecast]" = OrderedDict()
+        self._points: "OrderedDict[tuple[float, float], str]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._lookups = 0
+        if self._directory is not None:
+            self._directory.mkdir(parents=True, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def lookup(self, key: str, now: datetime) -> Optional[CachedForecast]:
+        """Return the entry for ``key`` (fresh or stale) and record hit/miss stats."""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load_from_disk(key)
+        else:
+            self._entries.move_to_end(key)
+        fresh = entry is not None and entry.is_fresh(now)
+        self._record("hit" if fresh else "miss")
+        return entry
+
+    async def alookup(self, key: str, now: datetime) -> Optional[CachedForecast]:
+        """:meth:`lookup` for event-loop callers; a disk read runs in a worker thread."""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = await self._aload_from_disk(key)
+        else:
+            self._entries.move_to_end(key)
+        fresh = entry is not None and entry.is_fresh(now)
+        self._record("hit" if fresh else "miss")
+        return entry
+
+    def peek(self, key: str) -> Optional[CachedForecast]:
+        """Return the entry for ``key`` without touching LRU order or hit/miss stats."""
+        entry = self._entries.get(key)
+        return entry if entry is not None else self._load_from_disk(key)
+
+    async def apeek(self, key: str) -> Optional[CachedForecast]:
+        entry = self._entries.get(key)
+        return entry if entry is not None else await self._aload_from_disk(key)
+
+    def store(self, key: str, entry: CachedForecast) -> None:
+        self._insert(key, entry)
+        self._write_to_disk(key, entry)
+
+    async def astore(self, key: str, entry: CachedForecast) -> None:
+        self._insert(key, entry)
+        if self._directory is not None:
+            await asyncio.to_thread(self._write_to_disk, key, entry)
+
+    def revalidated(self, key: str, entry: CachedForecast, expires_at: datetime) -> None:
+        self._mark_revalidated(key, entry, expires_at)
+        self._write_to_disk(key, entry)
+
+    async def arevalidated(self, key: str, entry: CachedForecast, expires_at: datetime) -> None:
+        self._mark_revalidated(key, entry, expires_at)
+        if self._directory is not None:
+            await asyncio.to_thread(self._write_to_disk, key, entry)
+
+    def _mark_revalidated(self, key: str, entry: CachedForecast, expires_at: datetime) -> None:
+        entry.expires_at = expires_at
+        forecast_cache_requests_total.labels(result="revalidated").inc()
+        self._insert(key, entry)
+
+    def remember_point(self, latitude: float, longitude: float, gridpoint_key: str) -> None:
+        point = (round(latitude, 4), round(longitude, 4))
+        self._points[point] = gridpoint_key
+        self._points.move_to_end(point)
+        while len(self._points) > settings.forecast_cache_max_points:
+            self._points.popitem(last=False)
+
+    def gridpoint_for(self, latitude: float, longitude: float) -> Optional[str]:
+        return self._points.get((round(latitude, 4), round(longitude, 4)))
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._points.clear()
+        self._bytes = 0
+        self._hits = 0
+        self._lookups = 0
+        forecast_cache_bytes.set(0)
+
+    def _insert(self, key: str, entry: CachedForecast) -> None:
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size_bytes
+        self._entries[key] = entry
+        self._bytes += entry.size_bytes
+        while self._bytes > self._max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size_bytes
+        forecast_cache_bytes.set(self._bytes)
+
+    def _record(self, result: str) -> None:
+        self._lookups += 1
+        if result == "hit":
+            self._hits += 1
+        forecast_cache_requests_total.labels(result=result).inc()
+        forecast_cache_hit_ratio.set(self._hits / self._lookups)
+
+    def _path_for(self, key: str) -> Optional[Path]:
+        if self._directory is None:
+            return None
+        safe = re.sub(r"[^A-Za-z0-9_-]", "_", key)
+        return self._directory / f"{safe}.npz"
+
+    def _write_to_disk(self, key: str, entry: CachedForecast) -> None:
+        path = self._path_for(key)
+        if path is None:
+            return
+        meta = {
+            "key": key,
+            "expires_at": entry.expires_at.isoformat(),
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+        }
+        tmp_path = path.with_suffix(".tmp")
+        try:
+            with tmp_path.open("wb") as handle:
+                np.savez(handle, meta=np.array(json.dumps(meta)), **entry.series.to_arrays())
+            os.replace(tmp_path, path)
+        except OSError as exc:  # pragma: no cover - disk persistence is best effort
+            logger.warning("Unable to persist forecast cache entry", key=key, error=str(exc))
+
+    def _load_from_disk(self, key: str) -> Optional[CachedForecast]:
+        entry = self._read_from_disk(key)
+        if entry is not None:
+            self._insert(key, entry)
+        return entry
+
+    async def _aload_from_disk(self, key: str) -> Optional[CachedForecast]:
+        if self._directory is None:
+            return None
+        # Read off the loop; the LRU itself is only touched from the loop thread.
+        entry = await asyncio.to_thread(self._read_from_disk, key)
+        if entry is not None:
+            self._insert(key, entry)
+        return entry
+
+    def _read_from_disk(self, key: str) -> Optional[CachedForecast]:
+        path = self._path_for(key)
+        if path is None or not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                meta = json.loads(str(archive["meta"]))
+                series = ForecastSeries.from_arrays(archive)
+            entry = CachedForecast(
+                series=series,
+                expires_at=datetime.fromisoformat(meta["expires_at"]),
+                etag=meta.get("etag"),
+                last_modified=meta.get("last_modified"),
+                size_bytes=series.nbytes,
+            )
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("Discarding unreadable forecast cache entry", key=key, error=str(exc))
+            return None
+        return entry
+
+
+forecast_cache = ForecastCache(directory=settings.forecast_cache_dir)
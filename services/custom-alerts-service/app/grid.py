@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from typing import Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+from .forecast import ForecastSeries
+from .threshold_index import WindowSummary
+
+# NOAA forecast grids have 2.5 km cells.
+GRID_CELL_KM = 2.5
+_GRID_COLUMNS = ("temperature_f", "precip_probability", "wind_mph")
+
+
+class TileKey(NamedTuple):
+    """A square block of ``size`` x ``size`` cells of one forecast office grid, aligned to ``size``."""
+
+    office: str
+    origin_x: int
+    origin_y: int
+    size: int
+
+    def cells(self) -> Iterator[Tuple[int, int]]:
+        for grid_y in range(self.origin_y, self.origin_y + self.size):
+            for grid_x in range(self.origin_x, self.origin_x + self.size):
+                yield grid_x, grid_y
+
+
+@dataclass(frozen=True)
+class GridTile:
+    """Raw forecast layers for every cell of a tile as ``(y, x, hour)`` arrays.
+
+    The hour axis starts at ``start_times[0]``, the hour the tile was assembled
+    for. Cells that could not be fetched are NaN throughout.
+    """
+
+    key: TileKey
+    start_times: np.ndarray
+    temperature_f: np.ndarray
+    precip_probability: np.ndarray
+    wind_mph: np.ndarray
+
+    @classmethod
+    def from_cells(
+        cls,
+        key: TileKey,
+        cells: Mapping[Tuple[int, int], Optional[ForecastSeries]],
+        start: np.datetime64,
+    ) -> "GridTile":
+        start = np.datetime64(start, "h")
+        offsets = {}
+        hours = 0
+        for cell, series in cells.items():
+            if series is None or not len(series):
+                continue
+            offset = ((series.start_times.astype("datetime64[h]") - start) // np.timedelta64(1, "h")).astype(np.int64)
+            offsets[cell] = offset
+            hours = max(hours, int(offset.max()) + 1)
+        arrays = {column: np.full((key.size, key.size, hours), np.nan, dtype=np.float32) for column in _GRID_COLUMNS}
+        for (grid_x, grid_y), offset in offsets.items():
+            series = cells[(grid_x, grid_y)]
+            keep = offset >= 0
+            for column in _GRID_COLUMNS:
+                values = getattr(series, column)
+                arrays[column][grid_y - key.origin_y, grid_x - key.origin_x, offset[keep]] = values[keep]
+        return cls(
+            key=key,
+            start_times=(start + np.arange(hours)).astype("datetime64[s]"),
+            **arrays,
+        )
+
+    def cell_mask(self, grid_x: int, grid_y: int, radius_km: float) -> np.ndarray:
+        """Cells of this tile whose centre lies within ``radius_km`` of cell ``(grid_x, grid_y)``."""
+        dx = (np.arange(self.key.origin_x, self.key.origin_x + self.key.size) - grid_x) * GRID_CELL_KM
+        dy = (np.arange(self.key.origin_y, self.key.origin_y + self.key.size) - grid_y) * GRID_CELL_KM
+        return dy[:, None] ** 2 + dx[None, :] ** 2 <= radius_km**2
+
+
+def radius_cells(radius_km: float) -> int:
+    """Cells reached from the centre cell, capped by ``gridded_max_radius_km``."""
+    radius = min(max(radius_km, 0.0), settings.gridded_max_radius_km)
+    return math.ceil(radius / GRID_CELL_KM)
+
+
+def tiles_for(office: str, grid_x: int, grid_y: int, radius_km: float) -> List[TileKey]:
+    """Tiles covering every cell within ``radius_km`` of ``(grid_x, grid_y)``."""
+    size = max(1, settings.gridded_tile_cells)
+    reach = radius_cells(radius_km)
+    first_x, last_x = max(0, grid_x - reach) // size, (grid_x + reach) // size
+    first_y, last_y = max(0, grid_y - reach) // size, (grid_y + reach) // size
+    return [
+        TileKey(office, tile_x * size, tile_y * size, size)
+        for tile_y in range(first_y, last_y + 1)
+        for tile_x in range(first_x, last_x + 1)
+    ]
+
+
+def area_summary(
+    tiles: Mapping[TileKey, Optional[GridTile]],
+    office: str,
+    grid_x: int,
+    grid_y: int,
+    radius_km: float,
+    window_hours: int,
+    rain: bool = False,
+) -> Optional[WindowSummary]:
+    """Extremes over every cell within the radius for the first ``window_hours`` hours.
+
+    Grid layers carry no weather text, so ``rain`` comes from the point forecast.
+    Returns None when any covering tile is missing, so the caller can fall back to
+    the point forecast rather than judge a partial area.
+    """
+    radius = min(max(radius_km, 0.0), settings.gridded_max_radius_km)
+    selected = {column: [] for column in _GRID_COLUMNS}
+    for key in tiles_for(office, grid_x, grid_y, radius_km):
+        tile = tiles.get(key)
+        if tile is None:
+            return None
+        mask = tile.cell_mask(grid_x, grid_y, radius)
+        for column in _GRID_COLUMNS:
+            selected[column].append(getattr(tile, column)[mask, :window_hours].ravel())
+    return WindowSummary.from_arrays(
+        temperature_f=np.concatenate(selected["temperature_f"]),
+        precip_probability=np.concatenate(selected["precip_probability"]),
+        wind_mph=np.concatenate(selected["wind_mph"]),
+        rain=rain,
+    )
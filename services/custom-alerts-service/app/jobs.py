@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+from . import db
+from .config import settings
+from .evaluator import EvaluationStats, evaluate_conditions
+
+DispatcherFactory = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class EvaluationJob:
+    id: str
+    dry_run: bool
+    status: str = "queued"
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    stats: EvaluationStats = field(default_factory=EvaluationStats)
+
+    def asdict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "dry_run": self.dry_run,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "due": self.stats.due,
+            "gridpoints_fetched": self.stats.gridpoints_fetched,
+            "triggered": self.stats.triggered,
+            "skipped": self.stats.skipped,
+            "phase_seconds": dict(self.stats.phase_seconds),
+        }
+
+
+class JobRegistry:
+    """In-process registry of manual evaluation runs.
+
+    Jobs run as tasks on the service's event loop and share its stats object, so
+    the status endpoint reports progress while a run is still going. Only the most
+    recent ``evaluation_job_retention`` jobs are kept.
+    """
+
+    def __init__(self) -> None:
+        self._jobs: "OrderedDict[str, EvaluationJob]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def submit(self, *, dry_run: bool, dispatcher_factory: DispatcherFactory) -> EvaluationJob:
+        job = EvaluationJob(id=uuid.uuid4().hex, dry_run=dry_run)
+        self._jobs[job.id] = job
+        while len(self._jobs) > max(1, settings.evaluation_job_retention):
+            self._jobs.popitem(last=False)
+        task = asyncio.create_task(self._run(job, dispatcher_factory))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    def get(self, job_id: str) -> Optional[EvaluationJob]:
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: EvaluationJob, dispatcher_factory: DispatcherFactory) -> None:
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        try:
+            # Dry runs collect their messages in memory and must never reach the outbox.
+            use_outbox = settings.dispatch_outbox_enabled and not job.dry_run
+            # Outbox runs only write rows; the relay owns the Kafka connection and its retries.
+            dispatcher = None if use_outbox else await dispatcher_factory()
+            if dispatcher is None and not use_outbox:
+                raise RuntimeError("Kafka dispatcher unavailable")
+            async with db.AsyncSessionLocal() as session:
+                await evaluate_conditions(session, dispatcher, stats=job.stats, use_outbox=use_outbox)
+        except Exception as exc:
+            job.status = "failed"
+            job.error = str(exc)
+            logger.exception("Evaluation job failed", job_id=job.id, error=str(exc))
+        else:
+            job.status = "succeeded"
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+
+
+job_registry = JobRegistry()
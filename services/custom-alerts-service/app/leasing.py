@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .fairness import DEFAULT_TENANT
+from .models import ConditionAlert
+
+
+def worker_identity() -> str:
+    return settings.scheduler_worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+
+async def due_backlog(session: AsyncSession, due_time: datetime) -> Tuple[int, Optional[datetime]]:
+    """Count active alerts due by ``due_time`` and return the oldest ``next_evaluation_at``."""
+    result = await session.execute(
+        select(func.count(ConditionAlert.id), func.min(ConditionAlert.next_evaluation_at)).where(
+            ConditionAlert.is_active.is_(True),
+            ConditionAlert.next_evaluation_at <= due_time,
+        )
+    )
+    count, oldest = result.one()
+    return int(count or 0), oldest
+
+
+async def tenant_backlog(session: AsyncSession, due_time: datetime) -> Dict[str, Tuple[int, datetime]]:
+    """Claimable due alerts per tenant, with each tenant's oldest ``next_evaluation_at``."""
+    result = await session.execute(
+        select(
+            ConditionAlert.tenant_id,
+            func.count(ConditionAlert.id),
+            func.min(ConditionAlert.next_evaluation_at),
+        )
+        .where(*_claimable(due_time))
+        .group_by(ConditionAlert.tenant_id)
+    )
+    return {tenant or DEFAULT_TENANT: (int(count), oldest) for tenant, count, oldest in result.all()}
+
+
+async def claim_due_alerts(
+    session: AsyncSession,
+    *,
+    worker_id: str,
+    due_time: datetime,
+    limit: int,
+    quotas: Optional[Mapping[str, int]] = None,
+) -> List[ConditionAlert]:
+    """Lease due alerts to ``worker_id`` and return them in claim order.
+
+    Candidate rows are locked with ``FOR UPDATE SKIP LOCKED`` so concurrent replicas
+    claim disjoint sets, then stamped with ``claimed_by``/``lease_until`` and committed.
+    Rows whose lease has expired (a crashed worker) are claimable again. ``due_time``
+    is a naive UTC timestamp, matching how ``next_evaluation_at`` is stored.
+
+    Claim order is ``priority`` (imminent first), then oldest ``next_evaluation_at``,
+    then ``id``. With ``quotas`` each tenant contributes up to its own quota in that
+    order; otherwise up to ``limit`` alerts are taken regardless of tenant.
+    """
+    if quotas is None:
+        ids = list((await session.execute(_candidates(due_time, limit))).scalars())
+    else:
+        ids = []
+        for tenant, quota in quotas.items():
+            if quota <= 0:
+                continue
+            tenant_ids = await session.execute(
+                _candidates(due_time, quota, ConditionAlert.tenant_id == tenant)
+            )
+            ids.extend(tenant_ids.scalars())
+    if not ids:
+        await session.commit()
+        return []
+    await session.execute(
+        update(ConditionAlert)
+        .where(ConditionAlert.id.in_(ids))
+        .values(claimed_by=worker_id, lease_until=_lease_expiry())
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    claimed = await session.execute(
+        select(ConditionAlert)
+        .where(ConditionAlert.id.in_(ids))
+        .order_by(*_CLAIM_ORDER)
+        .execution_options(populate_existing=True)
+    )
+    return list(claimed.scalars())
+
+
+def _lease_expiry() -> datetime:
+    # From the wall clock, not the cycle's due time: a chunk claimed late in a long
+    # cycle must still get a full lease, or another replica could reclaim it mid-flight.
+    expires = datetime.now(timezone.utc) + timedelta(seconds=settings.scheduler_lease_seconds)
+    return expires.replace(tzinfo=None)
+
+
+_CLAIM_ORDER = (ConditionAlert.priority.desc(), ConditionAlert.next_evaluation_at, ConditionAlert.id)
+
+
+def _claimable(due_time: datetime) -> tuple:
+    return (
+        ConditionAlert.is_active.is_(True),
+        ConditionAlert.next_evaluation_at <= due_time,
+        or_(ConditionAlert.lease_until.is_(None), ConditionAlert.lease_until < due_time),
+    )
+
+
+def _candidates(due_time: datetime, limit: int, *criteria):
+    return (
+        select(ConditionAlert.id)
+        .where(*_claimable(due_time), *criteria)
+        .order_by(*_CLAIM_ORDER)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
@@ -4,7 +4,10 @@ from . import db
 from .config import settings
 from .routes import router
 from .metrics import router as metrics_router
+from .outbox import OutboxRelay
+from .prefetch import ForecastPrefetcher
 from .scheduler import ConditionScheduler
+from .weather import NoaaWeatherClient
 
 app = FastAPI(
     title="Custom Condition Alerts Service",
@@ -26,19 +29,36 @@ app = FastAPI(
     },
 )
 scheduler = ConditionScheduler()
+app.state.scheduler = scheduler
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
     db.Base.metadata.create_all(bind=db.engine)
+    # One long-lived client for previews so coalesced requests share its connections.
+    app.state.weather_client = NoaaWeatherClient()
+    app.state.prefetcher = None
+    app.state.outbox_relay = None
+    if settings.dispatch_outbox_enabled:
+        # Relays rows from scheduled and manual runs alike, through the scheduler's dispatcher.
+        app.state.outbox_relay = OutboxRelay(scheduler.dispatcher)
+        await app.state.outbox_relay.start()
     if settings.enable_scheduler:
         await scheduler.start()
+        if settings.prefetch_enabled:
+            app.state.prefetcher = ForecastPrefetcher(app.state.weather_client)
+            await app.state.prefetcher.start()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
-    if settings.enable_scheduler:
-        await scheduler.stop()
+    if app.state.prefetcher is not None:
+        await app.state.prefetcher.stop()
+    if app.state.outbox_relay is not None:
+        await app.state.outbox_relay.stop()
+    # Also stops a dispatcher started by a manual run while the scheduler is disabled.
+    await scheduler.stop()
+    await app.state.weather_client.aclose()
 
 
 @app.get("/healthz")
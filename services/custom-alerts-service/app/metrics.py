@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Response
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, generate_latest
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
 
 router = APIRouter(include_in_schema=False)
 
@@ -9,12 +9,203 @@ alert_evaluations_total = Counter(
     labelnames=("tenant",),
 )
 
+alert_evaluations_skipped_total = Counter(
+    "custom_alert_evaluations_skipped_total",
+    "Custom alert evaluations skipped because the forecast window and rule were unchanged",
+    labelnames=("tenant",),
+)
+
 alert_matches_total = Counter(
     "custom_alert_matches_total",
     "Number of custom alert matches triggered",
     labelnames=("tenant",),
 )
 
+_CYCLE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+
+evaluation_cycle_seconds = Histogram(
+    "custom_alert_evaluation_cycle_seconds",
+    "Wall time of one evaluation cycle",
+    buckets=_CYCLE_BUCKETS,
+)
+
+evaluation_phase_seconds = Histogram(
+    "custom_alert_evaluation_phase_seconds",
+    "Wall time per evaluation cycle spent in each phase (claim, resolve, fetch, match, dispatch, write)",
+    labelnames=("phase",),
+    buckets=_CYCLE_BUCKETS,
+)
+
+due_backlog_alerts = Gauge(
+    "custom_alert_due_backlog",
+    "Active alerts due for evaluation at the start of the last cycle",
+)
+
+oldest_overdue_seconds = Gauge(
+    "custom_alert_oldest_overdue_seconds",
+    "How far the oldest due next_evaluation_at lagged behind the start of the last cycle",
+)
+
+tenant_oldest_overdue_seconds = Gauge(
+    "custom_alert_tenant_oldest_overdue_seconds",
+    "Per-tenant lag of the oldest claimable next_evaluation_at at the start of the last cycle",
+    labelnames=("tenant",),
+)
+
+dispatch_spool_depth = Gauge(
+    "custom_alert_dispatch_spool_depth",
+    "Dispatch payloads spooled to disk and not yet delivered to Kafka",
+)
+
+dispatch_spool_oldest_age_seconds = Gauge(
+    "custom_alert_dispatch_spool_oldest_age_seconds",
+    "Age of the oldest undelivered payload in the dispatch spool",
+)
+
+dispatch_outbox_pending = Gauge(
+    "custom_alert_dispatch_outbox_pending",
+    "Outbox rows committed but not yet published to Kafka",
+)
+
+dispatch_outbox_published_total = Counter(
+    "custom_alert_dispatch_outbox_published_total",
+    "Outbox rows handed to Kafka by the relay, by result (sent, failed)",
+    labelnames=("result",),
+)
+
+forecast_archive_snapshots_total = Counter(
+    "custom_alert_forecast_archive_snapshots_total",
+    "Forecast snapshots offered to the archive, by result (written, unchanged, failed)",
+    labelnames=("result",),
+)
+
+backtest_seconds = Histogram(
+    "custom_alert_backtest_seconds",
+    "Time to load archived forecasts and replay one rule against them",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+noaa_request_seconds = Histogram(
+    "custom_alert_noaa_request_seconds",
+    "NOAA request latency by endpoint class, including hedged attempts",
+    labelnames=("endpoint",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 15, 30),
+)
+
+dispatch_latency_seconds = Histogram(
+    "custom_alert_dispatch_latency_seconds",
+    "Time from handing a dispatch to Kafka until it is acknowledged",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+evaluation_units_total = Counter(
+    "custom_alert_evaluation_units_total",
+    "Distinct (gridpoint, rule, threshold, window) units evaluated",
+)
+
+evaluation_dedup_ratio = Gauge(
+    "custom_alert_evaluation_dedup_ratio",
+    "Subscriptions per evaluated unit in the last evaluation cycle",
+)
+
+forecast_cache_requests_total = Counter(
+    "custom_alert_forecast_cache_requests_total",
+    "Forecast cache lookups by result (hit, miss, revalidated)",
+    labelnames=("result",),
+)
+
+forecast_cache_hit_ratio = Gauge(
+    "custom_alert_forecast_cache_hit_ratio",
+    "Share of forecast cache lookups served from a fresh entry",
+)
+
+forecast_cache_bytes = Gauge(
+    "custom_alert_forecast_cache_bytes",
+    "Approximate size of the in-memory forecast cache",
+)
+
+preview_cache_requests_total = Counter(
+    "custom_alert_preview_cache_requests_total",
+    "Forecast preview response cache lookups by result (hit, miss)",
+    labelnames=("result",),
+)
+
+upstream_coalesced_total = Counter(
+    "custom_alert_upstream_coalesced_total",
+    "Calls that joined an identical in-flight upstream request instead of issuing their own",
+    labelnames=("operation",),
+)
+
+noaa_circuit_state = Gauge(
+    "custom_alert_noaa_circuit_state",
+    "NOAA circuit breaker state by host:endpoint (0 closed, 1 half-open, 2 open)",
+    labelnames=("endpoint",),
+)
+
+noaa_circuit_rejections_total = Counter(
+    "custom_alert_noaa_circuit_rejections_total",
+    "NOAA calls failed fast because the circuit was open",
+    labelnames=("endpoint",),
+)
+
+noaa_hedged_requests_total = Counter(
+    "custom_alert_noaa_hedged_requests_total",
+    "Hedged NOAA requests by endpoint class and which request answered first",
+    labelnames=("endpoint", "winner"),
+)
+
+noaa_stale_fallbacks_total = Counter(
+    "custom_alert_noaa_stale_fallbacks_total",
+    "Forecasts served from an expired cache entry because NOAA was unavailable",
+)
+
+prefetch_requests_total = Counter(
+    "custom_alert_prefetch_requests_total",
+    "Forecast prefetch decisions by result (fetched, warm, failed)",
+    labelnames=("result",),
+)
+
+prefetch_hits_total = Counter(
+    "custom_alert_prefetch_hits_total",
+    "Evaluation forecast reads served by a prefetched cache entry",
+)
+
+prefetch_wasted_total = Counter(
+    "custom_alert_prefetch_wasted_total",
+    "Prefetched forecasts that expired before any evaluation read them",
+)
+
+prefetch_hit_ratio = Gauge(
+    "custom_alert_prefetch_hit_ratio",
+    "Share of evaluation forecast reads served by a prefetch since process start",
+)
+
+grid_tile_fetches_total = Counter(
+    "custom_alert_grid_tile_fetches_total",
+    "Gridded evaluation tile fetches by result (ok, partial, failed)",
+    labelnames=("result",),
+)
+
+predictive_deferral_seconds = Histogram(
+    "custom_alert_predictive_deferral_seconds",
+    "Delay chosen for the next evaluation of non-triggered alerts, by limiting reason",
+    labelnames=("reason",),
+    buckets=(600, 1200, 1800, 3600, 7200, 10800, 21600, 43200, 86400),
+)
+
+
+db_pool_connections_in_use = Gauge(
+    "custom_alert_db_pool_connections_in_use",
+    "Database connections currently checked out, by engine (sync, async)",
+    labelnames=("engine",),
+)
+
+db_pool_saturation = Gauge(
+    "custom_alert_db_pool_saturation",
+    "Checked-out connections as a share of pool size plus overflow, by engine",
+    labelnames=("engine",),
+)
+
 
 @router.get("/metrics")
 def metrics_endpoint() -> Response:
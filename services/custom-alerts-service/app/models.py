@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import List
 
-from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, SmallInteger, String, Text
 from sqlalchemy.types import JSON, TypeDecorator
 
 
@@ -35,6 +35,7 @@ class ConditionAlert(Base):
     latitude = Column(Float, nullable=False)
     longitude = Column(Float, nullable=False)
     radius_km = Column(Float, nullable=True)
+    gridpoint = Column(String, nullable=True, index=True)
     channel_overrides = Column(JSONType, nullable=False, default=dict)
     is_active = Column(Boolean, nullable=False, default=True)
     metadata_json = Column("metadata", JSON, nullable=True)
@@ -42,10 +43,25 @@ class ConditionAlert(Base):
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     last_triggered_at = Column(DateTime, nullable=True)
     next_evaluation_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    evaluation_digest = Column(String, nullable=True)
+    claimed_by = Column(String, nullable=True)
+    lease_until = Column(DateTime, nullable=True)
+    tenant_id = Column(String, nullable=False, default="default")
+    priority = Column(SmallInteger, nullable=False, default=0)
+    rule = Column(Text, nullable=True)
+
+    __table_args__ = (
+        Index("idx_condition_alerts_tenant_due", "tenant_id", "priority", "next_evaluation_at", "id"),
+    )
 
     def apply_update_timestamp(self) -> None:
         self.updated_at = datetime.utcnow()
 
+    def sync_tenant(self) -> None:
+        """Copy ``metadata.tenant_id`` into the indexed ``tenant_id`` column."""
+        tenant = (self.metadata_json or {}).get("tenant_id")
+        self.tenant_id = tenant if isinstance(tenant, str) and tenant else "default"
+
 
 class UserPreference(Base):
     __tablename__ = "user_preferences"
@@ -94,3 +110,20 @@ class AlertDeliveryHistory(Base):
             if isinstance(value, str) and value.strip():
                 return value.strip()
         return None
+
+
+class DispatchOutbox(Base):
+    """Dispatch requests committed with the evaluation that produced them, awaiting the relay."""
+
+    __tablename__ = "dispatch_outbox"
+
+    id = Column(Integer, primary_key=True)
+    message_key = Column(String, nullable=False, unique=True)
+    topic = Column(String, nullable=False)
+    payload = Column(JSONType, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (Index("idx_dispatch_outbox_unsent", "id", "sent_at"),)
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from . import db
+from .config import settings
+from .metrics import dispatch_outbox_pending, dispatch_outbox_published_total
+from .models import DispatchOutbox
+
+DispatcherProvider = Callable[[], Awaitable[Any]]
+
+
+def outbox_row(payload: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Outbox insert for ``payload``, keyed by its match ``alert_id`` so re-sends can be deduplicated."""
+    return {
+        "message_key": str(payload["match"]["alert_id"]),
+        "topic": settings.dispatch_topic,
+        "payload": payload,
+        "created_at": now,
+        "attempts": 0,
+    }
+
+
+class OutboxRelay:
+    """Publishes committed ``dispatch_outbox`` rows to Kafka and marks them sent.
+
+    Each pass locks the oldest unsent rows (``FOR UPDATE SKIP LOCKED``, so several
+    replicas can relay side by side), hands them to the dispatcher as one batch and
+    stamps ``sent_at`` on the ones it accepted in the same transaction. A crash
+    between publish and commit re-sends the batch; consumers deduplicate on the
+    ``message-id`` header, which carries the row's ``message_key``.
+    """
+
+    def __init__(
+        self,
+        dispatcher_provider: DispatcherProvider,
+        *,
+        session_factory: Optional[async_sessionmaker] = None,
+    ) -> None:
+        self._dispatcher_provider = dispatcher_provider
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Outbox relay started")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop_event.set()
+        await self._task
+        self._task = None
+        logger.info("Outbox relay stopped")
+
+    async def relay_once(self, now: Optional[datetime] = None) -> int:
+        """Publish one batch of unsent rows; returns how many were marked sent."""
+        dispatcher = await self._dispatcher_provider()
+        if dispatcher is None:
+            return 0
+        now = now or datetime.now(timezone.utc)
+        session_factory = self._session_factory or db.AsyncSessionLocal
+        async with session_factory() as session:
+            stmt = (
+                select(DispatchOutbox)
+                .where(DispatchOutbox.sent_at.is_(None))
+                .order_by(DispatchOutbox.id)
+                .limit(max(1, settings.outbox_batch_size))
+                .with_for_update(skip_locked=True)
+            )
+            rows = list((await session.execute(stmt)).scalars())
+            if not rows:
+                await _publish_pending(session)
+                return 0
+            failures = await dispatcher.send_batch([row.payload for row in rows])
+            errors = {failure.payload["match"]["alert_id"]: str(failure.error) for failure in failures}
+            sent_ids = [row.id for row in rows if row.message_key not in errors]
+            if sent_ids:
+                await session.execute(
+                    update(DispatchOutbox).where(DispatchOutbox.id.in_(sent_ids)).values(sent_at=now)
+                )
+            if errors:
+                await session.execute(
+                    update(DispatchOutbox),
+                    [
+                        {"id": row.id, "attempts": row.attempts + 1, "last_error": errors[row.message_key][:500]}
+                        for row in rows
+                        if row.message_key in errors
+                    ],
+                )
+            await session.commit()
+            dispatch_outbox_published_total.labels(result="sent").inc(len(sent_ids))
+            dispatch_outbox_published_total.labels(result="failed").inc(len(errors))
+            await _publish_pending(session)
+        return len(sent_ids)
+
+    async def prune(self, now: Optional[datetime] = None) -> None:
+        """Delete rows sent more than ``outbox_retention_seconds`` ago."""
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=settings.outbox_retention_seconds)
+        session_factory = self._session_factory or db.AsyncSessionLocal
+        async with session_factory() as session:
+            await session.execute(
+                delete(DispatchOutbox).where(DispatchOutbox.sent_at.is_not(None), DispatchOutbox.sent_at < cutoff)
+            )
+            await session.commit()
+
+    async def _run(self) -> None:
+        while not self._stop_event.is_set():
+            relayed = 0
+            try:
+                relayed = await self.relay_once()
+                if not relayed:
+                    await self.prune()
+            except Exception as exc:  # pragma: no cover
+                logger.exception("Outbox relay pass failed", error=str(exc))
+            if relayed >= settings.outbox_batch_size:
+                # A full batch means more rows are probably waiting.
+                continue
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=settings.outbox_poll_seconds)
+            except asyncio.TimeoutError:
+                continue
+
+
+async def _publish_pending(session: AsyncSession) -> None:
+    pending = await session.scalar(select(func.count()).where(DispatchOutbox.sent_at.is_(None)))
+    dispatch_outbox_pending.set(pending or 0)
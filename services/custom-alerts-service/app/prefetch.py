@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from . import db
+from .config import settings
+from .forecast_cache import ForecastCache, forecast_cache
+from .metrics import prefetch_hit_ratio, prefetch_hits_total, prefetch_requests_total, prefetch_wasted_total
+from .models import ConditionAlert
+from .weather import Gridpoint, NoaaWeatherClient
+
+
+class PrefetchTracker:
+    """Matches prefetched forecasts with the evaluations that use them.
+
+    A prefetch is a hit when an evaluation reads the gridpoint while the warmed
+    entry is still fresh, and wasted when the entry expires unread.
+    """
+
+    def __init__(self) -> None:
+        self._pending: Dict[str, datetime] = {}
+        self._uses = 0
+        self._hits = 0
+
+    def prefetched(self, key: str, expires_at: datetime, now: Optional[datetime] = None) -> None:
+        self.sweep(now)
+        self._pending[key] = expires_at
+
+    def used(self, key: str, now: Optional[datetime] = None) -> bool:
+        """Record an evaluation reading ``key``; returns whether a prefetch served it."""
+        now = now or datetime.now(timezone.utc)
+        self.sweep(now)
+        expires_at = self._pending.pop(key, None)
+        hit = expires_at is not None
+        self._uses += 1
+        if hit:
+            self._hits += 1
+            prefetch_hits_total.inc()
+        prefetch_hit_ratio.set(self._hits / self._uses)
+        return hit
+
+    def sweep(self, now: Optional[datetime] = None) -> None:
+        now = now or datetime.now(timezone.utc)
+        expired = [key for key, expires_at in self._pending.items() if expires_at <= now]
+        for key in expired:
+            del self._pending[key]
+        if expired:
+            prefetch_wasted_total.inc(len(expired))
+
+    def reset(self) -> None:
+        self._pending.clear()
+        self._uses = 0
+        self._hits = 0
+
+
+prefetch_tracker = PrefetchTracker()
+
+
+async def upcoming_gridpoints(session: AsyncSession, until: datetime, limit: int) -> List[Tuple[str, datetime]]:
+    """Gridpoints of active alerts due by ``until``, soonest first, with their earliest due time."""
+    due_at = func.min(ConditionAlert.next_evaluation_at)
+    stmt = (
+        select(ConditionAlert.gridpoint, due_at)
+        .where(
+            ConditionAlert.is_active.is_(True),
+            ConditionAlert.gridpoint.is_not(None),
+            ConditionAlert.next_evaluation_at <= until.replace(tzinfo=None),
+        )
+        .group_by(ConditionAlert.gridpoint)
+        .order_by(due_at)
+        .limit(limit)
+    )
+    return [(gridpoint, due) for gridpoint, due in (await session.execute(stmt)).all()]
+
+
+class ForecastPrefetcher:
+    """Warms the forecast cache for gridpoints whose alerts fall due soon.
+
+    Every ``prefetch_interval_seconds`` it looks ``prefetch_lookahead_seconds``
+    ahead and fetches, at most ``prefetch_rate_per_second`` at a time, each
+    gridpoint whose cached forecast would be missing or expired when its first
+    alert is due. Evaluation then mostly reads a warm cache.
+    """
+
+    def __init__(
+        self,
+        weather_client: NoaaWeatherClient,
+        *,
+        cache: Optional[ForecastCache] = None,
+        session_factory: Optional[async_sessionmaker] = None,
+        tracker: Optional[PrefetchTracker] = None,
+    ) -> None:
+        self._weather_client = weather_client
+        self._cache = cache if cache is not None else forecast_cache
+        self._session_factory = session_factory
+        self._tracker = tracker if tracker is not None else prefetch_tracker
+        self._task: Optional[asyncio.Task] = None
+        self._stop_event = asyncio.Event()
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._stop_event.clear()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Forecast prefetcher started")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop_event.set()
+        await self._task
+        self._task = None
+        logger.info("Forecast prefetcher stopped")
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Warm the cache for upcoming gridpoints; returns how many were fetched."""
+        now = now or datetime.now(timezone.utc)
+        until = now + timedelta(seconds=settings.prefetch_lookahead_seconds)
+        session_factory = self._session_factory or db.AsyncSessionLocal
+        async with session_factory() as session:
+            upcoming = await upcoming_gridpoints(session, until, settings.prefetch_max_gridpoints)
+        self._tracker.sweep(now)
+
+        fetched = 0
+        pace = 1.0 / max(settings.prefetch_rate_per_second, 1e-3)
+        for key, due_at in upcoming:
+            if self._stop_event.is_set():
+                break
+            needed_until = max(now, _aware(due_at))
+            entry = await self._cache.apeek(key)
+            if entry is not None and entry.expires_at > needed_until:
+                prefetch_requests_total.labels(result="warm").inc()
+                continue
+            started = time.monotonic()
+            try:
+                # A cached entry that is still fresh now but expires before the alert is due
+                # must be revalidated, not served back from the cache.
+                await self._weather_client.fetch_gridpoint_forecast(Gridpoint.parse(key), min_fresh_until=needed_until)
+            except Exception as exc:  # pragma: no cover - logged for observability
+                prefetch_requests_total.labels(result="failed").inc()
+                logger.warning("Forecast prefetch failed", gridpoint=key, error=str(exc))
+            else:
+                prefetch_requests_total.labels(result="fetched").inc()
+                fetched += 1
+                entry = await self._cache.apeek(key)
+                if entry is not None:
+                    self._tracker.prefetched(key, entry.expires_at, now)
+            await self._pause(pace - (time.monotonic() - started))
+        return fetched
+
+    async def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                await self.run_once()
+            except Exception as exc:  # pragma: no cover
+                logger.exception("Forecast prefetch cycle failed", error=str(exc))
+            await self._pause(settings.prefetch_interval_seconds)
+
+    async def _pause(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        try:
+            await asyncio.wait_for(self._stop_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _aware(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+from .metrics import preview_cache_requests_total
+
+PreviewKey = Tuple[float, float, int]
+
+
+@dataclass(frozen=True)
+class CachedPreview:
+    body: Dict[str, Any]
+    etag: str
+    expires_at: datetime
+
+    def max_age(self, now: datetime) -> int:
+        return max(0, int((self.expires_at - now).total_seconds()))
+
+
+def preview_key(latitude: float, longitude: float, periods: int) -> PreviewKey:
+    return (round(latitude, 4), round(longitude, 4), periods)
+
+
+class PreviewCache:
+    """Short-lived LRU of rendered ``/preview`` responses with a content ETag."""
+
+    def __init__(self, *, max_entries: Optional[int] = None) -> None:
+        self._max_entries = max_entries if max_entries is not None else settings.preview_cache_max_entries
+        self._entries: "OrderedDict[PreviewKey, CachedPreview]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: PreviewKey, now: datetime) -> Optional[CachedPreview]:
+        entry = self._entries.get(key)
+        if entry is None or now >= entry.expires_at:
+            self._entries.pop(key, None)
+            preview_cache_requests_total.labels(result="miss").inc()
+            return None
+        self._entries.move_to_end(key)
+        preview_cache_requests_total.labels(result="hit").inc()
+        return entry
+
+    def put(self, key: PreviewKey, body: Dict[str, Any], now: datetime) -> CachedPreview:
+        encoded = json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+        entry = CachedPreview(
+            body=body,
+            etag=f'"{hashlib.blake2b(encoded, digest_size=16).hexdigest()}"',
+            expires_at=now + timedelta(seconds=settings.preview_cache_ttl_seconds),
+        )
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > max(1, self._max_entries):
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+preview_cache = PreviewCache()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+from .metrics import noaa_circuit_rejections_total, noaa_circuit_state
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one upstream host and endpoint class.
+
+    After ``noaa_breaker_failure_threshold`` consecutive failures the circuit opens
+    and calls fail fast. Once ``noaa_breaker_reset_seconds`` have passed a single
+    probe is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, endpoint: str, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.endpoint = endpoint
+        self._clock = clock
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.state = "closed"
+        self._publish()
+
+    def allow(self) -> bool:
+        if self.state == "open" and self._clock() - self._opened_at >= settings.noaa_breaker_reset_seconds:
+            self._transition("half_open")
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        noaa_circuit_rejections_total.labels(endpoint=self.endpoint).inc()
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        if self.state != "closed":
+            self._transition("closed")
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._probing = False
+        if self.state == "half_open" or self._failures >= settings.noaa_breaker_failure_threshold:
+            self._opened_at = self._clock()
+            self._transition("open")
+
+    def release(self) -> None:
+        """Give back a half-open probe whose call was cancelled, without recording an outcome."""
+        self._probing = False
+
+    def _transition(self, state: str) -> None:
+        self.state = state
+        self._publish()
+
+    def _publish(self) -> None:
+        noaa_circuit_state.labels(endpoint=self.endpoint).set(_STATE_VALUES[self.state])
+
+
+class LatencyTracker:
+    """Rolling window of upstream latencies used to pick the hedge delay."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._min_samples = min_samples
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def p95(self) -> Optional[float]:
+        if len(self._samples) < self._min_samples:
+            return None
+        return float(np.percentile(np.fromiter(self._samples, dtype=np.float64), 95))
+
+
+_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_latencies: Dict[Tuple[str, str], LatencyTracker] = {}
+
+
+def breaker_for(host: str, endpoint_class: str) -> CircuitBreaker:
+    key = (host, endpoint_class)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        breaker = _breakers[key] = CircuitBreaker(f"{host}:{endpoint_class}")
+    return breaker
+
+
+def latency_for(host: str, endpoint_class: str) -> LatencyTracker:
+    return _latencies.setdefault((host, endpoint_class), LatencyTracker())
+
+
+def reset() -> None:
+    """Forget all breaker and latency state (tests and process reuse)."""
+    _breakers.clear()
+    _latencies.clear()
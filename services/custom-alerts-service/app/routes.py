@@ -1,16 +1,29 @@
 import asyncio
 import logging
-from typing import List
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .dispatcher import KafkaDispatcher
-from .db import get_session
-from .evaluator import evaluate_conditions
+from .archive import forecast_archive
+from .backtest import backtest
+from .config import settings
+from .db import get_async_session, get_session
+from .jobs import job_registry
+from .metrics import backtest_seconds
 from .models import ConditionAlert
+from .preview_cache import preview_cache, preview_key
+from .rules import compile_rule
 from .schemas import (
-    ConditionEvaluationResponse,
+    ConditionBacktestRequest,
+    ConditionBacktestResult,
+    ConditionEvaluationJob,
+    ConditionSimulationRequest,
+    ConditionSimulationResult,
     ConditionSubscriptionCreate,
     ConditionSubscriptionResponse,
     ConditionSubscriptionUpdate,
@@ -18,12 +31,16 @@ from .schemas import (
     DEFAULTS,
     DEFAULT_RADIUS_KM,
 )
+from .simulation import ThresholdChange, simulate_thresholds
+from .singleflight import SingleFlight
 from .weather import NoaaWeatherClient
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/v1/conditions", tags=["conditions"])
 
+_preview_flights = SingleFlight("preview")
+
 
 class _DryRunDispatcher:
     def __init__(self) -> None:
@@ -59,6 +76,7 @@ def create_subscription(
 ) -> ConditionSubscriptionResponse:
     data = _apply_defaults(payload)
     alert = ConditionAlert(**data)
+    alert.sync_tenant()
     db.add(alert)
     db.commit()
     db.refresh(alert)
@@ -90,11 +108,20 @@ def update_subscription(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found")
 
     update_data = payload.dict(exclude_unset=True)
+    if "rule" in update_data and (alert.condition_type != "compound" or not update_data["rule"]):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="rule can only be set on compound conditions",
+        )
     if "metadata" in update_data:
         metadata = update_data.pop("metadata")
         update_data["metadata_json"] = metadata
     for key, value in update_data.items():
         setattr(alert, key, value)
+    if "latitude" in update_data or "longitude" in update_data:
+        alert.gridpoint = None
+    if "metadata_json" in update_data:
+        alert.sync_tenant()
     alert.apply_update_timestamp()
     db.add(alert)
     db.commit()
@@ -116,46 +143,136 @@ def delete_subscription(
     db.commit()
 
 
-@router.post("/run", response_model=ConditionEvaluationResponse)
-async def run_conditions(
-    dry_run: bool = True,
-    db: Session = Depends(get_session),
-) -> ConditionEvaluationResponse:
+@router.post("/run", response_model=ConditionEvaluationJob, status_code=status.HTTP_202_ACCEPTED)
+async def run_conditions(request: Request, dry_run: bool = True) -> ConditionEvaluationJob:
     if dry_run:
-        dispatcher = _DryRunDispatcher()
-        await evaluate_conditions(db, dispatcher)
-        return ConditionEvaluationResponse(triggered=len(dispatcher.messages))
+        async def dispatcher_factory():
+            return _DryRunDispatcher()
+    else:
+        # Reuse the scheduler's long-lived producer instead of connecting per request.
+        dispatcher_factory = request.app.state.scheduler.dispatcher
+    job = job_registry.submit(dry_run=dry_run, dispatcher_factory=dispatcher_factory)
+    return ConditionEvaluationJob(**job.asdict())
 
-    loop = asyncio.get_running_loop()
-    dispatcher = KafkaDispatcher(loop=loop)
-    await dispatcher.start()
-    try:
-        await evaluate_conditions(db, dispatcher)
-    finally:
-        await dispatcher.stop()
-    return ConditionEvaluationResponse(triggered=0)
+
+@router.get("/run/{job_id}", response_model=ConditionEvaluationJob)
+async def get_run(job_id: str) -> ConditionEvaluationJob:
+    job = job_registry.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Evaluation job not found")
+    return ConditionEvaluationJob(**job.asdict())
 
 
 @router.get("/preview", response_model=ForecastPreview)
 async def preview_forecast(
+    request: Request,
+    response: Response,
     latitude: float = Query(..., ge=-90.0, le=90.0),
     longitude: float = Query(..., ge=-180.0, le=180.0),
     periods: int = Query(3, ge=1, le=6),
 ) -> ForecastPreview:
-    async with NoaaWeatherClient() as client:
+    now = datetime.now(timezone.utc)
+    key = preview_key(latitude, longitude, periods)
+    entry = preview_cache.get(key, now)
+    if entry is None:
+        client: NoaaWeatherClient = request.app.state.weather_client
         try:
-            data = await client.fetch_forecast_preview(latitude, longitude, periods)
+            data = await _preview_flights.run(
+                key, lambda: client.fetch_forecast_preview(latitude, longitude, periods)
+            )
         except Exception as exc:  # pragma: no cover - defensive guard for flaky upstream
             logger.warning("Unable to fetch NOAA forecast preview", exc_info=exc)
+            response.headers["Cache-Control"] = "no-store"
             return ForecastPreview(periods=[])
 
-    formatted = [
-        {
-            "start_time": item.get("start_time"),
-            "short_forecast": item.get("short_forecast"),
-            "temperature": item.get("temperature"),
-            "temperature_unit": item.get("temperature_unit"),
-        }
-        for item in data
-    ]
-    return ForecastPreview(periods=formatted)
+        formatted = [
+            {
+                "start_time": item.get("start_time"),
+                "short_forecast": item.get("short_forecast"),
+                "temperature": item.get("temperature"),
+                "temperature_unit": item.get("temperature_unit"),
+            }
+            for item in data
+        ]
+        entry = preview_cache.put(key, {"periods": formatted}, now)
+
+    headers = {"ETag": entry.etag, "Cache-Control": f"public, max-age={entry.max_age(now)}"}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return ForecastPreview(**entry.body)
+
+
+@router.post("/backtest", response_model=ConditionBacktestResult)
+async def backtest_condition(request: Request, payload: ConditionBacktestRequest) -> ConditionBacktestResult:
+    """Replay a proposed condition against the archived forecasts for its gridpoint."""
+    if not forecast_archive.enabled:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Forecast archive is not enabled",
+        )
+    window_hours = payload.window_hours or settings.evaluation_window_hours
+    if payload.rule:
+        window_hours = compile_rule(payload.rule).within_hours or window_hours
+    if window_hours > forecast_archive.hours:
+        # Replaying a longer window would silently judge only the archived hours.
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"window of {window_hours}h exceeds the {forecast_archive.hours}h kept in the forecast archive",
+        )
+    defaults = DEFAULTS[payload.condition_type]
+    alert = ConditionAlert(
+        condition_type=payload.condition_type,
+        threshold_value=defaults["threshold_value"] if payload.threshold_value is None else payload.threshold_value,
+        comparison=payload.comparison or defaults["comparison"],
+        rule=payload.rule,
+    )
+    client: NoaaWeatherClient = request.app.state.weather_client
+    try:
+        gridpoint = await client.resolve_gridpoint(payload.latitude, payload.longitude)
+    except Exception as exc:  # pragma: no cover - defensive guard for flaky upstream
+        logger.warning("Unable to resolve NOAA gridpoint for backtest", exc_info=exc)
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Unable to resolve NOAA gridpoint")
+
+    started = time.perf_counter()
+    until = datetime.now(timezone.utc)
+    since = until - timedelta(days=payload.days)
+    windows = await asyncio.to_thread(forecast_archive.load, gridpoint.key, since, until)
+    result = backtest(
+        alert,
+        windows,
+        window_hours,
+        settings.cooldown_minutes_default if payload.cooldown_minutes is None else payload.cooldown_minutes,
+    )
+    backtest_seconds.observe(time.perf_counter() - started)
+    return ConditionBacktestResult(
+        gridpoint=gridpoint.key,
+        since=since,
+        until=until,
+        snapshots=result.snapshots,
+        matched=result.matched,
+        triggers=len(result.trigger_times),
+        trigger_times=result.trigger_times,
+    )
+
+
+@router.post("/admin/simulate", response_model=ConditionSimulationResult)
+async def simulate_conditions(
+    payload: ConditionSimulationRequest,
+    session: AsyncSession = Depends(get_async_session),
+) -> ConditionSimulationResult:
+    """Count the notifications a changed rule set would cause this cycle, without dispatching."""
+    result = await simulate_thresholds(
+        session,
+        defaults=payload.defaults,
+        changes=[ThresholdChange(**override.dict()) for override in payload.overrides],
+        respect_cooldown=payload.respect_cooldown,
+    )
+    return ConditionSimulationResult(**asdict(result))
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in header.split(",")}
+    return "*" in candidates or etag in candidates
@@ -0,0 +1,277 @@
+"""Compound condition rules.
+
+A rule combines comparisons on forecast metrics with ``AND``/``OR``/``NOT`` and
+parentheses, optionally requiring the condition to hold for consecutive hours and
+restricting the look-ahead window::
+
+    temperature >= 95 AND humidity >= 60 for 3 consecutive hours within 12h
+    (wind > 30 OR precipitation >= 70) AND NOT rain
+
+Metrics are ``temperature`` (°F), ``humidity`` (%), ``precipitation`` (% chance),
+``wind`` (mph) and the boolean ``rain``. Rules are parsed once, rendered to a
+canonical form and compiled into a vectorized predicate over a gridpoint's
+:class:`~app.forecast.ForecastSeries`; compiled rules are cached by that form, so
+equivalent spellings share one compiled predicate.
+"""
+from __future__ import annotations
+
+import hashlib
+import operator
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .forecast import ForecastSeries
+
+MAX_RULE_LENGTH = 500
+MAX_WINDOW_HOURS = 156
+
+_METRICS = {
+    "temperature": "temperature_f",
+    "humidity": "humidity",
+    "precipitation": "precip_probability",
+    "wind": "wind_mph",
+}
+_OPERATORS: Dict[str, Callable[[np.ndarray, float], np.ndarray]] = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+    "==": operator.eq,
+}
+_OPERATOR_ALIASES = {"≥": ">=", "≤": "<=", "=": "=="}
+_TOKEN_RE = re.compile(r"\s*(?:(-?\d+(?:\.\d+)?)|(>=|<=|==|[<>=≥≤])|([()])|([A-Za-z_]+))")
+
+Predicate = Callable[[ForecastSeries], np.ndarray]
+# Parsed rule trees are plain tuples: ("cmp", metric, op, value) | ("rain",) |
+# ("not", node) | ("and", node, node) | ("or", node, node).
+Node = Tuple[Union[str, float, "Node"], ...]
+
+
+class RuleSyntaxError(ValueError):
+    """The rule text is not a valid compound condition."""
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    canonical: str
+    digest: str
+    consecutive_hours: int
+    within_hours: Optional[int]
+    predicate: Predicate
+
+    def matches(self, series: ForecastSeries, window_hours: int) -> bool:
+        """Whether the rule holds for ``consecutive_hours`` in a row within the window."""
+        mask = np.asarray(self.predicate(series.window(window_hours)), dtype=bool)
+        return bool(has_run(mask, self.consecutive_hours))
+
+
+def compile_rule(source: str) -> CompiledRule:
+    """Parse, validate and compile ``source``; raises :class:`RuleSyntaxError`."""
+    return _compile_source(" ".join(source.split()))
+
+
+def has_run(mask: np.ndarray, length: int) -> np.ndarray:
+    """Whether ``mask`` holds for ``length`` hours in a row along its last (hour) axis.
+
+    A 1-D mask gives a scalar; the archive's ``(snapshots, hours)`` masks give one per row.
+    """
+    if length <= 1:
+        return mask.any(axis=-1)
+    if mask.shape[-1] < length:
+        return np.zeros(mask.shape[:-1], dtype=bool)
+    runs = np.lib.stride_tricks.sliding_window_view(mask, length, axis=-1)
+    return runs.all(axis=-1).any(axis=-1)
+
+
+@lru_cache(maxsize=4096)
+def _compile_source(source: str) -> CompiledRule:
+    return _compile_canonical(_render(*_parse(source)))
+
+
+@lru_cache(maxsize=4096)
+def _compile_canonical(canonical: str) -> CompiledRule:
+    node, consecutive, within = _parse(canonical)
+    return CompiledRule(
+        canonical=canonical,
+        digest=hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest(),
+        consecutive_hours=consecutive,
+        within_hours=within,
+        predicate=_build(node),
+    )
+
+
+def _parse(source: str) -> Tuple[Node, int, Optional[int]]:
+    if not source or not source.strip():
+        raise RuleSyntaxError("rule must not be empty")
+    if len(source) > MAX_RULE_LENGTH:
+        raise RuleSyntaxError(f"rule must be at most {MAX_RULE_LENGTH} characters")
+    parser = _Parser(_tokenize(source))
+    node = parser.expression()
+    consecutive, within = 1, None
+    if parser.accept("for"):
+        consecutive = parser.integer("for")
+        parser.accept("consecutive")
+        parser.expect_hours()
+    if parser.accept("within"):
+        within = parser.integer("within")
+        parser.expect_hours()
+    if not parser.done():
+        raise RuleSyntaxError(f"unexpected {parser.peek()!r}")
+    if within is not None and not 1 <= within <= MAX_WINDOW_HOURS:
+        raise RuleSyntaxError(f"within must be between 1 and {MAX_WINDOW_HOURS} hours")
+    if consecutive < 1 or consecutive > (within or MAX_WINDOW_HOURS):
+        raise RuleSyntaxError("consecutive hours must be at least 1 and fit inside the window")
+    return node, consecutive, within
+
+
+def _tokenize(source: str) -> List[str]:
+    tokens: List[str] = []
+    position = 0
+    text = source.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if match is None or match.end() == position:
+            raise RuleSyntaxError(f"unexpected character {text[position:].strip()[:1]!r}")
+        number, op, paren, word = match.groups()
+        if op is not None:
+            tokens.append(_OPERATOR_ALIASES.get(op, op))
+        else:
+            tokens.append(number or paren or word.lower())
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: List[str]) -> None:
+        self._tokens = tokens
+        self._position = 0
+
+    def peek(self) -> Optional[str]:
+        return self._tokens[self._position] if self._position < len(self._tokens) else None
+
+    def done(self) -> bool:
+        return self._position >= len(self._tokens)
+
+    def accept(self, token: str) -> bool:
+        if self.peek() == token:
+            self._position += 1
+            return True
+        return False
+
+    def take(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise RuleSyntaxError("rule ends unexpectedly")
+        self._position += 1
+        return token
+
+    def integer(self, keyword: str) -> int:
+        token = self.take()
+        if not token.isdigit():
+            raise RuleSyntaxError(f"'{keyword}' must be followed by a whole number of hours")
+        return int(token)
+
+    def expect_hours(self) -> None:
+        if not (self.accept("h") or self.accept("hours") or self.accept("hour")):
+            raise RuleSyntaxError("expected 'h' or 'hours'")
+
+    def expression(self) -> Node:
+        node = self.term()
+        while self.accept("or"):
+            node = ("or", node, self.term())
+        return node
+
+    def term(self) -> Node:
+        node = self.factor()
+        while self.accept("and"):
+            node = ("and", node, self.factor())
+        return node
+
+    def factor(self) -> Node:
+        if self.accept("not"):
+            return ("not", self.factor())
+        if self.accept("("):
+            node = self.expression()
+            if not self.accept(")"):
+                raise RuleSyntaxError("missing ')'")
+            return node
+        token = self.take()
+        if token == "rain":
+            return ("rain",)
+        if token not in _METRICS:
+            raise RuleSyntaxError(f"unknown metric {token!r}; expected one of {', '.join(sorted(_METRICS))}, rain")
+        op = self.take()
+        if op not in _OPERATORS:
+            raise RuleSyntaxError(f"expected a comparison after {token!r}")
+        value = self.take()
+        try:
+            return ("cmp", token, op, float(value))
+        except ValueError:
+            raise RuleSyntaxError(f"expected a number after {token} {op}") from None
+
+
+def _render(node: Node, consecutive: int = 1, within: Optional[int] = None) -> str:
+    text = _render_node(node)
+    if consecutive > 1:
+        text += f" for {consecutive} consecutive hours"
+    if within is not None:
+        text += f" within {within}h"
+    return text
+
+
+def _render_node(node: Node) -> str:
+    kind = node[0]
+    if kind == "cmp":
+        _, metric, op, value = node
+        return f"{metric} {op} {_render_number(float(value))}"
+    if kind == "rain":
+        return "rain"
+    if kind == "not":
+        return f"NOT {_render_operand(node[1])}"
+    return f"{_render_operand(node[1])} {str(kind).upper()} {_render_operand(node[2])}"
+
+
+def _render_number(value: float) -> str:
+    # Plain decimal notation, since the tokenizer does not read exponents; -0 renders as 0.
+    return format(value + 0.0, "f").rstrip("0").rstrip(".") or "0"
+
+
+def _render_operand(node: Node) -> str:
+    text = _render_node(node)
+    return f"({text})" if node[0] in {"and", "or"} else text
+
+
+def _build(node: Node) -> Predicate:
+    kind = node[0]
+    if kind == "cmp":
+        _, metric, op, value = node
+        column, compare, threshold = _METRICS[str(metric)], _OPERATORS[str(op)], float(value)
+        # NaN (missing data) compares False, so unknown hours never satisfy a rule.
+        return lambda series: compare(getattr(series, column), threshold)
+    if kind == "rain":
+        return lambda series: series.rain
+    if kind == "not":
+        inner, known = _build(node[1]), _available(node[1])  # type: ignore[arg-type]
+        # Negating a NaN comparison would make missing hours match; they stay False.
+        return lambda series: known(series) & ~inner(series)
+    left, right = _build(node[1]), _build(node[2])  # type: ignore[arg-type]
+    combine = np.logical_and if kind == "and" else np.logical_or
+    return lambda series: combine(left(series), right(series))
+
+
+def _available(node: Node) -> Predicate:
+    """Hours where every metric ``node`` reads has data."""
+    kind = node[0]
+    if kind == "cmp":
+        column = _METRICS[str(node[1])]
+        return lambda series: ~np.isnan(getattr(series, column))
+    if kind == "rain":
+        return lambda series: np.ones_like(series.rain, dtype=bool)
+    if kind == "not":
+        return _available(node[1])  # type: ignore[arg-type]
+    left, right = _available(node[1]), _available(node[2])  # type: ignore[arg-type]
+    return lambda series: left(series) & right(series)
@@ -7,9 +7,13 @@ from aiokafka.errors import KafkaConnectionError
 from loguru import logger
 
 from .config import settings
-from .db import SessionLocal
+from .db import AsyncSessionLocal
 from .dispatcher import KafkaDispatcher
 from .evaluator import evaluate_conditions
+from .fairness import FairShare
+from .leasing import worker_identity
+from .scheduling import slot_seconds
+from .spool import DispatchSpool
 
 
 class ConditionScheduler:
@@ -17,13 +21,17 @@ class ConditionScheduler:
         self._task: Optional[asyncio.Task] = None
         self._dispatcher: Optional[KafkaDispatcher] = None
         self._stop_event = asyncio.Event()
+        self._dispatcher_lock = asyncio.Lock()
+        self._worker_id = worker_identity()
+        # Kept across cycles so tenants cut short by the cycle budget are served first next time.
+        self._fair_share = FairShare()
 
     async def start(self) -> None:
         if self._task is not None:
             return
         self._stop_event.clear()
         self._task = asyncio.create_task(self._run())
-        logger.info("Condition scheduler started")
+        logger.info("Condition scheduler started", worker_id=self._worker_id)
 
     async def stop(self) -> None:
         if self._task is not None:
@@ -35,10 +43,21 @@ class ConditionScheduler:
             self._dispatcher = None
         logger.info("Condition scheduler stopped")
 
+    async def dispatcher(self) -> Optional[KafkaDispatcher]:
+        """The shared Kafka dispatcher, started on first use (also used by manual runs)."""
+        async with self._dispatcher_lock:
+            return await self._ensure_dispatcher()
+
     async def _ensure_dispatcher(self) -> Optional[KafkaDispatcher]:
         if self._dispatcher is not None:
             return self._dispatcher
         loop = asyncio.get_running_loop()
+        if settings.dispatch_spool_dir:
+            # Spooling dispatchers start even when Kafka is down and catch up once it is back.
+            dispatcher = KafkaDispatcher(loop=loop, spool=DispatchSpool(settings.dispatch_spool_dir))
+            await dispatcher.start()
+            self._dispatcher = dispatcher
+            return dispatcher
         dispatcher = KafkaDispatcher(loop=loop)
         for attempt in range(settings.scheduler_start_max_retries):
             try:
@@ -58,19 +77,26 @@ class ConditionScheduler:
 
     async def _run(self) -> None:
         while not self._stop_event.is_set():
-            dispatcher = await self._ensure_dispatcher()
-            session = SessionLocal()
+            use_outbox = settings.dispatch_outbox_enabled
+            # Outbox matches are only written here; the relay owns the Kafka connection and its retries.
+            dispatcher = None if use_outbox else await self.dispatcher()
             try:
-                if dispatcher is not None:
-                    await evaluate_conditions(session, dispatcher)
+                if dispatcher is not None or use_outbox:
+                    async with AsyncSessionLocal() as session:
+                        await evaluate_conditions(
+                            session,
+                            dispatcher,
+                            worker_id=self._worker_id,
+                            fair_share=self._fair_share,
+                            use_outbox=use_outbox,
+                        )
             except Exception as exc:  # pragma: no cover
                 logger.exception("Scheduler evaluation failed", error=str(exc))
-                if self._dispatcher is dispatcher:
+                if dispatcher is not None and self._dispatcher is dispatcher:
                     await dispatcher.stop()
                     self._dispatcher = None
-            finally:
-                session.close()
             try:
-                await asyncio.wait_for(self._stop_event.wait(), timeout=settings.scheduler_interval_seconds)
+                # Alerts are spread over slots, so each tick only finds the current slot due.
+                await asyncio.wait_for(self._stop_event.wait(), timeout=slot_seconds())
             except asyncio.TimeoutError:
                 continue
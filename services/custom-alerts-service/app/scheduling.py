@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import numpy as np
+
+from .config import settings
+from .forecast import ForecastSeries
+from .metrics import predictive_deferral_seconds
+from .models import ConditionAlert
+from .threshold_index import SERIES_COLUMNS, WindowSummary, rule_for
+
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def slot_seconds() -> float:
+    """Length of one evaluation slot; the scheduler ticks once per slot."""
+    return settings.scheduler_interval_seconds / max(1, settings.scheduler_slot_count)
+
+
+def slot_offset(alert_id: int) -> float:
+    """Deterministic phase of an alert within the scheduler interval, in seconds."""
+    slots = max(1, settings.scheduler_slot_count)
+    digest = hashlib.blake2b(str(alert_id).encode("utf-8"), digest_size=8).digest()
+    return (int.from_bytes(digest, "big") % slots) * slot_seconds()
+
+
+def next_slot_time(alert_id: int, earliest: datetime) -> datetime:
+    """First start of the alert's slot at or after ``earliest`` (naive UTC).
+
+    Slots repeat every ``scheduler_interval_seconds`` from the Unix epoch, so an
+    alert keeps the same phase across cycles and replicas, and the population's
+    due times are spread evenly over the interval instead of landing on one tick.
+    """
+    if settings.scheduler_slot_count <= 1:
+        return earliest
+    interval = float(settings.scheduler_interval_seconds)
+    position = (earliest - _EPOCH).total_seconds() % interval
+    wait = (slot_offset(alert_id) - position) % interval
+    return earliest + timedelta(seconds=wait)
+
+
+def slotted_next_evaluation(alert_id: int, evaluated_at: datetime, delay_seconds: float) -> datetime:
+    """Schedule an evaluation roughly ``delay_seconds`` after ``evaluated_at``, snapped to the alert's slot.
+
+    Evaluation happens up to one slot after the slot starts, so looking for the slot
+    from ``delay - slot`` keeps an alert evaluated on time at exactly one interval apart.
+    """
+    if settings.scheduler_slot_count <= 1:
+        return evaluated_at + timedelta(seconds=delay_seconds)
+    earliest = evaluated_at + timedelta(seconds=max(0.0, delay_seconds - slot_seconds()))
+    return next_slot_time(alert_id, earliest)
+
+
+@dataclass(frozen=True)
+class Deferral:
+    seconds: float
+    reason: str
+
+
+class HorizonProfile:
+    """Running extremes of each metric over a gridpoint's full forecast horizon.
+
+    The running max (and negated running min) are non-decreasing, so the first hour
+    at which any threshold is crossed is a binary search instead of a scan.
+    """
+
+    def __init__(self, series: ForecastSeries, window_hours: int) -> None:
+        self.summary = WindowSummary.from_series(series, window_hours)
+        self.window_hours = window_hours
+        self.horizon_hours = len(series)
+        self._running_max: Dict[str, np.ndarray] = {}
+        self._running_neg_min: Dict[str, np.ndarray] = {}
+        for column in set(SERIES_COLUMNS.values()):
+            values = getattr(series, column).astype(np.float64)
+            self._running_max[column] = np.maximum.accumulate(np.where(np.isnan(values), -np.inf, values))
+            self._running_neg_min[column] = np.maximum.accumulate(np.where(np.isnan(values), -np.inf, -values))
+        rain_hours = np.flatnonzero(series.rain)
+        self.first_rain_hour = int(rain_hours[0]) if rain_hours.size else None
+
+    def first_crossing(self, attribute: str, direction: str, threshold: float) -> int | None:
+        column = SERIES_COLUMNS[attribute]
+        if direction == "above":
+            running, target = self._running_max[column], threshold
+        else:
+            running, target = self._running_neg_min[column], -threshold
+        index = int(np.searchsorted(running, target, side="left"))
+        return index if index < running.shape[0] else None
+
+
+def predictive_deferral(alert: ConditionAlert, profile: HorizonProfile) -> Deferral:
+    """How long a non-triggered alert can safely wait before its next evaluation.
+
+    The wait is the smaller of the time the forecast needs to drift across the
+    threshold at a conservative rate and the time until an hour already forecast
+    to cross it slides into the evaluation window (or the horizon runs out),
+    clamped between the scheduler interval and ``predictive_max_interval_seconds``.
+    """
+    interval = float(settings.scheduler_interval_seconds)
+    cap = float(max(settings.predictive_max_interval_seconds, settings.scheduler_interval_seconds))
+    rule = rule_for(alert)
+    if rule is None:
+        return _record(Deferral(interval, "unsupported"))
+    attribute, direction = rule
+    threshold = float(alert.threshold_value or 0.0)
+    window_value = getattr(profile.summary, attribute)
+    if np.isnan(window_value):
+        return _record(Deferral(interval, "no_data"))
+
+    margin = threshold - window_value if direction == "above" else window_value - threshold
+    margin_hours = max(0.0, margin) / _drift_per_hour(attribute)
+
+    crossing = first_crossing_hour(alert, profile)
+    if crossing is not None:
+        entry_hours = float(crossing - profile.window_hours + 1)
+        horizon_reason = "forecast_crossing"
+    else:
+        entry_hours = float(max(0, profile.horizon_hours - profile.window_hours))
+        horizon_reason = "horizon"
+
+    if margin_hours <= entry_hours:
+        seconds, reason = margin_hours * 3600.0, "margin"
+    else:
+        seconds, reason = entry_hours * 3600.0, horizon_reason
+    if seconds <= interval:
+        return _record(Deferral(interval, "interval"))
+    if seconds >= cap:
+        return _record(Deferral(cap, "cap"))
+    return _record(Deferral(seconds, reason))
+
+
+def first_crossing_hour(alert: ConditionAlert, profile: HorizonProfile) -> Optional[int]:
+    """First forecast hour at which ``alert``'s threshold is crossed, if any."""
+    rule = rule_for(alert)
+    if rule is None:
+        return None
+    attribute, direction = rule
+    crossing = profile.first_crossing(attribute, direction, float(alert.threshold_value or 0.0))
+    if alert.condition_type == "precipitation" and profile.first_rain_hour is not None:
+        crossing = profile.first_rain_hour if crossing is None else min(crossing, profile.first_rain_hour)
+    return crossing
+
+
+def _drift_per_hour(attribute: str) -> float:
+    column = SERIES_COLUMNS[attribute]
+    if column == "temperature_f":
+        rate = settings.predictive_temperature_drift_per_hour
+    elif column == "precip_probability":
+        rate = settings.predictive_precip_drift_per_hour
+    else:
+        rate = settings.predictive_wind_drift_per_hour
+    return max(rate, 1e-6)
+
+
+def _record(deferral: Deferral) -> Deferral:
+    predictive_deferral_seconds.labels(reason=deferral.reason).observe(deferral.seconds)
+    return deferral
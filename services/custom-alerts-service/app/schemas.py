@@ -1,13 +1,16 @@
 from datetime import datetime
 from typing import Any, Dict, Literal, Optional
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, root_validator, validator
+
+from .rules import MAX_WINDOW_HOURS, compile_rule
 
 ConditionType = Literal[
     "temperature_hot",
     "temperature_cold",
     "precipitation",
     "wind",
+    "compound",
 ]
 
 
@@ -19,9 +22,25 @@ DEFAULTS: dict[str, dict[str, Any]] = {
     "temperature_cold": {"threshold_value": 32.0, "threshold_unit": "fahrenheit", "comparison": "below"},
     "precipitation": {"threshold_value": 40.0, "threshold_unit": "percent", "comparison": "above"},
     "wind": {"threshold_value": 25.0, "threshold_unit": "mph", "comparison": "above"},
+    "compound": {"threshold_value": 0.0, "threshold_unit": "rule", "comparison": "above"},
 }
 
 
+def _canonical_rule(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return value
+    return compile_rule(value).canonical
+
+
+def _validate_metadata(value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not value or "window_hours" not in value:
+        return value
+    hours = value["window_hours"]
+    if isinstance(hours, bool) or not isinstance(hours, int) or not 1 <= hours <= MAX_WINDOW_HOURS:
+        raise ValueError(f"metadata.window_hours must be an integer between 1 and {MAX_WINDOW_HOURS}")
+    return value
+
+
 class ConditionSubscriptionBase(BaseModel):
     label: str
     condition_type: ConditionType
@@ -33,6 +52,24 @@ class ConditionSubscriptionBase(BaseModel):
     radius_km: Optional[float] = None
     channel_overrides: Dict[str, bool] | None = None
     metadata: Dict[str, Any] | None = None
+    rule: Optional[str] = None
+
+    @validator("rule")
+    def validate_rule(cls, value):  # type: ignore[override]
+        return _canonical_rule(value)
+
+    @validator("metadata")
+    def validate_metadata(cls, value):  # type: ignore[override]
+        return _validate_metadata(value)
+
+    @root_validator(skip_on_failure=True)
+    def validate_compound(cls, values):  # type: ignore[override]
+        is_compound = values.get("condition_type") == "compound"
+        if is_compound and not values.get("rule"):
+            raise ValueError("rule is required for compound conditions")
+        if not is_compound and values.get("rule") is not None:
+            raise ValueError("rule is only allowed for compound conditions")
+        return values
 
     @validator("comparison")
     def validate_comparison(cls, value):  # type: ignore[override]
@@ -65,6 +102,15 @@ class ConditionSubscriptionUpdate(BaseModel):
     latitude: Optional[float] = None
     longitude: Optional[float] = None
     radius_km: Optional[float] = None
+    rule: Optional[str] = None
+
+    @validator("rule")
+    def validate_rule(cls, value):  # type: ignore[override]
+        return _canonical_rule(value)
+
+    @validator("metadata")
+    def validate_metadata(cls, value):  # type: ignore[override]
+        return _validate_metadata(value)
 
     @validator("comparison")
     def validate_comparison(cls, value):  # type: ignore[override]
@@ -94,6 +140,7 @@ class ConditionSubscriptionResponse(BaseModel):
     latitude: float
     longitude: float
     radius_km: Optional[float]
+    rule: Optional[str] = None
     channel_overrides: Dict[str, bool]
     metadata: Dict[str, Any] | None = Field(None, alias="metadata_json")
     is_active: bool
@@ -106,8 +153,19 @@ class ConditionSubscriptionResponse(BaseModel):
         allow_population_by_field_name = True
 
 
-class ConditionEvaluationResponse(BaseModel):
-    triggered: int
+class ConditionEvaluationJob(BaseModel):
+    job_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    dry_run: bool
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    due: int = 0
+    gridpoints_fetched: int = 0
+    triggered: int = 0
+    skipped: int = 0
+    phase_seconds: Dict[str, float] = Field(default_factory=dict)
 
 
 class ForecastPeriod(BaseModel):
@@ -119,3 +177,77 @@ class ForecastPeriod(BaseModel):
 
 class ForecastPreview(BaseModel):
     periods: list[ForecastPeriod]
+
+
+class ConditionBacktestRequest(BaseModel):
+    condition_type: ConditionType
+    latitude: float = Field(..., ge=-90.0, le=90.0)
+    longitude: float = Field(..., ge=-180.0, le=180.0)
+    threshold_value: Optional[float] = None
+    comparison: Optional[str] = None
+    rule: Optional[str] = None
+    window_hours: Optional[int] = Field(None, ge=1, le=MAX_WINDOW_HOURS)
+    cooldown_minutes: Optional[int] = Field(None, ge=0)
+    days: int = Field(30, ge=1, le=90)
+
+    @validator("rule")
+    def validate_rule(cls, value):  # type: ignore[override]
+        return _canonical_rule(value)
+
+    @root_validator(skip_on_failure=True)
+    def validate_compound(cls, values):  # type: ignore[override]
+        is_compound = values.get("condition_type") == "compound"
+        if is_compound and not values.get("rule"):
+            raise ValueError("rule is required for compound conditions")
+        if not is_compound and values.get("rule") is not None:
+            raise ValueError("rule is only allowed for compound conditions")
+        return values
+
+    @validator("comparison")
+    def validate_comparison(cls, value):  # type: ignore[override]
+        if value is None:
+            return value
+        if value not in {"above", "below"}:
+            raise ValueError("comparison must be 'above' or 'below'")
+        return value
+
+
+class ConditionBacktestResult(BaseModel):
+    gridpoint: str
+    since: datetime
+    until: datetime
+    snapshots: int
+    matched: int
+    triggers: int
+    trigger_times: list[datetime]
+
+
+class ThresholdOverride(BaseModel):
+    condition_type: ConditionType
+    threshold_value: float
+    tenant_id: Optional[str] = None
+
+
+class ConditionSimulationRequest(BaseModel):
+    defaults: Dict[ConditionType, float] = Field(default_factory=dict)
+    overrides: list[ThresholdOverride] = Field(default_factory=list)
+    respect_cooldown: bool = True
+
+
+class SimulationCounts(BaseModel):
+    alerts: int
+    baseline: int
+    proposed: int
+
+
+class ConditionSimulationResult(BaseModel):
+    alerts: int
+    evaluated: int
+    without_forecast: int
+    in_cooldown: int
+    baseline_triggers: int
+    proposed_triggers: int
+    kafka_messages: int
+    kafka_bytes: int
+    by_tenant: Dict[str, SimulationCounts]
+    by_condition: Dict[str, SimulationCounts]
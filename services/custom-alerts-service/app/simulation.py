@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .forecast import ForecastSeries
+from .forecast_cache import ForecastCache, forecast_cache
+from .models import ConditionAlert
+from .rules import RuleSyntaxError, compile_rule
+from .schemas import DEFAULTS
+from .threshold_index import WindowSummary, rule_for
+from .units import COMPOUND, build_dispatch, cooldown_minutes_for, tenant_for, to_utc, window_hours_for
+
+# WindowSummary attributes, in the column order of the per-view summary matrix.
+_ATTRIBUTES = ("temperature_max", "temperature_min", "precip_max", "wind_max", "wind_min")
+# Payloads serialized to estimate Kafka bytes; the rest are extrapolated from their mean size.
+_PAYLOAD_SAMPLE = 200
+
+# Columns read for matching; full rows are never loaded.
+_COLUMNS = (
+    ConditionAlert.id,
+    ConditionAlert.tenant_id,
+    ConditionAlert.condition_type,
+    ConditionAlert.comparison,
+    ConditionAlert.threshold_value,
+    ConditionAlert.gridpoint,
+    ConditionAlert.rule,
+    ConditionAlert.metadata_json,
+    ConditionAlert.last_triggered_at,
+)
+# Columns ``build_dispatch`` reads, loaded only for the sampled payloads.
+_PAYLOAD_COLUMNS = (
+    ConditionAlert.id,
+    ConditionAlert.user_id,
+    ConditionAlert.label,
+    ConditionAlert.condition_type,
+    ConditionAlert.latitude,
+    ConditionAlert.longitude,
+    ConditionAlert.radius_km,
+    ConditionAlert.channel_overrides,
+)
+_ROW_DTYPE = np.dtype(
+    [
+        ("id", np.int64),
+        ("tenant", object),
+        ("condition_type", object),
+        ("gridpoint", object),
+        ("rule", object),
+        ("window_hours", np.int64),
+        ("threshold", np.float64),
+        ("attribute", np.int64),
+        ("above", bool),
+        ("cooling", bool),
+    ]
+)
+
+
+@dataclass(frozen=True)
+class ThresholdChange:
+    """Replace the threshold of every ``condition_type`` alert, optionally within one tenant."""
+
+    condition_type: str
+    threshold_value: float
+    tenant_id: Optional[str] = None
+
+
+@dataclass
+class SimulationBucket:
+    alerts: int = 0
+    baseline: int = 0
+    proposed: int = 0
+
+
+@dataclass
+class SimulationResult:
+    alerts: int = 0
+    evaluated: int = 0
+    without_forecast: int = 0
+    in_cooldown: int = 0
+    baseline_triggers: int = 0
+    proposed_triggers: int = 0
+    kafka_messages: int = 0
+    kafka_bytes: int = 0
+    by_tenant: Dict[str, SimulationBucket] = field(default_factory=dict)
+    by_condition: Dict[str, SimulationBucket] = field(default_factory=dict)
+
+
+async def simulate_thresholds(
+    session: AsyncSession,
+    *,
+    defaults: Mapping[str, float],
+    changes: Sequence[ThresholdChange] = (),
+    respect_cooldown: bool = True,
+    now: Optional[datetime] = None,
+    cache: Optional[ForecastCache] = None,
+) -> SimulationResult:
+    """Count what the current cycle would dispatch today and under a proposed rule set.
+
+    Every active alert is matched against the forecast already cached for its
+    gridpoint (fresh or stale; nothing is fetched and nothing is dispatched).
+    Alerts still on their type's ``DEFAULTS`` threshold move to the value in
+    ``defaults``; ``changes`` then apply in order, later ones winning. Only the
+    columns matching reads are selected, into one row array, and the comparisons
+    for all alerts run as one vectorized pass over a matrix of per-gridpoint window
+    summaries. Compound rules have no threshold and match the same way in both
+    scenarios.
+    """
+    now = to_utc(now or datetime.now(timezone.utc))
+    cache = cache if cache is not None else forecast_cache
+    stmt = select(*_COLUMNS).where(ConditionAlert.is_active.is_(True)).order_by(ConditionAlert.id)
+    rows = (await session.execute(stmt)).all()
+    table = np.array([_row(row, now) for row in rows], dtype=_ROW_DTYPE)
+    size = len(table)
+    condition = table["condition_type"]
+
+    gridpoints, gridpoint_index = np.unique(table["gridpoint"], return_inverse=True)
+    series_by_gridpoint: List[Optional[ForecastSeries]] = []
+    for gridpoint in gridpoints:
+        entry = await cache.apeek(gridpoint) if gridpoint else None
+        series_by_gridpoint.append(entry.series.window(len(entry.series), now=now) if entry is not None else None)
+    has_forecast = np.array([series is not None for series in series_by_gridpoint], dtype=bool)[gridpoint_index]
+
+    forced = np.zeros(size, dtype=bool)
+    compound = has_forecast & (condition == COMPOUND)
+    compound_matches: Dict[Tuple[int, str, int], bool] = {}
+    for row in np.flatnonzero(compound):
+        match_key = (int(gridpoint_index[row]), table["rule"][row], int(table["window_hours"][row]))
+        if match_key not in compound_matches:
+            compound_matches[match_key] = _compound_matches(series_by_gridpoint[match_key[0]], *match_key[1:])
+        forced[row] = compound_matches[match_key]
+
+    # One row per (gridpoint, window) summary plus a trailing NaN row for alerts without one.
+    threshold_rows = has_forecast & ~compound & (table["attribute"] >= 0)
+    views, view_rows = np.unique(
+        np.stack([gridpoint_index[threshold_rows], table["window_hours"][threshold_rows]], axis=1).reshape(-1, 2),
+        axis=0,
+        return_inverse=True,
+    )
+    summaries = [WindowSummary.from_series(series_by_gridpoint[gridpoint], int(hours)) for gridpoint, hours in views]
+    view_index = np.full(size, len(summaries), dtype=np.int64)
+    view_index[threshold_rows] = view_rows.reshape(-1)
+    matrix = np.array(
+        [[getattr(summary, attribute) for attribute in _ATTRIBUTES] for summary in summaries]
+        + [[np.nan] * len(_ATTRIBUTES)],
+        dtype=np.float64,
+    )
+    rain = np.array([summary.rain for summary in summaries] + [False], dtype=bool)
+    forced |= (condition == "precipitation") & rain[view_index]
+
+    values = matrix[view_index, np.maximum(table["attribute"], 0)]
+    above = table["above"]
+    baseline_threshold = np.where(threshold_rows, table["threshold"], np.nan)
+    proposed_threshold = _proposed(table, baseline_threshold, defaults, changes)
+    cooling = table["cooling"]
+    eligible = has_forecast & ~cooling if respect_cooldown else has_forecast
+    # NaN values and thresholds compare False, so unknown windows never match.
+    with np.errstate(invalid="ignore"):
+        baseline = eligible & (forced | np.where(above, values >= baseline_threshold, values <= baseline_threshold))
+        proposed = eligible & (forced | np.where(above, values >= proposed_threshold, values <= proposed_threshold))
+
+    return SimulationResult(
+        alerts=size,
+        evaluated=int(has_forecast.sum()),
+        without_forecast=int((~has_forecast).sum()),
+        in_cooldown=int((has_forecast & cooling).sum()) if respect_cooldown else 0,
+        baseline_triggers=int(baseline.sum()),
+        proposed_triggers=int(proposed.sum()),
+        kafka_messages=int(proposed.sum()),
+        kafka_bytes=await _estimate_bytes(session, table["id"][proposed], now),
+        by_tenant=_buckets(table["tenant"], baseline, proposed),
+        by_condition=_buckets(condition, baseline, proposed),
+    )
+
+
+def _row(row: Row, now: datetime) -> tuple:
+    spec = rule_for(row)
+    last_triggered_at = row.last_triggered_at
+    cooling = (
+        last_triggered_at is not None
+        and to_utc(last_triggered_at) + timedelta(minutes=cooldown_minutes_for(row)) > now
+    )
+    return (
+        row.id,
+        tenant_for(row),
+        row.condition_type,
+        row.gridpoint or "",
+        row.rule or "",
+        window_hours_for(row),
+        float(row.threshold_value or 0.0),
+        _ATTRIBUTES.index(spec[0]) if spec is not None else -1,
+        spec is None or spec[1] == "above",
+        cooling,
+    )
+
+
+def _compound_matches(series: ForecastSeries, source: str, window_hours: int) -> bool:
+    try:
+        rule = compile_rule(source)
+    except RuleSyntaxError:
+        return False
+    return rule.matches(series, rule.within_hours or window_hours)
+
+
+def _proposed(
+    table: np.ndarray,
+    baseline_threshold: np.ndarray,
+    defaults: Mapping[str, float],
+    changes: Sequence[ThresholdChange],
+) -> np.ndarray:
+    proposed = baseline_threshold.copy()
+    condition = table["condition_type"]
+    for condition_type, threshold in defaults.items():
+        on_default = (condition == condition_type) & (table["threshold"] == DEFAULTS[condition_type]["threshold_value"])
+        proposed[on_default & ~np.isnan(baseline_threshold)] = float(threshold)
+    for change in changes:
+        changed = condition == change.condition_type
+        if change.tenant_id is not None:
+            changed &= table["tenant"] == change.tenant_id
+        proposed[changed & ~np.isnan(baseline_threshold)] = float(change.threshold_value)
+    return proposed
+
+
+def _buckets(labels: np.ndarray, baseline: np.ndarray, proposed: np.ndarray) -> Dict[str, SimulationBucket]:
+    if not labels.size:
+        return {}
+    names, codes = np.unique(labels, return_inverse=True)
+    alerts = np.bincount(codes, minlength=len(names))
+    baseline_counts = np.bincount(codes, weights=baseline, minlength=len(names))
+    proposed_counts = np.bincount(codes, weights=proposed, minlength=len(names))
+    return {
+        str(name): SimulationBucket(
+            alerts=int(alerts[index]),
+            baseline=int(baseline_counts[index]),
+            proposed=int(proposed_counts[index]),
+        )
+        for index, name in enumerate(names)
+    }
+
+
+async def _estimate_bytes(session: AsyncSession, triggered_ids: np.ndarray, now: datetime) -> int:
+    if not triggered_ids.size:
+        return 0
+    step = max(1, triggered_ids.size // _PAYLOAD_SAMPLE)
+    sample = [int(alert_id) for alert_id in triggered_ids[::step][:_PAYLOAD_SAMPLE]]
+    stmt = select(*_PAYLOAD_COLUMNS).where(ConditionAlert.id.in_(sample))
+    sizes = [
+        len(json.dumps(build_dispatch(row, now).asdict()).encode("utf-8"))
+        for row in (await session.execute(stmt)).all()
+    ]
+    return int(round(sum(sizes) / len(sizes) * triggered_ids.size)) if sizes else 0
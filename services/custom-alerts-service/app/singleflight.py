@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from .metrics import upstream_coalesced_total
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one in-flight awaitable.
+
+    The first caller starts the work; callers arriving before it finishes await the
+    same task. The task is shielded, so one cancelled caller (a dropped HTTP request)
+    does not fail the others. Nothing is cached once the task completes.
+    """
+
+    def __init__(self, operation: str) -> None:
+        self._operation = operation
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            upstream_coalesced_total.labels(operation=self._operation).inc()
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from .config import settings
+from .metrics import dispatch_spool_depth, dispatch_spool_oldest_age_seconds
+
+_SEGMENT_RE = re.compile(r"^segment-(\d{12})\.log$")
+_CURSOR_FILE = "cursor.json"
+
+# (segment number, byte offset) of the next record to drain.
+Cursor = Tuple[int, int]
+
+
+@dataclass
+class SpoolBatch:
+    payloads: List[Dict[str, Any]]
+    ends: List[Cursor]
+
+
+class DispatchSpool:
+    """Append-only on-disk queue of dispatch payloads, drained in order.
+
+    Records are JSON lines in numbered segment files that roll over at
+    ``dispatch_spool_segment_bytes``. Each ``append`` call is one write followed by
+    one fsync, so a chunk's matches cost a single disk flush. A cursor file records
+    how far the drain has got; segments behind it are deleted. A torn record at the
+    tail of the last segment (a crash mid-write) is discarded on open.
+
+    Methods block on disk I/O; async callers run them in a worker thread.
+    """
+
+    def __init__(self, directory: str, *, segment_bytes: Optional[int] = None) -> None:
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._segment_bytes = segment_bytes or settings.dispatch_spool_segment_bytes
+        self._lock = threading.Lock()
+        self._cursor: Cursor = self._load_cursor()
+        segments = self._segments()
+        self._active = segments[-1] if segments else max(1, self._cursor[0])
+        self._handle: Optional[BinaryIO] = None
+        self._open_active()
+        self._depth, self._oldest_at = self._scan()
+        self._publish()
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def oldest_age(self, now: Optional[float] = None) -> float:
+        if self._oldest_at is None:
+            return 0.0
+        return max(0.0, (now or time.time()) - self._oldest_at)
+
+    def append(self, payloads: Sequence[Dict[str, Any]]) -> None:
+        if not payloads:
+            return
+        spooled_at = time.time()
+        with self._lock:
+            assert self._handle is not None
+            for payload in payloads:
+                record = json.dumps({"spooled_at": spooled_at, "payload": payload}, separators=(",", ":"))
+                self._handle.write(record.encode("utf-8") + b"\n")
+                if self._handle.tell() >= self._segment_bytes:
+                    self._sync()
+                    self._handle.close()
+                    self._active += 1
+                    self._open_active()
+            self._sync()
+            if self._depth == 0:
+                self._oldest_at = spooled_at
+            self._depth += len(payloads)
+            self._publish()
+
+    def peek(self, limit: int) -> SpoolBatch:
+        """Read up to ``limit`` records from the cursor onwards without consuming them."""
+        batch = SpoolBatch(payloads=[], ends=[])
+        with self._lock:
+            for record, end in self._records(self._cursor, limit):
+                batch.payloads.append(record["payload"])
+                batch.ends.append(end)
+        return batch
+
+    def commit(self, end: Cursor, count: int) -> None:
+        """Mark every record before ``end`` (``count`` of them) as delivered."""
+        with self._lock:
+            self._cursor = end
+            self._write_cursor()
+            for segment in self._segments():
+                if segment < end[0] and segment != self._active:
+                    (self._directory / _segment_name(segment)).unlink(missing_ok=True)
+            self._depth = max(0, self._depth - count)
+            following = list(self._records(self._cursor, 1))
+            self._oldest_at = following[0][0]["spooled_at"] if following else None
+            self._publish()
+
+    def publish_metrics(self) -> None:
+        self._publish()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._sync()
+                self._handle.close()
+                self._handle = None
+
+    def _records(self, start: Cursor, limit: int):
+        segment, offset = start
+        yielded = 0
+        for number in self._segments():
+            if yielded >= limit:
+                return
+            if number < segment:
+                continue
+            path = self._directory / _segment_name(number)
+            with path.open("rb") as handle:
+                handle.seek(offset if number == segment else 0)
+                while yielded < limit:
+                    line = handle.readline()
+                    if not line.endswith(b"\n"):
+                        break
+                    yielded += 1
+                    yield json.loads(line), (number, handle.tell())
+
+    def _scan(self) -> Tuple[int, Optional[float]]:
+        depth = 0
+        oldest: Optional[float] = None
+        for record, _ in self._records(self._cursor, 1 << 62):
+            if oldest is None:
+                oldest = record["spooled_at"]
+            depth += 1
+        return depth, oldest
+
+    def _segments(self) -> List[int]:
+        numbers = []
+        for path in self._directory.iterdir():
+            match = _SEGMENT_RE.match(path.name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return sorted(numbers)
+
+    def _open_active(self) -> None:
+        path = self._directory / _segment_name(self._active)
+        handle = path.open("ab+")
+        handle.seek(0)
+        data = handle.read()
+        intact = data.rfind(b"\n") + 1
+        if intact != len(data):
+            logger.warning("Discarding torn record at end of dispatch spool", segment=path.name)
+            handle.truncate(intact)
+        handle.seek(0, os.SEEK_END)
+        self._handle = handle  # type: ignore[assignment]
+
+    def _sync(self) -> None:
+        assert self._handle is not None
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def _load_cursor(self) -> Cursor:
+        path = self._directory / _CURSOR_FILE
+        try:
+            data = json.loads(path.read_text())
+            return int(data["segment"]), int(data["offset"])
+        except FileNotFoundError:
+            return 0, 0
+        except (OSError, ValueError, KeyError) as exc:
+            # Replaying from the start re-sends records; losing them would be worse.
+            logger.warning("Unreadable dispatch spool cursor; draining from the start", error=str(exc))
+            return 0, 0
+
+    def _write_cursor(self) -> None:
+        path = self._directory / _CURSOR_FILE
+        tmp_path = path.with_suffix(".tmp")
+        with tmp_path.open("w") as handle:
+            json.dump({"segment": self._cursor[0], "offset": self._cursor[1]}, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+
+    def _publish(self) -> None:
+        dispatch_spool_depth.set(self._depth)
+        dispatch_spool_oldest_age_seconds.set(self.oldest_age())
+
+
+def _segment_name(number: int) -> str:
+    return f"segment-{number:012d}.log"
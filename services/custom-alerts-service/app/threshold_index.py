@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .forecast import ForecastSeries
+from .models import ConditionAlert
+
+GroupKey = Tuple[str, str]
+
+# (condition_type, comparison) -> (WindowSummary attribute, direction). Only wind honours
+# ``comparison``; the other condition types have a fixed direction.
+_RULES: Dict[GroupKey, Tuple[str, str]] = {
+    ("temperature_hot", "above"): ("temperature_max", "above"),
+    ("temperature_cold", "below"): ("temperature_min", "below"),
+    ("precipitation", "above"): ("precip_max", "above"),
+    ("wind", "above"): ("wind_max", "above"),
+    ("wind", "below"): ("wind_min", "below"),
+}
+
+
+@dataclass(frozen=True)
+class WindowSummary:
+    """Extremes of each metric over a gridpoint's evaluation window (NaN when unknown)."""
+
+    temperature_max: float
+    temperature_min: float
+    precip_max: float
+    wind_max: float
+    wind_min: float
+    rain: bool
+
+    @classmethod
+    def from_series(cls, series: ForecastSeries, hours: int) -> "WindowSummary":
+        window = series.window(hours)
+        return cls.from_arrays(
+            temperature_f=window.temperature_f,
+            precip_probability=window.precip_probability,
+            wind_mph=window.wind_mph,
+            rain=bool(window.rain.any()),
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        *,
+        temperature_f: np.ndarray,
+        precip_probability: np.ndarray,
+        wind_mph: np.ndarray,
+        rain: bool,
+    ) -> "WindowSummary":
+        return cls(
+            temperature_max=_extreme(np.fmax, temperature_f),
+            temperature_min=_extreme(np.fmin, temperature_f),
+            precip_max=_extreme(np.fmax, precip_probability),
+            wind_max=_extreme(np.fmax, wind_mph),
+            wind_min=_extreme(np.fmin, wind_mph),
+            rain=rain,
+        )
+
+
+# WindowSummary attribute -> ForecastSeries column it is reduced from.
+SERIES_COLUMNS: Dict[str, str] = {
+    "temperature_max": "temperature_f",
+    "temperature_min": "temperature_f",
+    "precip_max": "precip_probability",
+    "wind_max": "wind_mph",
+    "wind_min": "wind_mph",
+}
+
+
+def rule_for(alert: ConditionAlert) -> Optional[Tuple[str, str]]:
+    """Return the ``(WindowSummary attribute, direction)`` an alert is matched on."""
+    key = group_key(alert)
+    return _RULES[key] if key is not None else None
+
+
+def group_key(alert: ConditionAlert) -> Optional[GroupKey]:
+    comparison = (alert.comparison or "above").lower()
+    if alert.condition_type != "wind":
+        comparison = "below" if alert.condition_type == "temperature_cold" else "above"
+    key = (alert.condition_type, comparison)
+    return key if key in _RULES else None
+
+
+class ThresholdIndex:
+    """Alerts sharing a gridpoint, grouped by rule and sorted by threshold.
+
+    Finding the triggered alerts for a window is one bisect per group, so the
+    cost is O(log n + triggered) rather than one window scan per alert.
+    """
+
+    def __init__(self, alerts: Iterable[ConditionAlert]) -> None:
+        grouped: Dict[GroupKey, List[Tuple[float, ConditionAlert]]] = {}
+        for alert in alerts:
+            key = group_key(alert)
+            if key is None:
+                continue
+            grouped.setdefault(key, []).append((float(alert.threshold_value or 0.0), alert))
+        self._groups: Dict[GroupKey, Tuple[List[float], List[ConditionAlert]]] = {}
+        for key, items in grouped.items():
+            items.sort(key=lambda item: item[0])
+            self._groups[key] = ([threshold for threshold, _ in items], [alert for _, alert in items])
+
+    def triggered(self, summary: WindowSummary) -> List[ConditionAlert]:
+        matches: List[ConditionAlert] = []
+        for key, (thresholds, alerts) in self._groups.items():
+            if key[0] == "precipitation" and summary.rain:
+                matches.extend(alerts)
+                continue
+            attribute, direction = _RULES[key]
+            value = getattr(summary, attribute)
+            if np.isnan(value):
+                continue
+            if direction == "above":
+                matches.extend(alerts[: bisect_right(thresholds, value)])
+            else:
+                matches.extend(alerts[bisect_left(thresholds, value) :])
+        return matches
+
+
+def _extreme(ufunc: np.ufunc, values: np.ndarray) -> float:
+    return float(ufunc.reduce(values, initial=np.nan))
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+from .config import settings
+from .fairness import DEFAULT_TENANT
+from .models import ConditionAlert
+from .rules import MAX_WINDOW_HOURS, RuleSyntaxError, compile_rule
+from .threshold_index import group_key
+
+COMPOUND = "compound"
+
+
+class UnitKey(NamedTuple):
+    gridpoint: str
+    condition_type: str
+    comparison: str
+    threshold: float
+    window_hours: int
+    # Non-zero only for gridded evaluation, where the unit covers every cell within the radius.
+    radius_km: float = 0.0
+
+
+@dataclass
+class EvaluationUnit:
+    """One canonical rule on one gridpoint, shared by every subscription that states it.
+
+    The unit is evaluated once and its outcome fanned out to ``alerts``; cooldowns,
+    channel overrides and delivery stay per subscription.
+    """
+
+    key: UnitKey
+    alerts: List[ConditionAlert] = field(default_factory=list)
+
+    @property
+    def representative(self) -> ConditionAlert:
+        return self.alerts[0]
+
+
+def window_hours_for(alert: ConditionAlert) -> int:
+    metadata = alert.metadata_json or {}
+    value = metadata.get("window_hours")
+    # The API rejects bad values; rows written before that check are clamped instead.
+    if isinstance(value, int) and not isinstance(value, bool) and value > 0:
+        return min(value, MAX_WINDOW_HOURS)
+    return settings.evaluation_window_hours
+
+
+@dataclass
+class DispatchRequest:
+    match: Dict[str, Any]
+    user_preferences: Dict[str, Any]
+
+    def asdict(self) -> Dict[str, Any]:
+        return {"match": self.match, "user_preferences": self.user_preferences}
+
+
+def to_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def cooldown_minutes_for(alert: ConditionAlert) -> int:
+    metadata = alert.metadata_json or {}
+    value = metadata.get("cooldown_minutes")
+    if isinstance(value, (int, float)) and value >= 0:
+        return int(value)
+    return settings.cooldown_minutes_default
+
+
+def build_dispatch(
+    alert: ConditionAlert,
+    now: datetime,
+    preferences: Optional[Dict[str, Any]] = None,
+) -> DispatchRequest:
+    preferences = preferences or {"channels": {"push": True}}
+    channels = preferences.get("channels", {}).copy()
+    overrides = alert.channel_overrides or {}
+    channels.update(overrides)
+    if not channels:
+        channels = {"push": True}
+
+    user_preferences = {
+        "channels": channels,
+        "quiet_hours": preferences.get("quiet_hours"),
+        "severity_filter": preferences.get("severity_filter"),
+    }
+
+    current = to_utc(now)
+    match_payload = {
+        "alert_id": f"condition-{alert.id}-{int(current.timestamp())}",
+        "user_id": alert.user_id,
+        "event": alert.label,
+        "severity": "info",
+        "sent": current.isoformat(),
+        "subscription_id": alert.id,
+        "match_score": 1.0,
+        "condition_type": alert.condition_type,
+        "latitude": alert.latitude,
+        "longitude": alert.longitude,
+        "radius_km": alert.radius_km,
+    }
+
+    return DispatchRequest(match=match_payload, user_preferences=user_preferences)
+
+
+def tenant_for(alert: ConditionAlert) -> str:
+    return alert.tenant_id or DEFAULT_TENANT
+
+
+def unit_key(alert: ConditionAlert, gridpoint: str, *, gridded: bool = False) -> Optional[UnitKey]:
+    if alert.condition_type == COMPOUND:
+        return _compound_key(alert, gridpoint)
+    key = group_key(alert)
+    if key is None:
+        return None
+    condition_type, comparison = key
+    return UnitKey(
+        gridpoint=gridpoint,
+        condition_type=condition_type,
+        comparison=comparison,
+        threshold=float(alert.threshold_value or 0.0),
+        window_hours=window_hours_for(alert),
+        radius_km=min(float(alert.radius_km or 0.0), settings.gridded_max_radius_km) if gridded else 0.0,
+    )
+
+
+def _compound_key(alert: ConditionAlert, gridpoint: str) -> Optional[UnitKey]:
+    # Compound rules share a unit when their canonical forms match; the rule hash
+    # stands in for the comparison and the rule's own window wins over metadata.
+    try:
+        rule = compile_rule(alert.rule or "")
+    except RuleSyntaxError:
+        return None
+    return UnitKey(
+        gridpoint=gridpoint,
+        condition_type=COMPOUND,
+        comparison=rule.digest,
+        threshold=0.0,
+        window_hours=rule.within_hours or window_hours_for(alert),
+    )
+
+
+def build_units(
+    alerts: Iterable[ConditionAlert],
+    gridpoints: Mapping[int, str],
+    *,
+    gridded: bool = False,
+) -> List[EvaluationUnit]:
+    """Collapse alerts with a resolved gridpoint into shared evaluation units.
+
+    With ``gridded`` set, threshold alerts are also keyed by ``radius_km`` and
+    matched against every grid cell within it.
+    """
+    units: Dict[UnitKey, EvaluationUnit] = {}
+    for alert in alerts:
+        gridpoint = gridpoints.get(alert.id)
+        if not gridpoint:
+            continue
+        key = unit_key(alert, gridpoint, gridded=gridded)
+        if key is None:
+            continue
+        units.setdefault(key, EvaluationUnit(key=key)).alerts.append(alert)
+    return list(units.values())
@@ -1,16 +1,73 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List, Optional
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Mapping, Optional, Sequence, Tuple
 
 import httpx
+import numpy as np
+from loguru import logger
 
 from .config import settings
+from .archive import ForecastArchive, forecast_archive
+from .forecast import ForecastSeries
+from .forecast_cache import CachedForecast, ForecastCache, expiry_from_headers, forecast_cache
+from .grid import GridTile, TileKey
+from .metrics import (
+    grid_tile_fetches_total,
+    noaa_hedged_requests_total,
+    noaa_request_seconds,
+    noaa_stale_fallbacks_total,
+)
+from .resilience import CircuitOpenError, LatencyTracker, breaker_for, latency_for
+from .singleflight import SingleFlight
+
+_RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Shared by every client in the process so concurrent misses for one gridpoint make one NOAA call.
+_point_flights = SingleFlight("points")
+_forecast_flights = SingleFlight("forecast")
+_raw_flights = SingleFlight("gridpoint_raw")
+
+
+@dataclass(frozen=True)
+class Gridpoint:
+    office: str
+    grid_x: int
+    grid_y: int
+
+    @property
+    def key(self) -> str:
+        return f"{self.office}/{self.grid_x},{self.grid_y}"
+
+    @property
+    def forecast_hourly_url(self) -> str:
+        return f"{self.raw_url}/forecast/hourly"
+
+    @property
+    def raw_url(self) -> str:
+        return f"{settings.noaa_base_url}/gridpoints/{self.office}/{self.grid_x},{self.grid_y}"
+
+    @classmethod
+    def parse(cls, key: str) -> "Gridpoint":
+        office, _, coords = key.partition("/")
+        grid_x, _, grid_y = coords.partition(",")
+        return cls(office=office, grid_x=int(grid_x), grid_y=int(grid_y))
 
 
 class NoaaWeatherClient:
-    def __init__(self, *, client: Optional[httpx.AsyncClient] = None) -> None:
+    def __init__(
+        self,
+        *,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ForecastCache] = None,
+        archive: Optional[ForecastArchive] = None,
+    ) -> None:
         self._external_client = client is not None
+        self._cache = cache if cache is not None else forecast_cache
+        self._archive = archive if archive is not None else forecast_archive
         self._client = client or httpx.AsyncClient(
             timeout=15.0,
             follow_redirects=True,
@@ -20,49 +77,232 @@ class NoaaWeatherClient:
             },
         )
 
-    async def fetch_hourly_forecast(self, latitude: float, longitude: float) -> List[Dict[str, Any]]:
+    async def resolve_gridpoint(self, latitude: float, longitude: float) -> Gridpoint:
+        cached = self._cache.gridpoint_for(latitude, longitude)
+        if cached is not None:
+            return Gridpoint.parse(cached)
+        point = (round(latitude, 4), round(longitude, 4))
+        return await _point_flights.run(point, lambda: self._fetch_gridpoint(latitude, longitude))
+
+    async def _fetch_gridpoint(self, latitude: float, longitude: float) -> Gridpoint:
         points_url = f"{settings.noaa_base_url}/points/{latitude},{longitude}"
-        response = await self._get_with_retry(points_url)
-        payload = response.json()
-        forecast_url = payload.get("properties", {}).get("forecastHourly")
-        if not forecast_url:
-            raise RuntimeError("NOAA response missing forecastHourly URL")
-        forecast_response = await self._get_with_retry(forecast_url)
-        forecast_payload = forecast_response.json()
-        periods = forecast_payload.get("properties", {}).get("periods", [])
-        if not isinstance(periods, list):
-            raise RuntimeError("NOAA hourly forecast missing periods list")
-        return periods
-
-    async def _get_with_retry(self, url: str) -> httpx.Response:
+        response = await self._get_with_retry(points_url, endpoint="points")
+        properties = response.json().get("properties", {})
+        office = properties.get("gridId")
+        grid_x = properties.get("gridX")
+        grid_y = properties.get("gridY")
+        if not office or grid_x is None or grid_y is None:
+            raise RuntimeError("NOAA response missing gridpoint identity")
+        gridpoint = Gridpoint(office=str(office), grid_x=int(grid_x), grid_y=int(grid_y))
+        self._cache.remember_point(latitude, longitude, gridpoint.key)
+        return gridpoint
+
+    async def fetch_gridpoint_forecast(
+        self, gridpoint: Gridpoint, *, min_fresh_until: Optional[datetime] = None
+    ) -> ForecastSeries:
+        """Hourly forecast for ``gridpoint``, from the cache while it is fresh.
+
+        With ``min_fresh_until`` a cached entry that expires before then is
+        revalidated now, which is how the prefetcher warms gridpoints due soon.
+        """
+        return await self._cached_series(
+            gridpoint.key,
+            gridpoint.forecast_hourly_url,
+            "forecast",
+            _forecast_flights,
+            _hourly_series,
+            min_fresh_until=min_fresh_until,
+        )
+
+    async def fetch_gridpoint_raw(self, gridpoint: Gridpoint) -> ForecastSeries:
+        """Raw data layers for one grid cell, expanded to an hourly series."""
+        return await self._cached_series(
+            f"raw:{gridpoint.key}", gridpoint.raw_url, "gridpoint_raw", _raw_flights, _raw_series
+        )
+
+    async def fetch_grid_tile(
+        self,
+        key: TileKey,
+        *,
+        now: Optional[datetime] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+    ) -> GridTile:
+        """Fetch every cell of ``key`` and stack them into one tile starting at the current hour.
+
+        Cells are cached individually, so overlapping radii and later cycles reuse
+        them. A cell that fails is left as NaN; the tile fails only if all do. Each
+        cell request holds a ``semaphore`` slot (a fresh ``forecast_concurrency`` one
+        by default), so a tile never opens more NOAA requests than the limit.
+        """
+        start = np.datetime64((now or datetime.now(timezone.utc)).replace(tzinfo=None), "h")
+        semaphore = semaphore or asyncio.Semaphore(max(1, settings.forecast_concurrency))
+        cells: Dict[Tuple[int, int], Optional[ForecastSeries]] = {}
+
+        async def _fetch_cell(grid_x: int, grid_y: int) -> None:
+            try:
+                async with semaphore:
+                    cells[(grid_x, grid_y)] = await self.fetch_gridpoint_raw(Gridpoint(key.office, grid_x, grid_y))
+            except (CircuitOpenError, httpx.HTTPError, RuntimeError) as exc:
+                cells[(grid_x, grid_y)] = None
+                logger.warning("Failed to fetch grid cell", office=key.office, x=grid_x, y=grid_y, error=str(exc))
+
+        await asyncio.gather(*(_fetch_cell(grid_x, grid_y) for grid_x, grid_y in key.cells()))
+        fetched = sum(1 for series in cells.values() if series is not None)
+        if not fetched:
+            grid_tile_fetches_total.labels(result="failed").inc()
+            raise RuntimeError(f"No grid cells available for tile {key}")
+        grid_tile_fetches_total.labels(result="ok" if fetched == len(cells) else "partial").inc()
+        return GridTile.from_cells(key, cells, start)
+
+    async def _cached_series(
+        self,
+        key: str,
+        url: str,
+        endpoint: str,
+        flights: SingleFlight,
+        parse: Callable[[Mapping[str, Any]], ForecastSeries],
+        *,
+        min_fresh_until: Optional[datetime] = None,
+    ) -> ForecastSeries:
+        now = datetime.now(timezone.utc)
+        entry = await self._cache.alookup(key, now)
+        if entry is not None and entry.is_fresh(max(now, min_fresh_until or now)):
+            return entry.series
+        return await flights.run(key, lambda: self._fetch_series(key, url, endpoint, parse, entry, now))
+
+    async def _fetch_series(
+        self,
+        key: str,
+        url: str,
+        endpoint: str,
+        parse: Callable[[Mapping[str, Any]], ForecastSeries],
+        entry: Optional[CachedForecast],
+        now: datetime,
+    ) -> ForecastSeries:
+        headers = entry.validators() if entry is not None else {}
+        try:
+            response = await self._get_with_retry(url, endpoint=endpoint, headers=headers)
+        except (CircuitOpenError, httpx.HTTPError) as exc:
+            stale_limit = timedelta(seconds=settings.noaa_stale_fallback_seconds)
+            if entry is None or now - entry.expires_at > stale_limit:
+                raise
+            noaa_stale_fallbacks_total.inc()
+            logger.warning(
+                "Serving stale forecast while NOAA is unavailable",
+                gridpoint=key,
+                expired_at=entry.expires_at.isoformat(),
+                error=str(exc),
+            )
+            return entry.series
+        expires_at = expiry_from_headers(response.headers, now)
+        if response.status_code == 304 and entry is not None:
+            await self._cache.arevalidated(key, entry, expires_at)
+            return entry.series
+
+        series = parse(response.json())
+        await self._cache.astore(
+            key,
+            CachedForecast(
+                series=series,
+                expires_at=expires_at,
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+                size_bytes=series.nbytes,
+            ),
+        )
+        if endpoint == "forecast" and self._archive.enabled:
+            await asyncio.to_thread(self._archive.record, key, series, now)
+        return series
+
+    async def fetch_hourly_forecast(self, latitude: float, longitude: float) -> ForecastSeries:
+        gridpoint = await self.resolve_gridpoint(latitude, longitude)
+        return await self.fetch_gridpoint_forecast(gridpoint)
+
+    async def _get_with_retry(
+        self,
+        url: str,
+        *,
+        endpoint: str,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> httpx.Response:
+        """GET ``url`` with retries, guarded by the circuit breaker for its host and endpoint class.
+
+        Server errors, throttling and transport errors count as failures; once the
+        circuit opens, calls raise :class:`CircuitOpenError` without touching NOAA.
+        """
+        host = httpx.URL(url).host
+        breaker = breaker_for(host, endpoint)
+        latency = latency_for(host, endpoint)
         attempt = 0
         delay = settings.noaa_initial_backoff_seconds
         while True:
+            if not breaker.allow():
+                raise CircuitOpenError(f"NOAA {endpoint} circuit is open for {host}")
+            recorded = False
             try:
-                response = await self._client.get(url)
-                response.raise_for_status()
-                return response
+                response = await self._hedged_get(url, headers, endpoint, latency)
+                if response.status_code != 304:
+                    response.raise_for_status()
             except httpx.HTTPStatusError as exc:
-                status = exc.response.status_code
-                if status not in {429, 500, 502, 503, 504} or attempt >= settings.noaa_max_retries:
+                recorded = True
+                if exc.response.status_code not in _RETRYABLE_STATUSES:
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if attempt >= settings.noaa_max_retries:
                     raise
             except httpx.TransportError:
+                recorded = True
+                breaker.record_failure()
                 if attempt >= settings.noaa_max_retries:
                     raise
+            except asyncio.CancelledError:
+                # A cancelled caller (a hedged loser, a cycle shutting down) says nothing about
+                # NOAA; only the half-open probe is released.
+                recorded = True
+                breaker.release()
+                raise
+            else:
+                recorded = True
+                breaker.record_success()
+                return response
+            finally:
+                if not recorded:
+                    # Any other outcome (redirect loops, decoding errors) still counts, so a
+                    # half-open probe is always released.
+                    breaker.record_failure()
             attempt += 1
             await asyncio.sleep(delay)
             delay *= settings.noaa_backoff_factor
+
+    async def _hedged_get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]],
+        endpoint: str,
+        latency: LatencyTracker,
+    ) -> httpx.Response:
+        """Issue the GET and, if it outlives the recent p95, race a second identical request."""
+        started = time.perf_counter()
+        hedge_delay = _hedge_delay(latency)
+        primary = asyncio.ensure_future(self._client.get(url, headers=headers))
+        if hedge_delay is None:
+            response = await primary
+        else:
+            done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+            if done:
+                response = primary.result()
+            else:
+                hedge = asyncio.ensure_future(self._client.get(url, headers=headers))
+                response = await _first_response((primary, hedge), endpoint)
+        elapsed = time.perf_counter() - started
+        latency.observe(elapsed)
+        noaa_request_seconds.labels(endpoint=endpoint).observe(elapsed)
+        return response
+
     async def fetch_forecast_preview(self, latitude: float, longitude: float, periods: int = 3):
         hourly = await self.fetch_hourly_forecast(latitude, longitude)
-        summary = []
-        for period in hourly[:periods]:
-            summary.append({
-                "start_time": period.get("startTime"),
-                "short_forecast": period.get("shortForecast"),
-                "temperature": period.get("temperature"),
-                "temperature_unit": period.get("temperatureUnit"),
-            })
-        return summary
+        return hourly.preview(periods)
 
 
     async def aclose(self) -> None:
@@ -74,3 +314,47 @@ class NoaaWeatherClient:
 
     async def __aexit__(self, exc_type, exc_value, traceback) -> None:
         await self.aclose()
+
+
+def _hourly_series(payload: Mapping[str, Any]) -> ForecastSeries:
+    periods = payload.get("properties", {}).get("periods", [])
+    if not isinstance(periods, list):
+        raise RuntimeError("NOAA hourly forecast missing periods list")
+    return ForecastSeries.from_periods(periods)
+
+
+def _raw_series(payload: Mapping[str, Any]) -> ForecastSeries:
+    properties = payload.get("properties")
+    if not isinstance(properties, Mapping):
+        raise RuntimeError("NOAA gridpoint data missing properties")
+    return ForecastSeries.from_grid_layers(properties)
+
+
+def _hedge_delay(latency: LatencyTracker) -> Optional[float]:
+    if not settings.noaa_hedge_enabled:
+        return None
+    p95 = latency.p95()
+    if p95 is None:
+        return None
+    return max(settings.noaa_hedge_min_delay_seconds, p95)
+
+
+async def _first_response(tasks: Sequence[asyncio.Future], endpoint: str) -> httpx.Response:
+    """Return the first request to succeed, cancelling the other; raise if both fail."""
+    pending = set(tasks)
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = "primary" if task is tasks[0] else "hedge"
+                    noaa_hedged_requests_total.labels(endpoint=endpoint, winner=winner).inc()
+                    return task.result()
+                error = task.exception()
+        if error is None:
+            raise RuntimeError(f"no NOAA {endpoint} request was started")
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
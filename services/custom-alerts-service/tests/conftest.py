@@ -5,24 +5,49 @@ from pathlib import Path
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from app import db
+from app import db, resilience
 from app.main import app
+from app.prefetch import prefetch_tracker
+from app.preview_cache import preview_cache
 
 
 @pytest.fixture()
-def test_engine() -> Generator:
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def _reset_upstream_state() -> Generator[None, None, None]:
+    preview_cache.clear()
+    resilience.reset()
+    prefetch_tracker.reset()
+    yield
+    preview_cache.clear()
+    resilience.reset()
+    prefetch_tracker.reset()
+
+
+@pytest.fixture()
+def database_path(tmp_path: Path) -> Path:
+    # A file database so the sync engine (routes, assertions) and the async engine
+    # (evaluator, scheduler) see the same rows.
+    return tmp_path / "custom_alerts.db"
+
+
+@pytest.fixture()
+def test_engine(database_path: Path) -> Generator:
     engine = create_engine(
-        "sqlite://",
+        f"sqlite:///{database_path}",
         future=True,
         connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
     )
     db.Base.metadata.create_all(bind=engine)
     try:
@@ -51,6 +76,34 @@ def session_local(test_engine):
         db.engine = original_engine  # type: ignore[assignment]
 
 
+@pytest.fixture()
+def async_test_engine(test_engine, database_path: Path) -> Generator:
+    # NullPool: the app and the tests may drive the engine from different event loops.
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", poolclass=NullPool)
+    yield engine
+    engine.sync_engine.dispose()
+
+
+@pytest.fixture()
+def async_session_local(async_test_engine):
+    TestingAsyncSessionLocal = async_sessionmaker(bind=async_test_engine, autoflush=False, expire_on_commit=False)
+    original_session_local = db.AsyncSessionLocal
+    original_engine = db.async_engine
+    db.AsyncSessionLocal = TestingAsyncSessionLocal  # type: ignore[assignment]
+    db.async_engine = async_test_engine  # type: ignore[assignment]
+    try:
+        yield TestingAsyncSessionLocal
+    finally:
+        db.AsyncSessionLocal = original_session_local  # type: ignore[assignment]
+        db.async_engine = original_engine  # type: ignore[assignment]
+
+
+@pytest.fixture()
+async def async_session(async_session_local):
+    async with async_session_local() as session:
+        yield session
+
+
 @pytest.fixture()
 def db_session(session_local: sessionmaker) -> Generator[Session, None, None]:
     session = session_local()
@@ -61,7 +114,7 @@ def db_session(session_local: sessionmaker) -> Generator[Session, None, None]:
 
 
 @pytest.fixture()
-def client(session_local: sessionmaker) -> Generator[TestClient, None, None]:
+def client(session_local: sessionmaker, async_session_local) -> Generator[TestClient, None, None]:
     def _get_test_session() -> Generator[Session, None, None]:
         db_ = session_local()
         try:
@@ -69,7 +122,13 @@ def client(session_local: sessionmaker) -> Generator[TestClient, None, None]:
         finally:
             db_.close()
 
+    async def _get_test_async_session():
+        async with async_session_local() as session:
+            yield session
+
     app.dependency_overrides.setdefault(db.get_session, _get_test_session)
+    app.dependency_overrides.setdefault(db.get_async_session, _get_test_async_session)
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.pop(db.get_session, None)
+    app.dependency_overrides.pop(db.get_async_session, None)
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.archive import ForecastArchive
+from app.backtest import backtest
+from app.config import settings
+from app.forecast import ForecastSeries
+from app.models import ConditionAlert
+
+START = datetime(2024, 4, 1, 12, tzinfo=timezone.utc)
+
+
+def _series(start: datetime, temperatures: list[float], text: str = "Sunny") -> ForecastSeries:
+    return ForecastSeries.from_periods(
+        [
+            {
+                "startTime": (start + timedelta(hours=hour)).isoformat(),
+                "temperature": temperature,
+                "temperatureUnit": "F",
+                "shortForecast": text,
+            }
+            for hour, temperature in enumerate(temperatures)
+        ]
+    )
+
+
+def test_archive_appends_changed_snapshots_by_day(tmp_path) -> None:
+    archive = ForecastArchive(str(tmp_path), hours=4)
+
+    assert archive.record("OKX/33,35", _series(START, [70, 71]), START)
+    assert not archive.record("OKX/33,35", _series(START, [70, 71]), START + timedelta(minutes=15))
+    assert archive.record("OKX/33,35", _series(START, [70, 75]), START + timedelta(minutes=30))
+    assert archive.record("OKX/33,35", _series(START + timedelta(days=1), [60]), START + timedelta(days=1))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["2024-04-01", "2024-04-02"]
+    windows = archive.load("OKX/33,35", START, START + timedelta(days=2))
+    assert len(windows) == 3
+    assert windows.temperature_f.shape == (3, 4)
+    np.testing.assert_array_equal(windows.temperature_f[1], [70, 75, np.nan, np.nan])
+    assert len(archive.load("OKX/33,35", START + timedelta(hours=1), START + timedelta(days=1))) == 0
+    assert len(archive.load("OKX/1,1", START, START + timedelta(days=2))) == 0
+
+
+def test_archive_prunes_partitions_past_retention(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "forecast_archive_days", 2)
+    archive = ForecastArchive(str(tmp_path), hours=4)
+    for day in range(4):
+        archive.record("OKX/33,35", _series(START, [70 + day]), START + timedelta(days=day))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["2024-04-02", "2024-04-03", "2024-04-04"]
+
+
+def test_backtest_applies_window_and_cooldown(tmp_path) -> None:
+    archive = ForecastArchive(str(tmp_path), hours=6)
+    for step in range(6):
+        fetched_at = START + timedelta(minutes=30 * step)
+        # Every snapshot but the third and sixth turns hot five hours out.
+        temperatures = [80, 80, 80, 80, 80] if step in (2, 5) else [80, 80, 80, 80, 95]
+        archive.record("OKX/33,35", _series(fetched_at, temperatures), fetched_at)
+    windows = archive.load("OKX/33,35", START, START + timedelta(days=1))
+    alert = ConditionAlert(condition_type="temperature_hot", threshold_value=90.0, comparison="above")
+
+    assert backtest(alert, windows, 3, 60).matched == 0
+    result = backtest(alert, windows, 6, 60)
+    assert (result.snapshots, result.matched) == (6, 4)
+    assert result.trigger_times == [START, START + timedelta(minutes=90)]
+    assert len(backtest(alert, windows, 6, 0).trigger_times) == 4
+
+
+def test_backtest_matches_compound_runs_per_snapshot(tmp_path) -> None:
+    archive = ForecastArchive(str(tmp_path), hours=6)
+    archive.record("OKX/33,35", _series(START, [96, 80, 96, 80]), START)
+    archive.record("OKX/33,35", _series(START, [80, 96, 96, 80]), START + timedelta(hours=2))
+    windows = archive.load("OKX/33,35", START, START + timedelta(days=1))
+    alert = ConditionAlert(condition_type="compound", rule="temperature >= 95 for 2 consecutive hours")
+
+    result = backtest(alert, windows, 6, 0)
+
+    assert result.trigger_times == [START + timedelta(hours=2)]
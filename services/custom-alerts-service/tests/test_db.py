@@ -0,0 +1,36 @@
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import QueuePool
+
+from app.db import async_database_uri, instrument_pool
+
+
+def _gauge(name: str) -> float:
+    return REGISTRY.get_sample_value(name, {"engine": "test"})
+
+
+def test_async_database_uri_swaps_drivers() -> None:
+    assert async_database_uri("postgresql+psycopg2://weather:weather@db:5432/weather") == (
+        "postgresql+asyncpg://weather:weather@db:5432/weather"
+    )
+    assert async_database_uri("sqlite:///./custom_alerts.db") == "sqlite+aiosqlite:///./custom_alerts.db"
+    assert async_database_uri("postgresql+asyncpg://db/weather") == "postgresql+asyncpg://db/weather"
+
+
+def test_pool_saturation_tracks_checked_out_connections(tmp_path) -> None:
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=QueuePool,
+        pool_size=2,
+        max_overflow=2,
+    )
+    instrument_pool(engine, "test")
+
+    with engine.connect() as first, engine.connect() as second:
+        first.execute(text("select 1"))
+        second.execute(text("select 1"))
+        assert _gauge("custom_alert_db_pool_connections_in_use") == 2
+        assert _gauge("custom_alert_db_pool_saturation") == 0.5
+
+    assert _gauge("custom_alert_db_pool_connections_in_use") == 0
+    engine.dispose()
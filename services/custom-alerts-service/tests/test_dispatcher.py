@@ -0,0 +1,122 @@
+import asyncio
+from typing import Any, Dict, List
+
+import pytest
+from aiokafka.errors import KafkaConnectionError, KafkaTimeoutError
+
+from app.config import settings
+from app.dispatcher import KafkaDispatcher
+from app.spool import DispatchSpool
+
+
+class FakeProducer:
+    def __init__(self, failing_users: set[str]) -> None:
+        self.failing_users = failing_users
+        self.sent: List[Dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def send(self, topic: str, *, value: Dict[str, Any], key: str, headers=None) -> asyncio.Future:
+        self.sent.append(value)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+        def _ack() -> None:
+            self.in_flight -= 1
+            if key in self.failing_users:
+                future.set_exception(KafkaTimeoutError())
+            else:
+                future.set_result(None)
+
+        asyncio.get_running_loop().call_soon(_ack)
+        return future
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_send_batch_bounds_in_flight_and_reports_failures(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "dispatch_max_in_flight", 3)
+    dispatcher = KafkaDispatcher()
+    producer = FakeProducer(failing_users={"user-4"})
+    dispatcher._producer = producer  # type: ignore[assignment]
+
+    payloads = [{"match": {"user_id": f"user-{index}", "subscription_id": index}} for index in range(8)]
+    failures = await dispatcher.send_batch(payloads)
+
+    assert len(producer.sent) == 8
+    assert producer.max_in_flight == 3
+    assert [failure.payload["match"]["subscription_id"] for failure in failures] == [4]
+    assert isinstance(failures[0].error, KafkaTimeoutError)
+
+
+class OutageProducer(FakeProducer):
+    def __init__(self) -> None:
+        super().__init__(failing_users=set())
+        self.up = False
+
+    async def start(self) -> None:
+        if not self.up:
+            raise KafkaConnectionError()
+
+    async def stop(self) -> None:
+        pass
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_spooled_dispatches_drain_in_order_when_broker_returns(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "dispatch_spool_retry_seconds", 0.01)
+    spool = DispatchSpool(str(tmp_path))
+    dispatcher = KafkaDispatcher(spool=spool)
+    producer = OutageProducer()
+    dispatcher._producer = producer  # type: ignore[assignment]
+
+    await dispatcher.start()
+    failures = await dispatcher.send_batch(
+        [{"match": {"user_id": f"user-{index}", "subscription_id": index}} for index in range(3)]
+    )
+    await dispatcher.send({"match": {"user_id": "user-3", "subscription_id": 3}})
+    assert failures == []
+    assert spool.depth == 4
+    assert producer.sent == []
+
+    producer.up = True
+    for _ in range(100):
+        if spool.depth == 0:
+            break
+        await asyncio.sleep(0.01)
+    await dispatcher.stop()
+
+    assert [payload["match"]["subscription_id"] for payload in producer.sent] == [0, 1, 2, 3]
+    assert DispatchSpool(str(tmp_path)).depth == 0
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_drain_survives_unexpected_spool_errors(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "dispatch_spool_retry_seconds", 0.01)
+    spool = DispatchSpool(str(tmp_path))
+    dispatcher = KafkaDispatcher(spool=spool)
+    producer = OutageProducer()
+    dispatcher._producer = producer  # type: ignore[assignment]
+    peek = spool.peek
+    errors = [OSError("disk read failed")]
+
+    def flaky_peek(limit):
+        if errors:
+            raise errors.pop()
+        return peek(limit)
+
+    monkeypatch.setattr(spool, "peek", flaky_peek)
+
+    await dispatcher.start()
+    await dispatcher.send({"match": {"user_id": "user-0", "subscription_id": 0}})
+    producer.up = True
+    for _ in range(100):
+        if spool.depth == 0:
+            break
+        await asyncio.sleep(0.01)
+    drain_task = dispatcher._drain_task
+    await dispatcher.stop()
+
+    assert errors == []
+    assert drain_task is not None and drain_task.exception() is None
+    assert [payload["match"]["subscription_id"] for payload in producer.sent] == [0]
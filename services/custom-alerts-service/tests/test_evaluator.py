@@ -1,10 +1,18 @@
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import event
 
 from app.models import AlertDeliveryHistory, ConditionAlert, UserPreference
-from app.evaluator import evaluate_conditions
+from app.config import settings
+from app.dispatcher import DispatchFailure
+from app.evaluator import _write_results, evaluate_conditions
+from app.forecast import ForecastSeries
+from app.leasing import tenant_backlog
+from app.weather import Gridpoint
+from tests.test_grid import fixture_tiles
 
 
 class StubDispatcher:
@@ -16,17 +24,23 @@ class StubDispatcher:
 
 
 class StubWeatherClient:
-    def __init__(self, periods: List[Dict[str, Any]]) -> None:
+    def __init__(self, periods: List[Dict[str, Any]], gridpoints: Optional[Dict[Tuple[float, float], str]] = None) -> None:
         self.periods = periods
+        self.gridpoints = gridpoints or {}
         self.calls = 0
+        self.resolved = 0
+
+    async def resolve_gridpoint(self, latitude: float, longitude: float) -> Gridpoint:
+        self.resolved += 1
+        return Gridpoint.parse(self.gridpoints.get((latitude, longitude), "OKX/33,35"))
 
-    async def fetch_hourly_forecast(self, latitude: float, longitude: float) -> List[Dict[str, Any]]:
+    async def fetch_gridpoint_forecast(self, gridpoint: Gridpoint) -> ForecastSeries:
         self.calls += 1
-        return self.periods
+        return ForecastSeries.from_periods(self.periods)
 
 
 @pytest.mark.anyio(backend="asyncio")
-async def test_evaluator_triggers_temperature_hot(db_session) -> None:
+async def test_evaluator_triggers_temperature_hot(db_session, async_session) -> None:
     user_pref = UserPreference(user_id="user-123", channels={"email": True})
     alert = ConditionAlert(
         user_id="user-123",
@@ -43,10 +57,11 @@ async def test_evaluator_triggers_temperature_hot(db_session) -> None:
     db_session.add(alert)
     db_session.commit()
 
+    now = datetime.now(timezone.utc)
     weather_client = StubWeatherClient(
         periods=[
             {
-                "startTime": "2024-04-01T12:00:00+00:00",
+                "startTime": (now + timedelta(hours=3)).isoformat(),
                 "temperature": 90,
                 "temperatureUnit": "F",
                 "shortForecast": "Sunny",
@@ -57,9 +72,8 @@ async def test_evaluator_triggers_temperature_hot(db_session) -> None:
     )
 
     dispatcher = StubDispatcher()
-    now = datetime.now(timezone.utc)
 
-    await evaluate_conditions(db_session, dispatcher, now=now, weather_client=weather_client)
+    await evaluate_conditions(async_session, dispatcher, now=now, weather_client=weather_client)
 
     assert len(dispatcher.messages) == 1
     message = dispatcher.messages[0]
@@ -83,7 +97,7 @@ async def test_evaluator_triggers_temperature_hot(db_session) -> None:
 
 
 @pytest.mark.anyio(backend="asyncio")
-async def test_evaluator_respects_cooldown(db_session) -> None:
+async def test_evaluator_respects_cooldown(db_session, async_session) -> None:
     alert = ConditionAlert(
         user_id="user-456",
         label="Wind watcher",
@@ -98,10 +112,11 @@ async def test_evaluator_respects_cooldown(db_session) -> None:
     db_session.add(alert)
     db_session.commit()
 
+    now = datetime.now(timezone.utc)
     weather_client = StubWeatherClient(
         periods=[
             {
-                "startTime": "2024-04-01T12:00:00+00:00",
+                "startTime": (now + timedelta(hours=3)).isoformat(),
                 "temperature": 70,
                 "temperatureUnit": "F",
                 "shortForecast": "Windy",
@@ -112,15 +127,14 @@ async def test_evaluator_respects_cooldown(db_session) -> None:
     )
 
     dispatcher = StubDispatcher()
-    now = datetime.now(timezone.utc)
 
-    await evaluate_conditions(db_session, dispatcher, now=now, weather_client=weather_client)
+    await evaluate_conditions(async_session, dispatcher, now=now, weather_client=weather_client)
     assert len(dispatcher.messages) == 1
 
-    await evaluate_conditions(db_session, dispatcher, now=now + timedelta(minutes=30), weather_client=weather_client)
+    await evaluate_conditions(async_session, dispatcher, now=now + timedelta(minutes=30), weather_client=weather_client)
     assert len(dispatcher.messages) == 1
 
-    await evaluate_conditions(db_session, dispatcher, now=now + timedelta(minutes=130), weather_client=weather_client)
+    await evaluate_conditions(async_session, dispatcher, now=now + timedelta(minutes=130), weather_client=weather_client)
     assert len(dispatcher.messages) == 2
     assert weather_client.calls == 2
 
@@ -133,7 +147,7 @@ async def test_evaluator_respects_cooldown(db_session) -> None:
 
 
 @pytest.mark.anyio(backend="asyncio")
-async def test_evaluator_skips_when_threshold_not_met(db_session) -> None:
+async def test_evaluator_skips_when_threshold_not_met(db_session, async_session) -> None:
     alert = ConditionAlert(
         user_id="user-789",
         label="Rain watcher",
@@ -163,7 +177,7 @@ async def test_evaluator_skips_when_threshold_not_met(db_session) -> None:
     dispatcher = StubDispatcher()
     now = datetime.now(timezone.utc)
 
-    await evaluate_conditions(db_session, dispatcher, now=now, weather_client=weather_client)
+    await evaluate_conditions(async_session, dispatcher, now=now, weather_client=weather_client)
 
     assert dispatcher.messages == []
     assert weather_client.calls == 1
@@ -173,3 +187,476 @@ async def test_evaluator_skips_when_threshold_not_met(db_session) -> None:
         .all()
     )
     assert history == []
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_groups_alerts_by_gridpoint(db_session, async_session) -> None:
+    coordinates = [(40.7128, -74.0060), (40.7130, -74.0100), (40.9000, -74.0060)]
+    for index, (latitude, longitude) in enumerate(coordinates):
+        db_session.add(
+            ConditionAlert(
+                user_id=f"user-grid-{index}",
+                label="Cold snap",
+                condition_type="temperature_cold",
+                threshold_value=32.0,
+                threshold_unit="fahrenheit",
+                comparison="below",
+                latitude=latitude,
+                longitude=longitude,
+            )
+        )
+    db_session.commit()
+
+    weather_client = StubWeatherClient(
+        periods=[{"startTime": "2024-01-10T12:00:00+00:00", "temperature": 40, "temperatureUnit": "F"}],
+        gridpoints={
+            coordinates[0]: "OKX/33,35",
+            coordinates[1]: "OKX/33,35",
+            coordinates[2]: "OKX/34,41",
+        },
+    )
+
+    await evaluate_conditions(async_session, StubDispatcher(), weather_client=weather_client)
+    assert weather_client.calls == 2
+    assert weather_client.resolved == 3
+
+    gridpoints = sorted(alert.gridpoint for alert in db_session.query(ConditionAlert).all())
+    assert gridpoints == ["OKX/33,35", "OKX/33,35", "OKX/34,41"]
+
+    await evaluate_conditions(
+        async_session,
+        StubDispatcher(),
+        now=datetime.now(timezone.utc) + timedelta(hours=1),
+        weather_client=weather_client,
+    )
+    assert weather_client.resolved == 3
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_loads_preferences_in_one_query(db_session, async_session, async_test_engine) -> None:
+    for index in range(5):
+        db_session.add(UserPreference(user_id=f"user-bulk-{index}", channels={"email": True}))
+        db_session.add(
+            ConditionAlert(
+                user_id=f"user-bulk-{index}",
+                label="Hot day",
+                condition_type="temperature_hot",
+                threshold_value=80.0,
+                threshold_unit="fahrenheit",
+                comparison="above",
+                latitude=40.0,
+                longitude=-75.0,
+            )
+        )
+    db_session.commit()
+
+    statements: list[str] = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(async_test_engine.sync_engine, "before_cursor_execute", _capture)
+    try:
+        dispatcher = StubDispatcher()
+        await evaluate_conditions(
+            async_session,
+            dispatcher,
+            weather_client=StubWeatherClient(periods=[{"temperature": 90, "temperatureUnit": "F"}]),
+        )
+    finally:
+        event.remove(async_test_engine.sync_engine, "before_cursor_execute", _capture)
+
+    assert len(dispatcher.messages) == 5
+    assert all(message["user_preferences"]["channels"] == {"email": True} for message in dispatcher.messages)
+    preference_selects = [sql for sql in statements if "FROM user_preferences" in sql]
+    assert len(preference_selects) == 1
+    assert db_session.query(AlertDeliveryHistory).count() == 5
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_leaves_failed_dispatches_for_retry(db_session, async_session) -> None:
+    delivered = ConditionAlert(
+        user_id="user-ok",
+        label="Hot",
+        condition_type="temperature_hot",
+        threshold_value=80.0,
+        latitude=40.0,
+        longitude=-75.0,
+    )
+    rejected = ConditionAlert(
+        user_id="user-rejected",
+        label="Hot",
+        condition_type="temperature_hot",
+        threshold_value=80.0,
+        latitude=40.0,
+        longitude=-75.0,
+    )
+    db_session.add_all([delivered, rejected])
+    db_session.commit()
+
+    class BatchDispatcher:
+        def __init__(self) -> None:
+            self.batches: list[list[Dict[str, Any]]] = []
+
+        async def send_batch(self, payloads):
+            self.batches.append(list(payloads))
+            return [
+                DispatchFailure(payload=payload, error=RuntimeError("broker down"))
+                for payload in payloads
+                if payload["match"]["user_id"] == "user-rejected"
+            ]
+
+    dispatcher = BatchDispatcher()
+    await evaluate_conditions(
+        async_session,
+        dispatcher,
+        weather_client=StubWeatherClient(periods=[{"temperature": 90, "temperatureUnit": "F"}]),
+    )
+
+    assert len(dispatcher.batches) == 1 and len(dispatcher.batches[0]) == 2
+    db_session.refresh(delivered)
+    db_session.refresh(rejected)
+    assert delivered.last_triggered_at is not None
+    assert rejected.last_triggered_at is None
+    history = db_session.query(AlertDeliveryHistory).all()
+    assert [entry.user_id for entry in history] == ["user-ok"]
+
+
+def _seed_wind_alerts(db_session, count: int) -> None:
+    for index in range(count):
+        db_session.add(
+            ConditionAlert(
+                user_id=f"user-chunk-{index}",
+                label="Calm",
+                condition_type="wind",
+                threshold_value=50.0,
+                latitude=35.0,
+                longitude=-97.0,
+            )
+        )
+    db_session.commit()
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_streams_due_alerts_in_chunks(db_session, async_session, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "evaluation_chunk_size", 2)
+    _seed_wind_alerts(db_session, 5)
+    now = datetime.now(timezone.utc)
+
+    stats = await evaluate_conditions(
+        async_session,
+        StubDispatcher(),
+        now=now,
+        weather_client=StubWeatherClient(periods=[{"windSpeed": "5 mph"}]),
+    )
+
+    assert (stats.due, stats.chunks, stats.triggered) == (5, 3, 0)
+    assert all(
+        alert.next_evaluation_at > now.replace(tzinfo=None) and alert.claimed_by is None
+        for alert in db_session.query(ConditionAlert).all()
+    )
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_stops_at_cycle_budget(db_session, async_session, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "evaluation_chunk_size", 2)
+    monkeypatch.setattr(settings, "evaluation_cycle_budget_seconds", 1e-9)
+    _seed_wind_alerts(db_session, 5)
+    now = datetime.now(timezone.utc)
+
+    stats = await evaluate_conditions(
+        async_session,
+        StubDispatcher(),
+        now=now,
+        weather_client=StubWeatherClient(periods=[{"windSpeed": "5 mph"}]),
+    )
+
+    assert stats.budget_exhausted is True
+    assert (stats.due, stats.chunks) == (2, 1)
+    still_due = (
+        db_session.query(ConditionAlert)
+        .filter(ConditionAlert.next_evaluation_at <= now.replace(tzinfo=None))
+        .count()
+    )
+    assert still_due == 3
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_skips_alerts_with_unchanged_window(db_session, async_session) -> None:
+    _seed_wind_alerts(db_session, 1)
+    weather_client = StubWeatherClient(periods=[{"windSpeed": "5 mph"}, {"windSpeed": "10 mph"}])
+    now = datetime.now(timezone.utc)
+    later = now + timedelta(hours=1)
+
+    first = await evaluate_conditions(async_session, StubDispatcher(), now=now, weather_client=weather_client)
+    second = await evaluate_conditions(async_session, StubDispatcher(), now=later, weather_client=weather_client)
+
+    assert (first.due, first.skipped) == (1, 0)
+    assert (second.due, second.skipped) == (1, 1)
+    alert = db_session.query(ConditionAlert).one()
+    assert alert.next_evaluation_at > later.replace(tzinfo=None)
+
+    weather_client.periods = [{"windSpeed": "60 mph"}]
+    dispatcher = StubDispatcher()
+    third = await evaluate_conditions(async_session, dispatcher, now=later + timedelta(hours=1), weather_client=weather_client)
+
+    assert third.skipped == 0
+    assert len(dispatcher.messages) == 1
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_shares_units_between_identical_rules(db_session, async_session) -> None:
+    for index, (threshold, metadata, overrides) in enumerate(
+        [
+            (32.0, None, None),
+            (32.0, {"cooldown_minutes": 180}, {"sms": True}),
+            (32.0, None, None),
+            (20.0, None, None),
+        ]
+    ):
+        db_session.add(
+            ConditionAlert(
+                user_id=f"user-freeze-{index}",
+                label="Freeze",
+                condition_type="temperature_cold",
+                threshold_value=threshold,
+                comparison="below",
+                latitude=41.88,
+                longitude=-87.63,
+                metadata_json=metadata,
+                channel_overrides=overrides,
+            )
+        )
+    db_session.commit()
+    weather_client = StubWeatherClient(periods=[{"temperature": 28, "temperatureUnit": "F"}])
+    dispatcher = StubDispatcher()
+    now = datetime.now(timezone.utc)
+
+    stats = await evaluate_conditions(async_session, dispatcher, now=now, weather_client=weather_client)
+
+    assert (stats.units, stats.deduplicated, stats.triggered) == (2, 2, 3)
+    by_user = {message["match"]["user_id"]: message for message in dispatcher.messages}
+    assert set(by_user) == {"user-freeze-0", "user-freeze-1", "user-freeze-2"}
+    assert by_user["user-freeze-1"]["user_preferences"]["channels"]["sms"] is True
+    next_evals = {
+        alert.user_id: alert.next_evaluation_at for alert in db_session.query(ConditionAlert).all()
+    }
+    assert next_evals["user-freeze-1"] >= (now + timedelta(minutes=180)).replace(tzinfo=None)
+    assert next_evals["user-freeze-0"] < (now + timedelta(minutes=90)).replace(tzinfo=None)
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_reports_backlog_and_phase_metrics(db_session, async_session) -> None:
+    _seed_wind_alerts(db_session, 3)
+    oldest = min(alert.next_evaluation_at for alert in db_session.query(ConditionAlert).all())
+    weather_client = StubWeatherClient(periods=[{"windSpeed": "5 mph"}])
+    now = datetime.now(timezone.utc)
+    write_count = REGISTRY.get_sample_value("custom_alert_evaluation_phase_seconds_count", {"phase": "write"}) or 0
+
+    await evaluate_conditions(async_session, StubDispatcher(), now=now, weather_client=weather_client)
+
+    assert REGISTRY.get_sample_value("custom_alert_due_backlog") == 3
+    assert REGISTRY.get_sample_value("custom_alert_oldest_overdue_seconds") == pytest.approx(
+        (now.replace(tzinfo=None) - oldest).total_seconds(), abs=1
+    )
+    assert REGISTRY.get_sample_value("custom_alert_evaluation_phase_seconds_count", {"phase": "write"}) == write_count + 1
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_shares_budgeted_cycle_between_tenants(db_session, async_session, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "evaluation_chunk_size", 4)
+    monkeypatch.setattr(settings, "evaluation_cycle_budget_seconds", 1e-9)
+    for index in range(12):
+        db_session.add(
+            ConditionAlert(
+                user_id=f"user-fair-{index}",
+                label="Fair",
+                condition_type="wind",
+                threshold_value=25.0,
+                latitude=35.0,
+                longitude=-97.0,
+                tenant_id="whale" if index < 10 else "minnow",
+                next_evaluation_at=datetime.utcnow() - timedelta(hours=1, minutes=index),
+            )
+        )
+    db_session.commit()
+    weather_client = StubWeatherClient(periods=[{"windSpeed": "5 mph"}])
+
+    stats = await evaluate_conditions(async_session, StubDispatcher(), weather_client=weather_client)
+
+    assert stats.budget_exhausted and stats.due == 4
+    db_session.expire_all()
+    evaluated = {
+        alert.tenant_id: alert.user_id
+        for alert in db_session.query(ConditionAlert).filter(ConditionAlert.evaluation_digest.isnot(None))
+    }
+    assert set(evaluated) == {"whale", "minnow"}
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_counts_tenant_backlog_once_per_cycle(db_session, async_session, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "evaluation_chunk_size", 4)
+    for index in range(12):
+        db_session.add(
+            ConditionAlert(
+                user_id=f"user-backlog-{index}",
+                label="Backlog",
+                condition_type="wind",
+                threshold_value=25.0,
+                latitude=35.0,
+                longitude=-97.0,
+                tenant_id="whale" if index < 9 else "minnow",
+                next_evaluation_at=datetime.utcnow() - timedelta(minutes=index),
+            )
+        )
+    db_session.commit()
+    counted = []
+
+    async def counting_backlog(session, due_time):
+        counted.append(due_time)
+        return await tenant_backlog(session, due_time)
+
+    monkeypatch.setattr("app.evaluator.tenant_backlog", counting_backlog)
+    weather_client = StubWeatherClient(periods=[{"windSpeed": "5 mph"}])
+
+    stats = await evaluate_conditions(async_session, StubDispatcher(), weather_client=weather_client)
+
+    assert stats.chunks == 3 and stats.due == 12
+    assert len(counted) == 1
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_evaluator_matches_compound_rules_once_per_unit(db_session, async_session) -> None:
+    for index, rule in enumerate(
+        [
+            "temperature >= 95 AND humidity >= 60 for 2 consecutive hours within 6h",
+            "temperature>=95 and humidity>=60 for 2 hours within 6 hours",
+            "temperature >= 95 AND humidity >= 80 for 2 consecutive hours within 6h",
+        ]
+    ):
+        db_session.add(
+            ConditionAlert(
+                user_id=f"user-muggy-{index}",
+                label="Muggy",
+                condition_type="compound",
+                threshold_value=0.0,
+                comparison="above",
+                rule=rule,
+                latitude=29.76,
+                longitude=-95.37,
+            )
+        )
+    db_session.commit()
+    weather_client = StubWeatherClient(
+        periods=[
+            {"temperature": 96, "temperatureUnit": "F", "relativeHumidity": {"value": humidity}}
+            for humidity in (65, 70, 75)
+        ]
+    )
+    dispatcher = StubDispatcher()
+
+    stats = await evaluate_conditions(
+        async_session, dispatcher, now=datetime.now(timezone.utc), weather_client=weather_client
+    )
+
+    assert (stats.units, stats.deduplicated, stats.triggered) == (2, 1, 2)
+    assert {message["match"]["user_id"] for message in dispatcher.messages} == {"user-muggy-0", "user-muggy-1"}
+
+
+class GriddedWeatherClient(StubWeatherClient):
+    def __init__(self, periods: List[Dict[str, Any]]) -> None:
+        super().__init__(periods)
+        self.tiles_requested: list = []
+
+    async def fetch_grid_tile(self, key, *, now=None, semaphore=None):
+        self.tiles_requested.append(key)
+        return fixture_tiles([key], now)[key]
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_gridded_evaluation_matches_hot_cells_within_radius(db_session, async_session, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "gridded_evaluation_enabled", True)
+    monkeypatch.setattr(settings, "gridded_tile_cells", 4)
+    for user_id, radius in (("user-near", 2.0), ("user-wide", 6.0), ("user-wide-2", 6.0)):
+        db_session.add(
+            ConditionAlert(
+                user_id=user_id,
+                label="Hot nearby",
+                condition_type="temperature_hot",
+                threshold_value=90.0,
+                comparison="above",
+                latitude=40.7128,
+                longitude=-74.0060,
+                radius_km=radius,
+            )
+        )
+    db_session.commit()
+    # The point forecast itself never gets hot; only a cell 5 km away does.
+    weather_client = GriddedWeatherClient(periods=[{"temperature": 70, "temperatureUnit": "F"}])
+    dispatcher = StubDispatcher()
+
+    stats = await evaluate_conditions(
+        async_session, dispatcher, now=datetime.now(timezone.utc), weather_client=weather_client
+    )
+
+    assert {message["match"]["user_id"] for message in dispatcher.messages} == {"user-wide", "user-wide-2"}
+    assert (stats.units, stats.tiles_fetched) == (2, 6)
+    assert len(set(weather_client.tiles_requested)) == len(weather_client.tiles_requested)
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_gridded_precipitation_alert_still_fires_on_rain_text(db_session, async_session, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "gridded_evaluation_enabled", True)
+    monkeypatch.setattr(settings, "gridded_tile_cells", 4)
+    db_session.add(
+        ConditionAlert(
+            user_id="user-showers",
+            label="Rain nearby",
+            condition_type="precipitation",
+            threshold_value=60.0,
+            comparison="above",
+            latitude=40.7128,
+            longitude=-74.0060,
+            radius_km=6.0,
+        )
+    )
+    db_session.commit()
+    # Every cell forecasts 10% precipitation; only the point forecast's text says rain.
+    weather_client = GriddedWeatherClient(
+        periods=[{"shortForecast": "Rain Showers", "probabilityOfPrecipitation": {"value": 20}}]
+    )
+    dispatcher = StubDispatcher()
+
+    stats = await evaluate_conditions(
+        async_session, dispatcher, now=datetime.now(timezone.utc), weather_client=weather_client
+    )
+
+    assert stats.tiles_fetched and stats.triggered == 1
+    assert [message["match"]["user_id"] for message in dispatcher.messages] == ["user-showers"]
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_write_results_commits_each_alerts_state_with_its_history(monkeypatch) -> None:
+    class RecordingSession:
+        def __init__(self) -> None:
+            self.commits: list[list[tuple[str, Any]]] = [[]]
+
+        async def execute(self, statement, rows):
+            table = statement.table.name
+            ids = [row.get("id") or row.get("source_id") for row in rows]
+            self.commits[-1].append((table, ids))
+
+        async def commit(self) -> None:
+            self.commits.append([])
+
+    monkeypatch.setattr(settings, "evaluation_write_chunk_size", 2)
+    session = RecordingSession()
+    states = {alert_id: {"id": alert_id} for alert_id in (1, 2, 3)}
+    history = {3: {"source_id": 3}, 1: {"source_id": 1}}
+
+    await _write_results(session, states, history)
+
+    assert session.commits[:-1] == [
+        [("condition_alerts", [1, 2]), ("alert_delivery_history", [1])],
+        [("condition_alerts", [3]), ("alert_delivery_history", [3])],
+    ]
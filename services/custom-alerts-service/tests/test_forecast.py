@@ -0,0 +1,61 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.forecast import ForecastSeries
+
+
+def test_series_normalizes_units_and_parses_wind() -> None:
+    series = ForecastSeries.from_periods(
+        [
+            {
+                "startTime": "2024-04-01T08:00:00-04:00",
+                "temperature": 30,
+                "temperatureUnit": "C",
+                "shortForecast": "Chance Rain Showers",
+                "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": 55},
+                "windSpeed": "10 to 20 mph",
+            },
+            {
+                "startTime": "2024-04-01T09:00:00-04:00",
+                "temperature": None,
+                "shortForecast": "Sunny",
+                "probabilityOfPrecipitation": {"value": None},
+                "windSpeed": "",
+            },
+        ]
+    )
+
+    assert len(series) == 2
+    assert series.temperature_f[0] == pytest.approx(86.0)
+    assert series.precip_probability[0] == pytest.approx(55.0)
+    assert series.wind_mph[0] == pytest.approx(20.0)
+    assert series.rain.tolist() == [True, False]
+    assert np.isnan(series.temperature_f[1])
+    assert np.isnan(series.wind_mph[1])
+    assert series.preview(1)[0]["start_time"] == "2024-04-01T12:00:00+00:00"
+
+
+def test_window_is_a_view_over_leading_hours() -> None:
+    series = ForecastSeries.from_periods(
+        [{"startTime": f"2024-04-01T{hour:02d}:00:00+00:00", "temperature": hour} for hour in range(12)]
+    )
+
+    window = series.window(6)
+
+    assert len(window) == 6
+    assert float(window.temperature_f.max()) == 5.0
+    assert np.shares_memory(window.temperature_f, series.temperature_f)
+
+
+def test_window_skips_hours_that_have_already_ended() -> None:
+    series = ForecastSeries.from_periods(
+        [{"startTime": f"2024-04-01T{hour:02d}:00:00+00:00", "temperature": hour} for hour in range(12)]
+    )
+
+    window = series.window(3, now=datetime(2024, 4, 1, 4, 30, tzinfo=timezone.utc))
+
+    # The 04:00 hour is still in progress, so it is the first one judged.
+    assert window.temperature_f.tolist() == [4.0, 5.0, 6.0]
+    assert len(series.window(3, now=datetime(2024, 4, 2, tzinfo=timezone.utc))) == 0
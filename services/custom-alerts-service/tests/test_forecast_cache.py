@@ -0,0 +1,165 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import respx
+
+from app.config import settings
+from app.forecast import ForecastSeries
+from app.forecast_cache import CachedForecast, ForecastCache, expiry_from_headers
+from app.weather import NoaaWeatherClient
+
+POINTS_URL = f"{settings.noaa_base_url}/points/40.7128,-74.006"
+FORECAST_URL = f"{settings.noaa_base_url}/gridpoints/OKX/33,35/forecast/hourly"
+
+PERIODS = [
+    {
+        "startTime": "2024-04-01T12:00:00+00:00",
+        "temperature": 72,
+        "temperatureUnit": "F",
+        "shortForecast": "Sunny",
+    }
+]
+
+
+def _points_response() -> httpx.Response:
+    return httpx.Response(200, json={"properties": {"gridId": "OKX", "gridX": 33, "gridY": 35}})
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_forecast_is_reused_across_calls_until_expiry() -> None:
+    cache = ForecastCache()
+    with respx.mock(assert_all_called=True) as mock:
+        points = mock.get(POINTS_URL).mock(return_value=_points_response())
+        forecast = mock.get(FORECAST_URL).mock(
+            return_value=httpx.Response(
+                200,
+                json={"properties": {"periods": PERIODS}},
+                headers={"Cache-Control": "public, max-age=3600", "ETag": '"v1"'},
+            )
+        )
+        async with NoaaWeatherClient(cache=cache) as client:
+            first = await client.fetch_hourly_forecast(40.7128, -74.006)
+            second = await client.fetch_hourly_forecast(40.7128, -74.006)
+
+    assert first is second
+    assert first.preview(1)[0]["short_forecast"] == "Sunny"
+    assert points.call_count == 1
+    assert forecast.call_count == 1
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_expired_entry_is_revalidated_with_etag() -> None:
+    cache = ForecastCache()
+    cache.remember_point(40.7128, -74.006, "OKX/33,35")
+    cache.store(
+        "OKX/33,35",
+        CachedForecast(
+            series=ForecastSeries.from_periods(PERIODS),
+            expires_at=datetime.now(timezone.utc) - timedelta(seconds=1),
+            etag='"v1"',
+            size_bytes=100,
+        ),
+    )
+    with respx.mock(assert_all_called=True) as mock:
+        forecast = mock.get(FORECAST_URL).mock(
+            return_value=httpx.Response(304, headers={"Cache-Control": "max-age=600"})
+        )
+        async with NoaaWeatherClient(cache=cache) as client:
+            series = await client.fetch_hourly_forecast(40.7128, -74.006)
+
+    assert series.preview(1)[0]["temperature"] == 72
+    assert forecast.calls.last.request.headers["If-None-Match"] == '"v1"'
+    entry = cache.lookup("OKX/33,35", datetime.now(timezone.utc))
+    assert entry is not None and entry.is_fresh(datetime.now(timezone.utc))
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_concurrent_misses_share_one_upstream_fetch() -> None:
+    cache = ForecastCache()
+
+    async def slow_forecast(request):
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"properties": {"periods": PERIODS}})
+
+    with respx.mock(assert_all_called=True) as mock:
+        points = mock.get(POINTS_URL).mock(return_value=_points_response())
+        forecast = mock.get(FORECAST_URL).mock(side_effect=slow_forecast)
+        clients = [NoaaWeatherClient(cache=cache) for _ in range(5)]
+        try:
+            results = await asyncio.gather(*(client.fetch_hourly_forecast(40.7128, -74.006) for client in clients))
+        finally:
+            await asyncio.gather(*(client.aclose() for client in clients))
+
+    assert points.call_count == 1
+    assert forecast.call_count == 1
+    assert all(series is results[0] for series in results)
+
+
+def test_cache_evicts_least_recently_used_entries_over_budget() -> None:
+    cache = ForecastCache(max_bytes=250)
+    expires = datetime.now(timezone.utc) + timedelta(hours=1)
+    for key in ("A/1,1", "B/1,1", "C/1,1"):
+        cache.store(key, CachedForecast(series=ForecastSeries.from_periods([]), expires_at=expires, size_bytes=100))
+
+    assert len(cache) == 2
+    assert cache.size_bytes == 200
+    assert cache.lookup("A/1,1", datetime.now(timezone.utc)) is None
+
+
+def test_cache_entries_survive_restart_when_persisted(tmp_path) -> None:
+    expires = datetime.now(timezone.utc) + timedelta(hours=1)
+    ForecastCache(directory=str(tmp_path)).store(
+        "OKX/33,35",
+        CachedForecast(
+            series=ForecastSeries.from_periods(PERIODS),
+            expires_at=expires,
+            last_modified="Mon, 01 Apr 2024 12:00:00 GMT",
+        ),
+    )
+
+    restored = ForecastCache(directory=str(tmp_path)).lookup("OKX/33,35", datetime.now(timezone.utc))
+
+    assert restored is not None
+    assert restored.series.preview(1) == ForecastSeries.from_periods(PERIODS).preview(1)
+    assert restored.validators() == {"If-Modified-Since": "Mon, 01 Apr 2024 12:00:00 GMT"}
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_async_cache_persists_off_the_event_loop(tmp_path, monkeypatch) -> None:
+    loop_thread = threading.get_ident()
+    io_threads = []
+    real_write, real_read = ForecastCache._write_to_disk, ForecastCache._read_from_disk
+
+    def _write(self, key, entry):
+        io_threads.append(threading.get_ident())
+        return real_write(self, key, entry)
+
+    def _read(self, key):
+        io_threads.append(threading.get_ident())
+        return real_read(self, key)
+
+    monkeypatch.setattr(ForecastCache, "_write_to_disk", _write)
+    monkeypatch.setattr(ForecastCache, "_read_from_disk", _read)
+    expires = datetime.now(timezone.utc) + timedelta(hours=1)
+    await ForecastCache(directory=str(tmp_path)).astore(
+        "OKX/33,35", CachedForecast(series=ForecastSeries.from_periods(PERIODS), expires_at=expires)
+    )
+
+    restored = await ForecastCache(directory=str(tmp_path)).alookup("OKX/33,35", datetime.now(timezone.utc))
+
+    assert restored is not None and restored.is_fresh(datetime.now(timezone.utc))
+    assert len(io_threads) == 2 and loop_thread not in io_threads
+
+
+def test_expiry_prefers_cache_control_over_expires() -> None:
+    now = datetime(2024, 4, 1, 12, 0, tzinfo=timezone.utc)
+    headers = httpx.Headers(
+        {"Cache-Control": "public, max-age=120", "Expires": "Mon, 01 Apr 2024 18:00:00 GMT"}
+    )
+    assert expiry_from_headers(headers, now) == now + timedelta(seconds=120)
+    assert expiry_from_headers(httpx.Headers({"Expires": "Mon, 01 Apr 2024 18:00:00 GMT"}), now) == now + timedelta(
+        hours=6
+    )
@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import numpy as np
+import pytest
+import respx
+
+from app.config import settings
+from app.forecast import ForecastSeries
+from app.forecast_cache import ForecastCache
+from app.grid import GridTile, TileKey, area_summary, tiles_for
+from app.weather import NoaaWeatherClient
+
+# A local fixture grid around OKX/33,35: 20°C everywhere except one hot cell
+# two cells (5 km) north of the centre.
+CENTRE = (33, 35)
+HOT_CELL = (33, 37)
+
+
+def grid_cell_properties(grid_x: int, grid_y: int, start: datetime) -> dict:
+    valid_time = f"{start.replace(minute=0, second=0, microsecond=0).isoformat()}/PT12H"
+    celsius = 37.0 if (grid_x, grid_y) == HOT_CELL else 20.0
+    return {
+        "temperature": {"uom": "wmoUnit:degC", "values": [{"validTime": valid_time, "value": celsius}]},
+        "windSpeed": {"uom": "wmoUnit:km_h-1", "values": [{"validTime": valid_time, "value": 16.0934}]},
+        "probabilityOfPrecipitation": {"uom": "wmoUnit:percent", "values": [{"validTime": valid_time, "value": 10}]},
+    }
+
+
+def fixture_tiles(keys, now: datetime) -> dict:
+    start = np.datetime64(now.replace(tzinfo=None), "h")
+    return {
+        key: GridTile.from_cells(
+            key,
+            {
+                cell: ForecastSeries.from_grid_layers(grid_cell_properties(*cell, now - timedelta(hours=2)))
+                for cell in key.cells()
+            },
+            start,
+        )
+        for key in keys
+    }
+
+
+def test_raw_layers_expand_to_hourly_series() -> None:
+    series = ForecastSeries.from_grid_layers(
+        {
+            "temperature": {
+                "uom": "wmoUnit:degC",
+                "values": [
+                    {"validTime": "2024-04-01T12:00:00+00:00/PT2H", "value": 30},
+                    {"validTime": "2024-04-01T14:00:00+00:00/PT1H", "value": None},
+                ],
+            },
+            "windSpeed": {"uom": "wmoUnit:km_h-1", "values": [{"validTime": "2024-04-01T13:00:00+00:00/P1DT1H", "value": 40}]},
+        }
+    )
+
+    assert len(series) == 26
+    assert series.preview(1)[0]["start_time"] == "2024-04-01T12:00:00+00:00"
+    assert series.temperature_f[:2].tolist() == pytest.approx([86.0, 86.0])
+    assert np.isnan(series.temperature_f[2])
+    assert np.isnan(series.wind_mph[0])
+    assert series.wind_mph[1] == pytest.approx(24.85, abs=0.01)
+    assert not series.rain.any()
+
+
+def test_area_summary_only_sees_cells_inside_the_radius(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "gridded_tile_cells", 4)
+    now = datetime.now(timezone.utc)
+    tiles = fixture_tiles(tiles_for("OKX", *CENTRE, 6.0), now)
+
+    near = area_summary(tiles, "OKX", *CENTRE, 4.0, 6)
+    wide = area_summary(tiles, "OKX", *CENTRE, 6.0, 6)
+
+    assert near.temperature_max == pytest.approx(68.0)
+    assert wide.temperature_max == pytest.approx(98.6)
+    assert wide.wind_max == pytest.approx(10.0, abs=0.01)
+    assert area_summary({}, "OKX", *CENTRE, 6.0, 6) is None
+
+
+def test_tiles_are_aligned_and_radius_is_capped(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "gridded_tile_cells", 4)
+    monkeypatch.setattr(settings, "gridded_max_radius_km", 5.0)
+
+    assert tiles_for("OKX", 33, 35, 2.0) == [TileKey("OKX", 32, 32, 4), TileKey("OKX", 32, 36, 4)]
+    assert tiles_for("OKX", 33, 35, 25.0) == tiles_for("OKX", 33, 35, 5.0)
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_grid_tile_fetches_each_cell_once(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "gridded_tile_cells", 2)
+    now = datetime.now(timezone.utc)
+
+    def _cell(request, grid_x, grid_y):
+        if (int(grid_x), int(grid_y)) == (33, 33):
+            return httpx.Response(404)
+        return httpx.Response(
+            200,
+            json={"properties": grid_cell_properties(int(grid_x), int(grid_y), now)},
+            headers={"Cache-Control": "max-age=3600"},
+        )
+
+    key = TileKey("OKX", 32, 32, 2)
+    with respx.mock(assert_all_called=True) as mock:
+        route = mock.get(url__regex=rf"{settings.noaa_base_url}/gridpoints/OKX/(?P<grid_x>\d+),(?P<grid_y>\d+)$")
+        route.mock(side_effect=_cell)
+        async with NoaaWeatherClient(cache=ForecastCache()) as client:
+            tile = await client.fetch_grid_tile(key, now=now)
+            again = await client.fetch_grid_tile(key, now=now)
+
+    # Three cells come from the cache the second time; only the missing one is retried.
+    assert route.call_count == 5
+    assert tile.temperature_f.shape[:2] == (2, 2)
+    assert tile.temperature_f[0, 0, 0] == pytest.approx(68.0)
+    assert np.isnan(tile.temperature_f[1, 1]).all()
+    np.testing.assert_array_equal(tile.wind_mph, again.wind_mph)
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_grid_tile_cell_fetches_share_the_concurrency_limit(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "gridded_tile_cells", 4)
+    active = peak = 0
+
+    async def slow_raw(self, gridpoint):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return ForecastSeries.from_periods([{"temperature": 70, "temperatureUnit": "F"}])
+
+    monkeypatch.setattr(NoaaWeatherClient, "fetch_gridpoint_raw", slow_raw)
+    semaphore = asyncio.Semaphore(3)
+    keys = [TileKey("OKX", 32, 32, 4), TileKey("OKX", 36, 32, 4)]
+    async with NoaaWeatherClient(cache=ForecastCache()) as client:
+        tiles = await asyncio.gather(*(client.fetch_grid_tile(key, semaphore=semaphore) for key in keys))
+
+    assert [tile.temperature_f.shape[:2] for tile in tiles] == [(4, 4), (4, 4)]
+    assert peak == 3
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.leasing import claim_due_alerts, tenant_backlog
+from app.models import ConditionAlert
+
+
+def _seed(db_session, count: int, due: datetime) -> None:
+    for index in range(count):
+        db_session.add(
+            ConditionAlert(
+                user_id=f"user-lease-{index}",
+                label="Lease",
+                condition_type="wind",
+                threshold_value=25.0,
+                latitude=35.0,
+                longitude=-97.0,
+                next_evaluation_at=due - timedelta(minutes=index),
+            )
+        )
+    db_session.commit()
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_workers_claim_disjoint_chunks(db_session, async_session) -> None:
+    now = datetime.utcnow()
+    _seed(db_session, 5, now)
+
+    first = await claim_due_alerts(async_session, worker_id="worker-a", due_time=now, limit=3)
+    second = await claim_due_alerts(async_session, worker_id="worker-b", due_time=now, limit=3)
+    third = await claim_due_alerts(async_session, worker_id="worker-c", due_time=now, limit=3)
+
+    first_ids = {alert.id for alert in first}
+    second_ids = {alert.id for alert in second}
+    assert len(first_ids) == 3 and len(second_ids) == 2
+    assert first_ids.isdisjoint(second_ids)
+    assert third == []
+    assert {alert.claimed_by for alert in first} == {"worker-a"}
+    # Oldest overdue work is claimed first.
+    assert [alert.user_id for alert in first] == ["user-lease-4", "user-lease-3", "user-lease-2"]
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_expired_leases_are_reclaimed(db_session, async_session) -> None:
+    now = datetime.utcnow()
+    _seed(db_session, 2, now)
+    claimed = await claim_due_alerts(async_session, worker_id="crashed", due_time=now, limit=10)
+    assert len(claimed) == 2
+
+    later = now + timedelta(seconds=settings.scheduler_lease_seconds + 1)
+    reclaimed = await claim_due_alerts(async_session, worker_id="survivor", due_time=later, limit=10)
+
+    assert {alert.id for alert in reclaimed} == {alert.id for alert in claimed}
+    assert {alert.claimed_by for alert in reclaimed} == {"survivor"}
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_quotas_claim_per_tenant_in_priority_order(db_session, async_session) -> None:
+    now = datetime.utcnow()
+    for index in range(6):
+        db_session.add(
+            ConditionAlert(
+                user_id=f"user-tenant-{index}",
+                label="Tenant",
+                condition_type="wind",
+                threshold_value=25.0,
+                latitude=35.0,
+                longitude=-97.0,
+                tenant_id="acme" if index < 4 else "globex",
+                priority=1 if index == 3 else 0,
+                next_evaluation_at=now - timedelta(minutes=index),
+            )
+        )
+    db_session.commit()
+
+    backlog = await tenant_backlog(async_session, now)
+    claimed = await claim_due_alerts(
+        async_session, worker_id="worker-a", due_time=now, limit=4, quotas={"acme": 2, "globex": 2}
+    )
+
+    assert {tenant: count for tenant, (count, _) in backlog.items()} == {"acme": 4, "globex": 2}
+    # Imminent work first, then the oldest due across the claimed set.
+    assert [alert.user_id for alert in claimed] == ["user-tenant-3", "user-tenant-5", "user-tenant-4", "user-tenant-2"]
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_lease_runs_from_claim_time_not_cycle_start(db_session, async_session) -> None:
+    # A chunk claimed an hour into a cycle that started at ``cycle_start``.
+    cycle_start = datetime.utcnow() - timedelta(hours=1)
+    _seed(db_session, 1, cycle_start)
+
+    claimed = await claim_due_alerts(async_session, worker_id="slow", due_time=cycle_start, limit=1)
+
+    assert claimed[0].lease_until > datetime.utcnow() + timedelta(seconds=settings.scheduler_lease_seconds - 5)
+    other = await claim_due_alerts(async_session, worker_id="other", due_time=datetime.utcnow(), limit=1)
+    assert other == []
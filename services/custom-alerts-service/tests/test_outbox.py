@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+
+import pytest
+
+from app.config import settings
+from app.dispatcher import DispatchFailure
+from app.evaluator import evaluate_conditions
+from app.models import AlertDeliveryHistory, ConditionAlert, DispatchOutbox
+from app.outbox import OutboxRelay
+from app.scheduler import ConditionScheduler
+from tests.test_evaluator import StubDispatcher, StubWeatherClient
+
+
+class RecordingDispatcher:
+    def __init__(self, reject: str = "") -> None:
+        self.batches: list[list[Dict[str, Any]]] = []
+        self.reject = reject
+
+    async def send_batch(self, payloads):
+        self.batches.append(list(payloads))
+        return [
+            DispatchFailure(payload=payload, error=RuntimeError("broker down"))
+            for payload in payloads
+            if payload["match"]["user_id"] == self.reject
+        ]
+
+
+def _hot_alert(user_id: str) -> ConditionAlert:
+    return ConditionAlert(
+        user_id=user_id,
+        label="Hot",
+        condition_type="temperature_hot",
+        threshold_value=80.0,
+        latitude=40.0,
+        longitude=-75.0,
+    )
+
+
+async def _evaluate_into_outbox(db_session, async_session, *users: str) -> StubDispatcher:
+    db_session.add_all([_hot_alert(user) for user in users])
+    db_session.commit()
+    dispatcher = StubDispatcher()
+    await evaluate_conditions(
+        async_session,
+        dispatcher,
+        weather_client=StubWeatherClient(periods=[{"temperature": 90, "temperatureUnit": "F"}]),
+        use_outbox=True,
+    )
+    return dispatcher
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_outbox_mode_commits_dispatches_with_history(db_session, async_session) -> None:
+    dispatcher = await _evaluate_into_outbox(db_session, async_session, "user-a", "user-b")
+
+    assert dispatcher.messages == []
+    rows = db_session.query(DispatchOutbox).order_by(DispatchOutbox.id).all()
+    assert [row.payload["match"]["user_id"] for row in rows] == ["user-a", "user-b"]
+    assert all(row.sent_at is None and row.message_key == row.payload["match"]["alert_id"] for row in rows)
+    assert db_session.query(AlertDeliveryHistory).count() == 2
+    assert all(alert.last_triggered_at is not None for alert in db_session.query(ConditionAlert))
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_relay_marks_sent_rows_and_retries_failures(db_session, async_session, async_session_local) -> None:
+    await _evaluate_into_outbox(db_session, async_session, "user-ok", "user-rejected")
+    dispatcher = RecordingDispatcher(reject="user-rejected")
+
+    async def provider():
+        return dispatcher
+
+    relay = OutboxRelay(provider, session_factory=async_session_local)
+    assert await relay.relay_once() == 1
+    db_session.expire_all()
+    rows = {row.payload["match"]["user_id"]: row for row in db_session.query(DispatchOutbox)}
+    assert rows["user-ok"].sent_at is not None
+    assert rows["user-rejected"].sent_at is None
+    assert rows["user-rejected"].attempts == 1
+    assert rows["user-rejected"].last_error == "broker down"
+
+    dispatcher.reject = ""
+    assert await relay.relay_once() == 1
+    assert [payload["match"]["user_id"] for payload in dispatcher.batches[-1]] == ["user-rejected"]
+    assert await relay.relay_once() == 0
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_relay_prunes_rows_past_retention(db_session, async_session_local) -> None:
+    now = datetime.now(timezone.utc)
+    db_session.add_all(
+        [
+            DispatchOutbox(message_key="old", topic="t", payload={}, sent_at=now - timedelta(days=2)),
+            DispatchOutbox(message_key="recent", topic="t", payload={}, sent_at=now - timedelta(minutes=5)),
+            DispatchOutbox(message_key="unsent", topic="t", payload={}),
+        ]
+    )
+    db_session.commit()
+
+    async def provider():
+        return None
+
+    await OutboxRelay(provider, session_factory=async_session_local).prune(now)
+    db_session.expire_all()
+    assert sorted(row.message_key for row in db_session.query(DispatchOutbox)) == ["recent", "unsent"]
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_scheduler_evaluates_in_outbox_mode_without_a_dispatcher(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "dispatch_outbox_enabled", True)
+    scheduler = ConditionScheduler()
+    cycles = []
+
+    async def unreachable_dispatcher(self):
+        raise AssertionError("outbox mode must not wait for Kafka")
+
+    async def fake_evaluate(session, dispatcher, **kwargs):
+        cycles.append((dispatcher, kwargs["use_outbox"]))
+        scheduler._stop_event.set()
+
+    monkeypatch.setattr("app.scheduler.ConditionScheduler.dispatcher", unreachable_dispatcher)
+    monkeypatch.setattr("app.scheduler.evaluate_conditions", fake_evaluate)
+
+    await scheduler._run()
+
+    assert cycles == [(None, True)]
@@ -0,0 +1,113 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import respx
+from prometheus_client import REGISTRY
+
+from app.config import settings
+from app.forecast import ForecastSeries
+from app.forecast_cache import CachedForecast, ForecastCache
+from app.models import ConditionAlert
+from app.prefetch import ForecastPrefetcher, PrefetchTracker
+from app.weather import Gridpoint, NoaaWeatherClient
+
+SERIES = ForecastSeries.from_periods([{"temperature": 70, "temperatureUnit": "F"}])
+
+
+class CachingWeatherClient:
+    def __init__(self, cache: ForecastCache) -> None:
+        self.cache = cache
+        self.fetched: list[str] = []
+
+    async def fetch_gridpoint_forecast(self, gridpoint: Gridpoint, *, min_fresh_until=None) -> ForecastSeries:
+        self.fetched.append(gridpoint.key)
+        self.cache.store(
+            gridpoint.key,
+            CachedForecast(series=SERIES, expires_at=datetime.now(timezone.utc) + timedelta(hours=1)),
+        )
+        return SERIES
+
+
+def _alert(gridpoint: str, due_in: timedelta) -> ConditionAlert:
+    return ConditionAlert(
+        user_id=f"user-{gridpoint}",
+        label="Prefetch",
+        condition_type="wind",
+        threshold_value=25.0,
+        comparison="above",
+        latitude=40.0,
+        longitude=-75.0,
+        gridpoint=gridpoint,
+        next_evaluation_at=(datetime.now(timezone.utc) + due_in).replace(tzinfo=None),
+    )
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_prefetcher_warms_only_cold_gridpoints_due_soon(db_session, async_session_local, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "prefetch_lookahead_seconds", 300)
+    monkeypatch.setattr(settings, "prefetch_rate_per_second", 1000.0)
+    db_session.add_all(
+        [
+            _alert("OKX/1,1", timedelta(minutes=2)),
+            _alert("OKX/1,1", timedelta(minutes=3)),
+            _alert("OKX/2,2", timedelta(minutes=-1)),
+            _alert("OKX/3,3", timedelta(minutes=1)),
+            _alert("OKX/4,4", timedelta(minutes=30)),
+        ]
+    )
+    db_session.commit()
+    cache = ForecastCache()
+    cache.store(
+        "OKX/3,3",
+        CachedForecast(series=SERIES, expires_at=datetime.now(timezone.utc) + timedelta(hours=1)),
+    )
+    client = CachingWeatherClient(cache)
+    tracker = PrefetchTracker()
+    prefetcher = ForecastPrefetcher(client, cache=cache, session_factory=async_session_local, tracker=tracker)
+
+    fetched = await prefetcher.run_once()
+
+    assert fetched == 2
+    assert client.fetched == ["OKX/2,2", "OKX/1,1"]
+    assert tracker.used("OKX/1,1") is True
+    assert tracker.used("OKX/1,1") is False
+    assert tracker.used("OKX/3,3") is False
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_prefetcher_refreshes_entries_that_expire_before_due(db_session, async_session_local, monkeypatch) -> None:
+    monkeypatch.setattr(settings, "prefetch_lookahead_seconds", 300)
+    monkeypatch.setattr(settings, "prefetch_rate_per_second", 1000.0)
+    db_session.add(_alert("OKX/33,35", timedelta(minutes=3)))
+    db_session.commit()
+    cache = ForecastCache()
+    # Fresh now, but expired by the time the alert is due.
+    soon = datetime.now(timezone.utc) + timedelta(minutes=1)
+    cache.store("OKX/33,35", CachedForecast(series=SERIES, expires_at=soon, etag='"v1"'))
+    tracker = PrefetchTracker()
+    forecast_url = f"{settings.noaa_base_url}/gridpoints/OKX/33,35/forecast/hourly"
+
+    with respx.mock(assert_all_called=True) as mock:
+        forecast = mock.get(forecast_url).mock(
+            return_value=httpx.Response(304, headers={"Cache-Control": "max-age=3600"})
+        )
+        async with NoaaWeatherClient(cache=cache) as client:
+            prefetcher = ForecastPrefetcher(client, cache=cache, session_factory=async_session_local, tracker=tracker)
+            fetched = await prefetcher.run_once()
+
+    assert fetched == 1 and forecast.call_count == 1
+    entry = cache.peek("OKX/33,35")
+    assert entry is not None and entry.expires_at > soon + timedelta(minutes=30)
+    assert tracker.used("OKX/33,35", soon + timedelta(minutes=5)) is True
+
+
+def test_tracker_counts_expired_prefetches_as_wasted() -> None:
+    tracker = PrefetchTracker()
+    now = datetime.now(timezone.utc)
+    wasted_before = REGISTRY.get_sample_value("custom_alert_prefetch_wasted_total") or 0.0
+    tracker.prefetched("OKX/1,1", now + timedelta(minutes=5), now)
+
+    assert tracker.used("OKX/1,1", now + timedelta(minutes=10)) is False
+    assert REGISTRY.get_sample_value("custom_alert_prefetch_wasted_total") == wasted_before + 1
+    assert REGISTRY.get_sample_value("custom_alert_prefetch_hit_ratio") == 0.0
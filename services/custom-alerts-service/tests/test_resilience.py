@@ -0,0 +1,154 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import respx
+from prometheus_client import REGISTRY
+
+from app.config import settings
+from app.forecast import ForecastSeries
+from app.forecast_cache import CachedForecast, ForecastCache
+from app.resilience import CircuitBreaker, CircuitOpenError, breaker_for, latency_for
+from app.weather import Gridpoint, NoaaWeatherClient
+
+GRIDPOINT = Gridpoint(office="OKX", grid_x=33, grid_y=35)
+HOST = httpx.URL(GRIDPOINT.forecast_hourly_url).host
+PERIODS = [{"startTime": "2024-04-01T12:00:00+00:00", "temperature": 72, "temperatureUnit": "F"}]
+
+
+@pytest.fixture(autouse=True)
+def _fast_failures(monkeypatch):
+    monkeypatch.setattr(settings, "noaa_max_retries", 0)
+    monkeypatch.setattr(settings, "noaa_breaker_failure_threshold", 2)
+    monkeypatch.setattr(settings, "noaa_breaker_reset_seconds", 30.0)
+
+
+def test_breaker_opens_then_probes_after_reset() -> None:
+    now = [0.0]
+    breaker = CircuitBreaker("test:forecast", clock=lambda: now[0])
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    now[0] = 31.0
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow(), "only one probe while half-open"
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_open_circuit_fails_fast_without_calling_noaa() -> None:
+    with respx.mock() as mock:
+        route = mock.get(GRIDPOINT.forecast_hourly_url).mock(return_value=httpx.Response(503))
+        async with NoaaWeatherClient(cache=ForecastCache()) as client:
+            for _ in range(2):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await client.fetch_gridpoint_forecast(GRIDPOINT)
+            with pytest.raises(CircuitOpenError):
+                await client.fetch_gridpoint_forecast(GRIDPOINT)
+
+    assert route.call_count == 2
+    assert REGISTRY.get_sample_value("custom_alert_noaa_circuit_state", {"endpoint": f"{HOST}:forecast"}) == 2
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_probe_that_raises_unexpectedly_releases_half_open_circuit() -> None:
+    responses = [
+        httpx.Response(503),
+        httpx.Response(503),
+        httpx.TooManyRedirects("redirect loop"),
+        httpx.Response(200, json={"properties": {"periods": PERIODS}}),
+    ]
+    breaker = breaker_for(HOST, "forecast")
+    with respx.mock() as mock:
+        mock.get(GRIDPOINT.forecast_hourly_url).mock(side_effect=responses)
+        async with NoaaWeatherClient(cache=ForecastCache()) as client:
+            for _ in range(2):
+                with pytest.raises(httpx.HTTPStatusError):
+                    await client.fetch_gridpoint_forecast(GRIDPOINT)
+            breaker._opened_at -= settings.noaa_breaker_reset_seconds
+            with pytest.raises(httpx.TooManyRedirects):
+                await client.fetch_gridpoint_forecast(GRIDPOINT)
+            assert breaker.state == "open"
+
+            breaker._opened_at -= settings.noaa_breaker_reset_seconds
+            assert len(await client.fetch_gridpoint_forecast(GRIDPOINT)) == 1
+            assert breaker.state == "closed"
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_cancelled_requests_do_not_count_as_failures() -> None:
+    async def hang(request):
+        await asyncio.sleep(10)
+
+    breaker = breaker_for(HOST, "forecast")
+    # Calls are only recorded once answered, and none of these ever are.
+    with respx.mock(assert_all_called=False) as mock:
+        mock.get(GRIDPOINT.forecast_hourly_url).mock(side_effect=hang)
+        async with NoaaWeatherClient(cache=ForecastCache()) as client:
+            for _ in range(3):
+                task = asyncio.create_task(client._get_with_retry(GRIDPOINT.forecast_hourly_url, endpoint="forecast"))
+                await asyncio.sleep(0.01)
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+            assert breaker.state == "closed"
+
+            breaker.record_failure()
+            breaker.record_failure()
+            breaker._opened_at -= settings.noaa_breaker_reset_seconds
+            task = asyncio.create_task(client._get_with_retry(GRIDPOINT.forecast_hourly_url, endpoint="forecast"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    # The cancelled probe neither re-opened the circuit nor kept its slot.
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_expired_forecast_is_served_while_noaa_is_down() -> None:
+    cache = ForecastCache()
+    series = ForecastSeries.from_periods(PERIODS)
+    expired = datetime.now(timezone.utc) - timedelta(minutes=5)
+    cache.store(GRIDPOINT.key, CachedForecast(series=series, expires_at=expired, size_bytes=series.nbytes))
+
+    with respx.mock() as mock:
+        mock.get(GRIDPOINT.forecast_hourly_url).mock(return_value=httpx.Response(503))
+        async with NoaaWeatherClient(cache=cache) as client:
+            assert await client.fetch_gridpoint_forecast(GRIDPOINT) is series
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_slow_request_is_hedged(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "noaa_hedge_enabled", True)
+    monkeypatch.setattr(settings, "noaa_hedge_min_delay_seconds", 0.01)
+    tracker = latency_for(HOST, "forecast")
+    for _ in range(20):
+        tracker.observe(0.01)
+    calls = []
+
+    async def respond(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, json={"properties": {"periods": PERIODS}})
+
+    with respx.mock() as mock:
+        mock.get(GRIDPOINT.forecast_hourly_url).mock(side_effect=respond)
+        async with NoaaWeatherClient(cache=ForecastCache()) as client:
+            series = await asyncio.wait_for(client.fetch_gridpoint_forecast(GRIDPOINT), timeout=1)
+
+    assert len(series) == 1
+    assert len(calls) == 2
+    assert REGISTRY.get_sample_value(
+        "custom_alert_noaa_hedged_requests_total", {"endpoint": "forecast", "winner": "hedge"}
+    ) >= 1
@@ -1,33 +1,53 @@
-from datetime import datetime
+import time
+from datetime import datetime, timedelta, timezone
 
 import pytest
 
-from app.models import ConditionAlert, UserPreference
+from app.archive import ForecastArchive
+from app.config import settings
+from app.forecast import ForecastSeries
+from app.models import ConditionAlert, DispatchOutbox, UserPreference
 from app.schemas import DEFAULT_RADIUS_KM
-from app.weather import NoaaWeatherClient
+from app.weather import Gridpoint, NoaaWeatherClient
 
 
 @pytest.fixture(autouse=True)
 def _freeze_weather(monkeypatch):
-    async def fake_fetch(self, latitude, longitude):  # type: ignore[override]
-        return [
+    async def fake_resolve(self, latitude, longitude):  # type: ignore[override]
+        return Gridpoint(office="OKX", grid_x=33, grid_y=35)
+
+    async def fake_fetch(self, gridpoint):  # type: ignore[override]
+        return ForecastSeries.from_periods([
             {
-                "startTime": "2024-04-01T12:00:00+00:00",
+                "startTime": (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat(),
                 "temperature": 90,
                 "temperatureUnit": "F",
                 "shortForecast": "Sunny",
                 "probabilityOfPrecipitation": {"value": 10},
                 "windSpeed": "10 mph",
             }
-        ]
+        ])
 
     async def fake_close(self):  # type: ignore[override]
         return None
 
-    monkeypatch.setattr(NoaaWeatherClient, "fetch_hourly_forecast", fake_fetch)
+    monkeypatch.setattr(NoaaWeatherClient, "resolve_gridpoint", fake_resolve)
+    monkeypatch.setattr(NoaaWeatherClient, "fetch_gridpoint_forecast", fake_fetch)
     monkeypatch.setattr(NoaaWeatherClient, "aclose", fake_close)
 
 
+def wait_for_job(client, response):
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/v1/conditions/run/{job_id}").json()
+        if job["status"] in {"succeeded", "failed"}:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"evaluation job {job_id} did not finish")
+
+
 def create_alert(client):
     payload = {
         "user_id": "user-123",
@@ -46,9 +66,10 @@ def create_alert(client):
 def test_run_endpoint_updates_last_triggered(client, session_local):
     created = create_alert(client)
 
-    run_response = client.post("/api/v1/conditions/run?dry_run=true")
-    assert run_response.status_code == 200
-    assert run_response.json() == {"triggered": 1}
+    job = wait_for_job(client, client.post("/api/v1/conditions/run?dry_run=true"))
+    assert job["status"] == "succeeded"
+    assert (job["due"], job["gridpoints_fetched"], job["triggered"]) == (1, 1, 1)
+    assert {"claim", "resolve", "fetch", "match", "dispatch", "write"} <= set(job["phase_seconds"])
 
     session = session_local()
     try:
@@ -90,9 +111,8 @@ def test_run_endpoint_merges_channel_overrides(client, session_local, monkeypatc
 
     monkeypatch.setattr("app.routes._DryRunDispatcher", Recorder)
 
-    run_response = client.post("/api/v1/conditions/run?dry_run=true")
-    assert run_response.status_code == 200
-    assert run_response.json()["triggered"] == 1
+    job = wait_for_job(client, client.post("/api/v1/conditions/run?dry_run=true"))
+    assert job["triggered"] == 1
 
     assert recorded, "Expected dry-run dispatcher to capture at least one message"
     match = recorded[0]["match"]
@@ -149,3 +169,92 @@ def test_forecast_preview_handles_failure(client, monkeypatch):
     assert response.status_code == 200
     body = response.json()
     assert body["periods"] == []
+
+
+def test_run_reuses_scheduler_dispatcher(client, monkeypatch):
+    create_alert(client)
+    sent = []
+
+    class SharedDispatcher:
+        async def send(self, payload):
+            sent.append(payload)
+
+    shared = SharedDispatcher()
+
+    async def fake_dispatcher(self):
+        return shared
+
+    monkeypatch.setattr("app.scheduler.ConditionScheduler.dispatcher", fake_dispatcher)
+
+    job = wait_for_job(client, client.post("/api/v1/conditions/run?dry_run=false"))
+
+    assert (job["status"], job["dry_run"], job["triggered"]) == ("succeeded", False, 1)
+    assert len(sent) == 1
+
+
+def test_outbox_run_does_not_need_a_dispatcher(client, session_local, monkeypatch):
+    monkeypatch.setattr(settings, "dispatch_outbox_enabled", True)
+    create_alert(client)
+
+    async def unavailable_dispatcher(self):
+        return None
+
+    monkeypatch.setattr("app.scheduler.ConditionScheduler.dispatcher", unavailable_dispatcher)
+
+    job = wait_for_job(client, client.post("/api/v1/conditions/run?dry_run=false"))
+
+    assert (job["status"], job["triggered"]) == ("succeeded", 1)
+    session = session_local()
+    try:
+        assert session.query(DispatchOutbox).count() == 1
+    finally:
+        session.close()
+
+
+def test_run_status_unknown_job(client):
+    assert client.get("/api/v1/conditions/run/missing").status_code == 404
+
+
+def test_forecast_preview_is_cached_with_etag(client, monkeypatch):
+    calls = []
+
+    async def fake_preview(self, latitude, longitude, periods):
+        calls.append((latitude, longitude, periods))
+        return [{"start_time": "2024-04-01T12:00:00+00:00", "short_forecast": "Sunny", "temperature": 72}]
+
+    monkeypatch.setattr("app.weather.NoaaWeatherClient.fetch_forecast_preview", fake_preview)
+    params = {"latitude": 40.0, "longitude": -74.0}
+
+    first = client.get("/api/v1/conditions/preview", params=params)
+    second = client.get("/api/v1/conditions/preview", params=params)
+    revalidated = client.get("/api/v1/conditions/preview", params=params, headers={"If-None-Match": first.headers["etag"]})
+
+    assert len(calls) == 1
+    assert first.json() == second.json()
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.headers["cache-control"].startswith("public, max-age=")
+    assert revalidated.status_code == 304
+
+
+def test_backtest_replays_archived_forecasts(client, monkeypatch, tmp_path):
+    payload = {"condition_type": "temperature_hot", "latitude": 40.0, "longitude": -74.0, "days": 7}
+    monkeypatch.setattr("app.routes.forecast_archive", ForecastArchive(None))
+    assert client.post("/api/v1/conditions/backtest", json=payload).status_code == 503
+
+    archive = ForecastArchive(str(tmp_path))
+    fetched_at = datetime.now(timezone.utc) - timedelta(days=1)
+    for step, temperature in enumerate([80, 88, 92]):
+        series = ForecastSeries.from_periods([{"temperature": temperature, "temperatureUnit": "F"}])
+        archive.record("OKX/33,35", series, fetched_at + timedelta(hours=step))
+    monkeypatch.setattr("app.routes.forecast_archive", archive)
+
+    body = client.post("/api/v1/conditions/backtest", json=payload).json()
+    assert (body["gridpoint"], body["snapshots"], body["matched"], body["triggers"]) == ("OKX/33,35", 3, 2, 2)
+
+    tuned = client.post("/api/v1/conditions/backtest", json={**payload, "threshold_value": 90, "cooldown_minutes": 0})
+    assert tuned.json()["matched"] == 1
+
+    too_long = client.post("/api/v1/conditions/backtest", json={**payload, "window_hours": archive.hours + 1})
+    assert too_long.status_code == 422
+    rule = {"condition_type": "compound", "latitude": 40.0, "longitude": -74.0, "rule": "temperature > 90 within 72h"}
+    assert client.post("/api/v1/conditions/backtest", json=rule).status_code == 422
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+
+from app.forecast import ForecastSeries
+from app.rules import RuleSyntaxError, compile_rule
+
+
+def _series(temperatures, humidities, forecasts=None) -> ForecastSeries:
+    return ForecastSeries.from_periods(
+        [
+            {
+                "startTime": f"2024-07-01T{hour:02d}:00:00+00:00",
+                "temperature": temperature,
+                "temperatureUnit": "F",
+                "relativeHumidity": {"unitCode": "wmoUnit:percent", "value": humidity},
+                "shortForecast": (forecasts or {}).get(hour, "Sunny"),
+            }
+            for hour, (temperature, humidity) in enumerate(zip(temperatures, humidities))
+        ]
+    )
+
+
+def test_rule_requires_consecutive_hours_within_window() -> None:
+    rule = compile_rule("temperature ≥ 95 AND humidity ≥ 60 for 3 consecutive hours within 12h")
+    assert (rule.consecutive_hours, rule.within_hours) == (3, 12)
+
+    run_of_three = _series([90, 96, 97, 98, 90], [70, 65, 61, 60, 70])
+    broken_run = _series([96, 97, 90, 98, 99], [70, 70, 70, 70, 70])
+    dry = _series([96, 97, 98, 99], [70, 70, 50, 70])
+
+    assert rule.matches(run_of_three, rule.within_hours)
+    assert not rule.matches(broken_run, rule.within_hours)
+    assert not rule.matches(dry, rule.within_hours)
+    assert not rule.matches(run_of_three, 3)
+
+
+def test_rule_supports_or_not_rain_and_ignores_missing_data() -> None:
+    rule = compile_rule("(temperature > 100 OR humidity >= 90) AND NOT rain")
+
+    assert rule.matches(_series([80, 80], [95, 50]), 2)
+    assert not rule.matches(_series([80, 80], [95, 50], {0: "Light Rain"}), 2)
+    assert not rule.matches(_series([None, None], [None, None]), 2)
+    assert np.isnan(_series([None], [None]).humidity[0])
+
+
+def test_negated_comparison_does_not_match_missing_hours() -> None:
+    rule = compile_rule("NOT temperature > 100 AND humidity >= 60 for 2 consecutive hours")
+
+    assert rule.matches(_series([80, 85], [70, 70]), 2)
+    assert not rule.matches(_series([80, None], [70, 70]), 2)
+    assert not compile_rule("NOT humidity >= 60").matches(_series([80, 80], [None, None]), 2)
+
+
+def test_equivalent_spellings_share_one_compiled_rule() -> None:
+    first = compile_rule("temperature>=95 and humidity >= 60 for 3 hours within 12 hours")
+    second = compile_rule("Temperature >= 95.0  AND humidity>=60 FOR 3 consecutive hours WITHIN 12h")
+
+    assert first is second
+    assert first.canonical == "temperature >= 95 AND humidity >= 60 for 3 consecutive hours within 12h"
+    assert first.digest != compile_rule("temperature >= 95 AND humidity >= 61").digest
+
+
+@pytest.mark.parametrize(
+    ("source", "canonical"),
+    [
+        ("temperature <= -10", "temperature <= -10"),
+        ("temperature<=-2.50 AND wind > 3", "temperature <= -2.5 AND wind > 3"),
+        ("temperature >= -0", "temperature >= 0"),
+    ],
+)
+def test_negative_literals_round_trip(source: str, canonical: str) -> None:
+    rule = compile_rule(source)
+
+    assert rule.canonical == canonical
+    assert compile_rule(rule.canonical) is rule
+
+
+def test_negative_threshold_matches_sub_zero_hours() -> None:
+    rule = compile_rule("temperature <= -10")
+
+    assert rule.matches(_series([-12, 5], [50, 50]), 2)
+    assert not rule.matches(_series([-9.5, 5], [50, 50]), 2)
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "",
+        "dewpoint > 70",
+        "temperature >",
+        "temperature > 90 AND",
+        "(rain OR wind > 30",
+        "rain within 200h",
+        "rain for 6 consecutive hours within 3h",
+        "rain for 1.5 hours",
+        "rain within -3h",
+    ],
+)
+def test_invalid_rules_are_rejected(source: str) -> None:
+    with pytest.raises(RuleSyntaxError):
+        compile_rule(source)
@@ -0,0 +1,82 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.forecast import ForecastSeries
+from app.models import ConditionAlert
+from app.scheduling import HorizonProfile, next_slot_time, predictive_deferral, slotted_next_evaluation
+
+
+def _heat_alert(threshold: float) -> ConditionAlert:
+    return ConditionAlert(
+        id=1,
+        user_id="user-predict",
+        label="Heat",
+        condition_type="temperature_hot",
+        threshold_value=threshold,
+        comparison="above",
+        latitude=40.0,
+        longitude=-75.0,
+    )
+
+
+def _profile(temperatures) -> HorizonProfile:
+    series = ForecastSeries.from_periods([{"temperature": temp, "temperatureUnit": "F"} for temp in temperatures])
+    return HorizonProfile(series, window_hours=6)
+
+
+@pytest.fixture(autouse=True)
+def _predictive_settings(monkeypatch):
+    monkeypatch.setattr(settings, "scheduler_interval_seconds", 600)
+    monkeypatch.setattr(settings, "predictive_max_interval_seconds", 48 * 3600)
+    monkeypatch.setattr(settings, "predictive_temperature_drift_per_hour", 2.0)
+
+
+def test_far_from_threshold_defers_by_margin() -> None:
+    deferral = predictive_deferral(_heat_alert(95.0), _profile([40.0] * 48))
+
+    assert deferral.reason == "margin"
+    assert deferral.seconds == pytest.approx(27.5 * 3600)
+
+
+def test_forecast_crossing_bounds_deferral() -> None:
+    temperatures = [80.0] * 10 + [100.0] + [80.0] * 37
+
+    deferral = predictive_deferral(_heat_alert(95.0), _profile(temperatures))
+
+    assert deferral.reason == "forecast_crossing"
+    assert deferral.seconds == pytest.approx(5 * 3600)
+
+
+def test_deferral_is_clamped_to_interval_and_cap(monkeypatch) -> None:
+    near = predictive_deferral(_heat_alert(95.0), _profile([94.8] * 48))
+    assert (near.reason, near.seconds) == ("interval", 600)
+
+    monkeypatch.setattr(settings, "predictive_max_interval_seconds", 3600)
+    far = predictive_deferral(_heat_alert(95.0), _profile([40.0] * 48))
+    assert (far.reason, far.seconds) == ("cap", 3600)
+
+
+def test_slots_spread_alerts_evenly_and_repeat_each_interval(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "scheduler_slot_count", 10)
+    now = datetime(2024, 1, 15, 12, 3, 17)
+
+    due_times = {alert_id: next_slot_time(alert_id, now) for alert_id in range(1, 2001)}
+
+    assert all(now <= due < now + timedelta(seconds=600) for due in due_times.values())
+    per_slot = Counter(due_times.values())
+    assert len(per_slot) == 10
+    assert max(per_slot.values()) < 1.3 * min(per_slot.values())
+    # Evaluating an alert during its slot schedules it exactly one interval later.
+    for alert_id, due in list(due_times.items())[:50]:
+        evaluated_at = due + timedelta(seconds=42)
+        assert slotted_next_evaluation(alert_id, evaluated_at, 600) == due + timedelta(seconds=600)
+
+
+def test_single_slot_disables_leveling(monkeypatch) -> None:
+    monkeypatch.setattr(settings, "scheduler_slot_count", 1)
+    now = datetime(2024, 1, 15, 12, 3, 17)
+
+    assert slotted_next_evaluation(7, now, 600) == now + timedelta(seconds=600)
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.forecast import ForecastSeries
+from app.forecast_cache import CachedForecast, ForecastCache
+from app.models import ConditionAlert
+from app.simulation import ThresholdChange, simulate_thresholds
+
+NOW = datetime(2024, 4, 1, 12, tzinfo=timezone.utc)
+
+
+def _cache(temperatures: dict[str, float]) -> ForecastCache:
+    cache = ForecastCache()
+    for key, temperature in temperatures.items():
+        series = ForecastSeries.from_periods([{"temperature": temperature, "temperatureUnit": "F"}])
+        cache.store(key, CachedForecast(series=series, expires_at=NOW))
+    return cache
+
+
+def _alert(gridpoint, threshold: float, tenant: str = "default", **fields) -> ConditionAlert:
+    alert = ConditionAlert(
+        user_id=f"user-{threshold}",
+        label="Hot",
+        condition_type=fields.pop("condition_type", "temperature_hot"),
+        threshold_value=threshold,
+        comparison="above",
+        latitude=40.0,
+        longitude=-75.0,
+        gridpoint=gridpoint,
+        metadata_json={"tenant_id": tenant},
+        **fields,
+    )
+    alert.sync_tenant()
+    return alert
+
+
+@pytest.mark.anyio(backend="asyncio")
+async def test_simulation_compares_defaults_and_tenant_changes(db_session, async_session) -> None:
+    db_session.add_all(
+        [
+            _alert("OKX/1,1", 85.0, "acme"),
+            _alert("OKX/1,1", 85.0, "globex"),
+            _alert("OKX/1,1", 95.0, "acme"),
+            _alert("OKX/2,2", 85.0, "acme"),
+            _alert(None, 85.0, "acme"),
+            _alert("OKX/1,1", 85.0, "globex", last_triggered_at=(NOW - timedelta(minutes=5)).replace(tzinfo=None)),
+            _alert("OKX/1,1", 0.0, "acme", condition_type="compound", rule="temperature >= 85"),
+        ]
+    )
+    db_session.commit()
+    cache = _cache({"OKX/1,1": 88, "OKX/2,2": 70})
+
+    result = await simulate_thresholds(
+        async_session,
+        defaults={"temperature_hot": 90.0},
+        changes=[ThresholdChange(condition_type="temperature_hot", threshold_value=80.0, tenant_id="globex")],
+        now=NOW,
+        cache=cache,
+    )
+
+    assert (result.alerts, result.evaluated, result.without_forecast, result.in_cooldown) == (7, 6, 1, 1)
+    # acme's default alert at 88F stops firing; globex's tenant-wide 80F keeps firing; compound is unchanged.
+    assert (result.baseline_triggers, result.proposed_triggers) == (3, 2)
+    assert result.by_tenant["acme"].alerts == 5
+    assert (result.by_tenant["acme"].baseline, result.by_tenant["acme"].proposed) == (2, 1)
+    assert (result.by_tenant["globex"].baseline, result.by_tenant["globex"].proposed) == (1, 1)
+    assert (result.by_condition["compound"].baseline, result.by_condition["compound"].proposed) == (1, 1)
+    assert result.kafka_messages == 2
+    assert result.kafka_bytes > 0
+
+    ignoring_cooldown = await simulate_thresholds(
+        async_session, defaults={}, respect_cooldown=False, now=NOW, cache=cache
+    )
+    assert ignoring_cooldown.baseline_triggers == ignoring_cooldown.proposed_triggers == 4
+
+
+def test_simulation_endpoint_reports_without_dispatching(client) -> None:
+    response = client.post(
+        "/api/v1/conditions/admin/simulate",
+        json={"defaults": {"wind": 30}, "overrides": [{"condition_type": "precipitation", "threshold_value": 50}]},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["alerts"] == body["proposed_triggers"] == body["kafka_messages"] == 0
+    assert body["by_tenant"] == {}
+
+    invalid = client.post("/api/v1/conditions/admin/simulate", json={"defaults": {"hail": 1}})
+    assert invalid.status_code == 422
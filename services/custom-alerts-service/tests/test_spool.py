@@ -0,0 +1,49 @@
+from prometheus_client import REGISTRY
+
+from app.spool import DispatchSpool
+
+
+def _payloads(start: int, count: int) -> list[dict]:
+    return [{"match": {"subscription_id": index}} for index in range(start, start + count)]
+
+
+def _ids(payloads) -> list[int]:
+    return [payload["match"]["subscription_id"] for payload in payloads]
+
+
+def test_spool_drains_in_order_across_segments_and_restarts(tmp_path) -> None:
+    spool = DispatchSpool(str(tmp_path), segment_bytes=200)
+    spool.append(_payloads(0, 5))
+    spool.append(_payloads(5, 5))
+    assert len(list(tmp_path.glob("segment-*.log"))) > 1
+    assert spool.depth == 10
+    assert REGISTRY.get_sample_value("custom_alert_dispatch_spool_depth") == 10
+
+    batch = spool.peek(4)
+    assert _ids(batch.payloads) == [0, 1, 2, 3]
+    spool.commit(batch.ends[-1], len(batch.payloads))
+    spool.close()
+
+    reopened = DispatchSpool(str(tmp_path), segment_bytes=200)
+    assert reopened.depth == 6
+    assert reopened.oldest_age() >= 0.0
+    rest = reopened.peek(100)
+    assert _ids(rest.payloads) == [4, 5, 6, 7, 8, 9]
+    reopened.commit(rest.ends[-1], len(rest.payloads))
+    assert reopened.depth == 0
+    assert reopened.oldest_age() == 0.0
+    assert len(list(tmp_path.glob("segment-*.log"))) == 1
+
+
+def test_spool_discards_torn_tail_record(tmp_path) -> None:
+    spool = DispatchSpool(str(tmp_path))
+    spool.append(_payloads(0, 2))
+    spool.close()
+    segment = next(tmp_path.glob("segment-*.log"))
+    with segment.open("ab") as handle:
+        handle.write(b'{"spooled_at": 1, "payl')
+
+    reopened = DispatchSpool(str(tmp_path))
+    reopened.append(_payloads(2, 1))
+
+    assert _ids(reopened.peek(10).payloads) == [0, 1, 2]
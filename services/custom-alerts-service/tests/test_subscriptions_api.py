@@ -3,7 +3,11 @@ from typing import Any
 import pytest
 from fastapi.testclient import TestClient
 
+from app.config import settings
+from app.models import ConditionAlert
+from app.rules import MAX_WINDOW_HOURS
 from app.schemas import DEFAULT_RADIUS_KM
+from app.units import window_hours_for
 
 
 def test_create_subscription_applies_defaults(client: TestClient) -> None:
@@ -83,7 +87,61 @@ def test_update_subscription_allows_threshold_override(client: TestClient) -> No
 
 
 
-def test_run_endpoint_returns_summary(client: TestClient) -> None:
+def test_compound_subscription_validates_and_normalizes_rule(client: TestClient) -> None:
+    payload: dict[str, Any] = {
+        "user_id": "user-heat",
+        "label": "Muggy heat wave",
+        "condition_type": "compound",
+        "latitude": 29.76,
+        "longitude": -95.37,
+        "rule": "temperature ≥ 95 and humidity ≥ 60 for 3 consecutive hours within 12h",
+    }
+
+    response = client.post("/api/v1/conditions/subscriptions", json=payload)
+    assert response.status_code == 201
+    assert response.json()["rule"] == "temperature >= 95 AND humidity >= 60 for 3 consecutive hours within 12h"
+
+    invalid = client.post("/api/v1/conditions/subscriptions", json={**payload, "rule": "dewpoint > 70"})
+    assert invalid.status_code == 422
+    missing = client.post("/api/v1/conditions/subscriptions", json={**payload, "rule": None})
+    assert missing.status_code == 422
+    misplaced = client.post(
+        "/api/v1/conditions/subscriptions", json={**payload, "condition_type": "wind", "rule": "rain"}
+    )
+    assert misplaced.status_code == 422
+
+
+def test_run_endpoint_returns_job(client: TestClient) -> None:
     response = client.post("/api/v1/conditions/run")
-    assert response.status_code == 200
-    assert response.json() == {"triggered": 0}
+    assert response.status_code == 202
+    body = response.json()
+    assert body["job_id"]
+    assert body["dry_run"] is True
+    assert body["status"] in {"queued", "running", "succeeded"}
+
+
+@pytest.mark.parametrize("window_hours", [0, -3, 2.5, "6", True, MAX_WINDOW_HOURS + 1])
+def test_invalid_window_hours_metadata_is_rejected(client: TestClient, window_hours: Any) -> None:
+    payload = {
+        "user_id": "user-window",
+        "label": "Windy",
+        "condition_type": "wind",
+        "latitude": 39.95,
+        "longitude": -75.16,
+        "metadata": {"window_hours": window_hours},
+    }
+    assert client.post("/api/v1/conditions/subscriptions", json=payload).status_code == 422
+
+    created = client.post("/api/v1/conditions/subscriptions", json={**payload, "metadata": {"window_hours": 12}})
+    assert created.status_code == 201
+    update = client.put(
+        f"/api/v1/conditions/subscriptions/{created.json()['id']}",
+        json={"metadata": {"window_hours": window_hours}},
+    )
+    assert update.status_code == 422
+
+
+def test_stored_window_hours_are_clamped() -> None:
+    alert = ConditionAlert(metadata_json={"window_hours": 10_000})
+    assert window_hours_for(alert) == MAX_WINDOW_HOURS
+    assert window_hours_for(ConditionAlert(metadata_json={"window_hours": -1})) == settings.evaluation_window_hours
@@ -0,0 +1,64 @@
+from app.forecast import ForecastSeries
+from app.models import ConditionAlert
+from app.threshold_index import ThresholdIndex, WindowSummary
+
+
+def _alert(alert_id: int, condition_type: str, threshold: float, comparison: str = "above") -> ConditionAlert:
+    return ConditionAlert(
+        id=alert_id,
+        user_id=f"user-{alert_id}",
+        label="index",
+        condition_type=condition_type,
+        threshold_value=threshold,
+        comparison=comparison,
+        latitude=40.0,
+        longitude=-75.0,
+    )
+
+
+def _series(temperatures, winds, precip=0, forecast="Sunny") -> ForecastSeries:
+    return ForecastSeries.from_periods(
+        [
+            {
+                "temperature": temp,
+                "temperatureUnit": "F",
+                "windSpeed": f"{wind} mph",
+                "probabilityOfPrecipitation": {"value": precip},
+                "shortForecast": forecast,
+            }
+            for temp, wind in zip(temperatures, winds)
+        ]
+    )
+
+
+def test_index_selects_alerts_by_threshold_and_direction() -> None:
+    alerts = [
+        _alert(1, "temperature_hot", 85.0),
+        _alert(2, "temperature_hot", 90.0),
+        _alert(3, "temperature_hot", 95.0),
+        _alert(4, "temperature_cold", 60.0, comparison="below"),
+        _alert(5, "temperature_cold", 70.0, comparison="below"),
+        _alert(6, "wind", 15.0),
+        _alert(7, "wind", 30.0),
+        _alert(8, "wind", 6.0, comparison="below"),
+        _alert(9, "precipitation", 40.0),
+    ]
+    summary = WindowSummary.from_series(_series([64, 72, 90, 101], [8, 12, 20, 5]), hours=3)
+
+    triggered = {alert.id for alert in ThresholdIndex(alerts).triggered(summary)}
+
+    assert triggered == {1, 2, 5, 6}
+
+
+def test_rain_in_forecast_triggers_every_precipitation_alert() -> None:
+    alerts = [_alert(1, "precipitation", 40.0), _alert(2, "precipitation", 90.0)]
+    summary = WindowSummary.from_series(_series([60], [5], precip=10, forecast="Light Rain"), hours=6)
+
+    assert {alert.id for alert in ThresholdIndex(alerts).triggered(summary)} == {1, 2}
+
+
+def test_missing_metric_never_triggers() -> None:
+    alerts = [_alert(1, "wind", 0.0), _alert(2, "wind", 100.0, comparison="below")]
+    summary = WindowSummary.from_series(ForecastSeries.from_periods([{"temperature": 50}]), hours=6)
+
+    assert ThresholdIndex(alerts).triggered(summary) == []